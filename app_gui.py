@@ -1,26 +1,35 @@
+import time
+_T0 = time.perf_counter() # Início do app (modo --startup-time)
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import sys
 import threading
+import queue
 import os
 import subprocess
+from concurrent.futures import Future
 from pathlib import Path
 
-# Importa o script principal
-import main
+# O script principal (e com ele groq, yt_dlp, PIL...) carrega em segundo plano
+# depois que a janela aparece: o clique em "Iniciar" só espera se ele ainda não terminou
+PREFETCH_DELAY_MS = 50
+# Log: as threads do pipeline só põem o texto numa fila; o loop do Tk esvazia a
+# fila a cada LOG_POLL_MS em lotes e guarda só as últimas LOG_MAX_LINES linhas
+LOG_POLL_MS = 100
+LOG_BATCH = 2000
+LOG_MAX_LINES = 3000
 
-class TextRedirector(object):
-    def __init__(self, widget, tag="stdout"):
-        self.widget = widget
+class QueueWriter(object):
+    """stdout/stderr das threads de trabalho: só enfileira (não toca no Tk)."""
+
+    def __init__(self, events, tag="stdout"):
+        self.events = events
         self.tag = tag
 
-    def write(self, str):
-        self.widget.configure(state="normal")
-        self.widget.insert("end", str, (self.tag,))
-        self.widget.see("end")
-        self.widget.configure(state="disabled")
-        # Força atualização da interface
-        self.widget.update_idletasks()
+    def write(self, text):
+        if text:
+            self.events.put((self.tag, text))
+        return len(text)
 
     def flush(self):
         pass
@@ -62,9 +71,16 @@ class MusicAutomationApp:
                                   relief="flat", padx=20, pady=10, cursor="hand2")
         self.btn_open.pack(side=tk.LEFT)
 
-        # Área de Log
-        log_label = ttk.Label(main_frame, text="Progresso:", font=("Segoe UI", 10))
-        log_label.pack(anchor="w", pady=(5, 0))
+        # Progresso (eventos estruturados do pipeline)
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.pack(fill=tk.X, pady=(5, 0))
+        log_label = ttk.Label(progress_frame, text="Progresso:", font=("Segoe UI", 10))
+        log_label.pack(side=tk.LEFT)
+        self.stage_var = tk.StringVar(value="")
+        stage_label = ttk.Label(progress_frame, textvariable=self.stage_var, font=("Segoe UI", 10), foreground="#9cdcfe")
+        stage_label.pack(side=tk.RIGHT)
+        self.progress = ttk.Progressbar(main_frame, mode="determinate", maximum=100)
+        self.progress.pack(fill=tk.X, pady=(5, 0))
 
         self.log_area = scrolledtext.ScrolledText(main_frame, state='disabled', height=15, 
                                                   bg="#252526", fg="#d4d4d4", font=("Consolas", 10), borderwidth=0)
@@ -74,20 +90,93 @@ class MusicAutomationApp:
         self.log_area.tag_config("stdout", foreground="#d4d4d4")
         self.log_area.tag_config("stderr", foreground="#ff6b6b")
 
-        # Redirecionar stdout e stderr
-        sys.stdout = TextRedirector(self.log_area, "stdout")
-        sys.stderr = TextRedirector(self.log_area, "stderr")
+        # Redirecionar stdout e stderr para a fila (esvaziada por drain_events)
+        self.events = queue.SimpleQueue()
+        sys.stdout = QueueWriter(self.events, "stdout")
+        sys.stderr = QueueWriter(self.events, "stderr")
+        self.root.after(LOG_POLL_MS, self.drain_events)
 
         # Footer
         footer_label = ttk.Label(main_frame, text="Powered by Groq AI & FFmpeg", font=("Segoe UI", 8), foreground="#666")
         footer_label.pack(anchor="e", pady=(10, 0))
 
+        self.backend = Future()
+        self.prefetch_thread = None
+        self.root.after(PREFETCH_DELAY_MS, self.load_backend)
+
+    def load_backend(self):
+        threading.Thread(target=self._load_backend, name="backend", daemon=True).start()
+
+    def _load_backend(self):
+        try:
+            import main
+            main.instrumentation.add_listener(lambda evento: self.events.put(("progress", evento)))
+            self.prefetch_thread = main.prefetch_backends()
+            self.backend.set_result(main)
+        except BaseException as e:
+            self.backend.set_exception(e)
+
+    def drain_events(self):
+        """Esvazia a fila no loop do Tk: um insert por bloco de texto e um scroll por lote."""
+        blocos, fim = [], None
+        try:
+            for _ in range(LOG_BATCH):
+                tipo, dado = self.events.get_nowait()
+                if tipo == "progress":
+                    self.show_progress(dado)
+                elif tipo == "done":
+                    fim = dado
+                elif blocos and blocos[-1][0] == tipo:
+                    blocos[-1][1].append(dado)
+                else:
+                    blocos.append((tipo, [dado]))
+        except queue.Empty:
+            pass
+        if blocos:
+            self.log_area.configure(state="normal")
+            for tag, partes in blocos:
+                self.log_area.insert("end", "".join(partes), (tag,))
+            # Anel: descarta as linhas mais antigas acima do limite
+            linhas = int(self.log_area.index("end-1c").split(".")[0])
+            if linhas > LOG_MAX_LINES:
+                self.log_area.delete("1.0", f"{linhas - LOG_MAX_LINES + 1}.0")
+            self.log_area.see("end")
+            self.log_area.configure(state="disabled")
+        self.root.after(LOG_POLL_MS, self.drain_events)
+        if fim is not None:
+            # Depois do texto: a mensagem final aparece com o log já completo
+            self.finish(*fim)
+
+    def show_progress(self, evento):
+        if evento.get("percent") is not None:
+            self.progress["value"] = evento["percent"]
+        if evento.get("status") == "start":
+            texto = evento["stage"]
+            if evento.get("rank") is not None:
+                texto += f" #{evento['rank']}"
+            elif evento.get("song"):
+                texto += f": {evento['song']}"
+            self.stage_var.set(texto)
+        elif evento.get("percent") is not None:
+            self.stage_var.set(f"{evento['percent']:.0f}%")
+
+    def finish(self, ok, mensagem):
+        # Reabilita o botão
+        self.btn_run.config(state="normal", bg="#007acc")
+        if ok:
+            self.progress["value"] = 100
+            messagebox.showinfo("Sucesso", mensagem)
+        else:
+            messagebox.showerror("Erro", mensagem)
+
     def start_thread(self):
         # Desabilita botão para evitar cliques duplos
         self.btn_run.config(state="disabled", bg="#555")
         self.log_area.configure(state="normal")
         self.log_area.delete(1.0, tk.END)
         self.log_area.configure(state="disabled")
+        self.progress["value"] = 0
+        self.stage_var.set("")
         
         # Roda em thread separada para não travar a interface
         thread = threading.Thread(target=self.run_automation)
@@ -97,18 +186,20 @@ class MusicAutomationApp:
     def run_automation(self):
         try:
             print("🚀 Iniciando o motor da IA...")
+            if not self.backend.done():
+                print("[*] Carregando dependências...")
+            main = self.backend.result()
             # Chama a função main do script original
-            main.main()
-            print("
-✨ PROCESSO FINALIZADO COM SUCESSO! ✨")
-            messagebox.showinfo("Sucesso", "Vídeo gerado com sucesso! Verifique a pasta output.")
+            if main.main():
+                print("\n✨ PROCESSO FINALIZADO COM SUCESSO! ✨")
+                resultado = (True, "Vídeo gerado com sucesso! Verifique a pasta output.")
+            else:
+                resultado = (False, "Nenhum vídeo gerado. Veja o log.")
         except Exception as e:
-            print(f"
-❌ ERRO CRÍTICO: {e}")
-            messagebox.showerror("Erro", f"Ocorreu um erro: {e}")
-        finally:
-            # Reabilita o botão
-            self.root.after(0, lambda: self.btn_run.config(state="normal", bg="#007acc"))
+            print(f"\n❌ ERRO CRÍTICO: {e}")
+            resultado = (False, f"Ocorreu um erro: {e}")
+        # A janela de aviso e o botão são atualizados pelo loop do Tk
+        self.events.put(("done", resultado))
 
     def open_output(self):
         output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
@@ -122,7 +213,38 @@ class MusicAutomationApp:
         else:  # linux
             subprocess.call(('xdg-open', output_path))
 
+def medir_inicializacao():
+    """Tempo até a janela aparecer e até o motor carregar, mais o -X importtime de app_gui e main."""
+    import instrumentation
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"[!] Sem display ({e}): só o importtime")
+    else:
+        app = MusicAutomationApp(root)
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        root.update()
+        print(f"[*] Janela desenhada em {(time.perf_counter() - _T0) * 1000:.0f} ms")
+        marcas = {}
+
+        def esperar():
+            if app.backend.done() and "main" not in marcas:
+                marcas["main"] = time.perf_counter() - _T0
+                print(f"[*] main importado em {marcas['main'] * 1000:.0f} ms")
+            if "main" in marcas and (app.prefetch_thread is None or not app.prefetch_thread.is_alive()):
+                print(f"[*] Dependências pré-carregadas em {(time.perf_counter() - _T0) * 1000:.0f} ms")
+                root.destroy()
+                return
+            root.after(10, esperar)
+        root.after(0, esperar)
+        root.mainloop()
+    for modulo in ("app_gui", "main"):
+        instrumentation.print_import_times(modulo, instrumentation.import_times(modulo))
+
 if __name__ == "__main__":
+    if "--startup-time" in sys.argv:
+        medir_inicializacao()
+        sys.exit(0)
     root = tk.Tk()
     app = MusicAutomationApp(root)
     root.mainloop()
@@ -0,0 +1,61 @@
+import json
+import math
+import subprocess
+import instrumentation
+
+# Masterização do áudio: em vez de um loudnorm de uma passada em cada clipe
+# (caro e diferente de clipe para clipe), mede o loudness do trecho uma vez
+# (a medição fica em cache junto do trecho baixado) e aplica um ganho linear
+# no encode. Alternativas: segunda passada do loudnorm com os valores medidos,
+# ou normalizar uma vez só o programa final.
+
+TARGET_I = -16.0
+TARGET_TP = -1.5
+TARGET_LRA = 11.0
+
+# "gain": ganho linear por segmento; "measured": loudnorm com as medidas (2a passada);
+# "final": segmentos sem ajuste e um ganho único no vídeo final
+MODES = ("gain", "measured", "final")
+
+
+def loudnorm_filter(extra=""):
+    """loudnorm com o alvo padrão (sem extra é o de uma passada, usado quando a medição falha)."""
+    return f"loudnorm=I={TARGET_I}:TP={TARGET_TP}:LRA={TARGET_LRA}{extra}"
+
+
+def measure_loudness(ffmpeg_exe, path, start=0, duration=None):
+    """Estatísticas do loudnorm (input_i, input_tp, input_lra, input_thresh, target_offset) do trecho."""
+    cmd = [ffmpeg_exe, "-hide_banner", "-nostats"]
+    if start:
+        cmd += ["-ss", str(start)]
+    if duration:
+        cmd += ["-t", str(duration)]
+    cmd += ["-i", str(path), "-vn", "-af", loudnorm_filter(":print_format=json"), "-f", "null", "-"]
+    res = instrumentation.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    saida = res.stderr.decode("utf-8", errors="replace")
+    ini, fim = saida.rfind("{"), saida.rfind("}")
+    if res.returncode != 0 or ini < 0 or fim < ini:
+        raise RuntimeError(f"Medição de loudness falhou para {path} (código {res.returncode})")
+    dados = json.loads(saida[ini:fim + 1])
+    return {k: float(dados[k]) for k in ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")}
+
+
+def gain_db(stats):
+    """Ganho linear até o loudness alvo, limitado para o pico não passar do true peak alvo."""
+    i, tp = stats["input_i"], stats["input_tp"]
+    if not (math.isfinite(i) and math.isfinite(tp)):
+        return 0.0 # Trecho mudo: nada a ajustar
+    return round(min(TARGET_I - i, TARGET_TP - tp), 2)
+
+
+def audio_filter(stats, mode="gain"):
+    """Filtro de áudio do segmento para o modo de masterização, a partir da medição."""
+    if mode == "final" or stats is None:
+        return "anull"
+    if mode == "measured":
+        if not math.isfinite(stats["input_i"]):
+            return "anull"
+        return loudnorm_filter(f":measured_I={stats['input_i']}:measured_TP={stats['input_tp']}"
+                               f":measured_LRA={stats['input_lra']}:measured_thresh={stats['input_thresh']}"
+                               f":offset={stats['target_offset']}:linear=true")
+    return f"volume={gain_db(stats)}dB"
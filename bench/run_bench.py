@@ -0,0 +1,455 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import re
+import statistics
+from pathlib import Path
+
+# Benchmark offline do pipeline de render: clipes sintéticos (lavfi testsrc2 +
+# sine), ranking fixo (fixtures/) no lugar do Groq e áudio mudo no lugar do
+# edge-tts. Mede o render dos frames do card, os trechos, a intro e o concat e
+# compara com bench/baseline.json.
+#
+#   python bench/run_bench.py                    # suíte quick, compara com a baseline
+#   python bench/run_bench.py --suite full
+#   python bench/run_bench.py --save-baseline    # grava a baseline desta máquina
+
+BENCH_DIR = Path(__file__).parent.absolute()
+REPO_DIR = BENCH_DIR.parent
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+INTRO_DURATION = 4.0
+
+# Cada cenário roda num processo novo (pico de memória e caches de fonte isolados)
+SUITES = {
+    "quick": [
+        {"name": "draft_1x7", "profile": "draft", "clips": 1, "duration": 7.0},
+        {"name": "draft_3x5", "profile": "draft", "clips": 3, "duration": 5.0},
+        {"name": "draft_3x5_filtergraph", "profile": "draft", "clips": 3, "duration": 5.0, "thumb_mode": "filtergraph"},
+        {"name": "draft_3x5_graph", "profile": "draft", "clips": 3, "duration": 5.0, "engine": "graph"},
+    ],
+    "full": [
+        {"name": "draft_1x7", "profile": "draft", "clips": 1, "duration": 7.0},
+        {"name": "draft_5x7_long_names", "profile": "draft", "clips": 5, "duration": 7.0, "fixture": "ranking_long_names.json"},
+        {"name": "final_1x7", "profile": "final", "clips": 1, "duration": 7.0},
+        {"name": "final_3x5", "profile": "final", "clips": 3, "duration": 5.0},
+        {"name": "final_5x7", "profile": "final", "clips": 5, "duration": 7.0},
+        {"name": "final_3x7_filtergraph", "profile": "final", "clips": 3, "duration": 7.0, "thumb_mode": "filtergraph"},
+        {"name": "final_1x7_png", "profile": "final", "clips": 1, "duration": 7.0, "frames_mode": "png"},
+        {"name": "final_5x7_graph", "profile": "final", "clips": 5, "duration": 7.0, "engine": "graph"},
+        {"name": "final_3x7_filtergraph_graph", "profile": "final", "clips": 3, "duration": 7.0,
+         "thumb_mode": "filtergraph", "engine": "graph"},
+    ],
+}
+
+# Métricas comparadas com a baseline: (caminho, maior é melhor?)
+METRICS = [
+    ("card_frames.frames_per_s", True),
+    ("clips.output_s_per_wall_s", True),
+    ("intro.output_s_per_wall_s", True),
+    ("concat.output_s_per_wall_s", True),
+    ("program.output_s_per_wall_s", True),
+    ("total.output_s_per_wall_s", True),
+    ("peak_rss_mb", False),
+    ("child_peak_rss_mb", False),
+]
+
+# Etapas mais curtas que isso na baseline são só ruído: aparecem, mas não reprovam
+MIN_WALL_S = 0.5
+# Queda aceita na mediana das repetições: rodadas soltas variam ~10% numa mesma máquina
+TOLERANCE = 0.15
+
+FONT_CANDIDATES = [
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf", "/usr/share/fonts/dejavu/DejaVuSans.ttf"),
+    ("/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf", "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"),
+    ("/Library/Fonts/Arial Bold.ttf", "/Library/Fonts/Arial.ttf"),
+]
+
+
+def configurar_ambiente():
+    """Variáveis para importar o main sem rede, sem cache de mídia e com fontes desta máquina."""
+    os.environ.setdefault("GROQ_API_KEY", "bench-offline")
+    os.environ["MEDIA_CACHE"] = "0"
+    os.environ["TTS_BACKEND"] = "silent"
+    if not Path("C:/Windows/Fonts/arialbd.ttf").exists():
+        for bold, regular in FONT_CANDIDATES:
+            if Path(bold).exists() and Path(regular).exists():
+                os.environ.setdefault("CARD_FONT_BOLD", bold)
+                os.environ.setdefault("CARD_FONT_REGULAR", regular)
+                os.environ.setdefault("INTRO_FONT", bold)
+                break
+    if str(REPO_DIR) not in sys.path:
+        sys.path.insert(0, str(REPO_DIR))
+
+
+def duracao_video(ffmpeg_exe, path):
+    """Duração de um arquivo lendo o 'Duration:' do ffmpeg -i (não depende do ffprobe)."""
+    res = subprocess.run([ffmpeg_exe, "-hide_banner", "-i", str(path)], capture_output=True, text=True)
+    m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", res.stderr)
+    if not m:
+        return 0.0
+    h, mi, sec = m.groups()
+    return int(h) * 3600 + int(mi) * 60 + float(sec)
+
+
+def sintetizar_clipe(ffmpeg_exe, out_path, duration):
+    """Clipe 1280x720@30 com testsrc2 e um seno, no lugar do trecho baixado do YouTube."""
+    if Path(out_path).exists():
+        return out_path
+    tmp = Path(out_path).with_suffix(".tmp.mp4")
+    cmd = [
+        ffmpeg_exe, "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={duration}",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k", "-shortest", str(tmp)
+    ]
+    subprocess.run(cmd, check=True)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def _taxa(output_s, wall_s):
+    return round(output_s / wall_s, 3) if wall_s > 0 else None
+
+
+def rodar_cenario(cenario, work_dir):
+    """Executa um cenário neste processo e devolve as métricas."""
+    configurar_ambiente()
+    import main
+    import card_generator
+    from render_profiles import get_profile
+    from tts_service import TTSService
+    import instrumentation
+
+    profile = get_profile(cenario["profile"])
+    duration = cenario["duration"]
+    thumb_mode = cenario.get("thumb_mode", "python")
+    frames_mode = cenario.get("frames_mode", "stream")
+    # "segments": clipes, intro e concat medidos separadamente; "graph": o vídeo inteiro num ffmpeg só
+    engine = cenario.get("engine", "segments")
+    with open(FIXTURES_DIR / cenario.get("fixture", "ranking_top5.json"), "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    ranks = sorted(dados["ranking"], key=lambda x: x["rank"], reverse=True)[:cenario["clips"]]
+    theme_title = dados["theme_title"]
+
+    work_dir = Path(work_dir)
+    fontes_dir = work_dir / "sources"
+    main.TEMP_DIR = work_dir / f"temp_{cenario['name']}"
+    main.OUTPUT_DIR = work_dir / f"output_{cenario['name']}"
+    shutil.rmtree(main.TEMP_DIR, ignore_errors=True)
+    main.TEMP_DIR.mkdir(parents=True)
+    main.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    ffmpeg = main.FFMPEG_EXE
+
+    # Narração muda (backend local do TTS, sem rede), com cache próprio na pasta do bench
+    main.tts = TTSService(work_dir / "tts", backend="silent", ffmpeg_exe=ffmpeg)
+
+    src = fontes_dir / f"src_{duration:g}s.mp4"
+    src_intro = fontes_dir / f"src_{duration + INTRO_DURATION:g}s.mp4"
+    fps = profile.fps
+    resultado = {"scenario": cenario["name"], "profile": profile.name, "clip_count": len(ranks), "duration": duration,
+                 "thumb_mode": thumb_mode, "frames_mode": frames_mode, "engine": engine}
+
+    with instrumentation.run_report(f"bench_{cenario['name']}") as report:
+        # 1. Só o render dos frames do card (PNG), com o thumb decodificado do clipe
+        layout = card_generator.CardLayout(profile.scale)
+        fonte = card_generator.VideoFrameSource(ffmpeg, src, duration=duration, fps=fps, size=layout.thumb_size)
+        t0 = time.perf_counter()
+        frames_dir = card_generator.generate_frames_for_clip(main.TEMP_DIR, ranks[0], theme_title, duration=duration,
+                                                             fps=fps, frame_source=fonte, scale=profile.scale)
+        wall = time.perf_counter() - t0
+        n_frames = len(list(Path(frames_dir).glob("frame_*.png")))
+        shutil.rmtree(frames_dir, ignore_errors=True)
+        resultado["card_frames"] = {"frames": n_frames, "wall_s": round(wall, 3),
+                                    "frames_per_s": _taxa(n_frames, wall)}
+
+        if engine == "graph":
+            resultado["program"] = medir_programa(main, ranks, dados, src, src_intro, profile, frames_mode,
+                                                  thumb_mode, duration, resultado)
+            resultado["total"] = dict(resultado["program"])
+            return finalizar(main, report, resultado)
+
+        # 2. Trechos do ranking (o primeiro usa o clipe longo, como no main)
+        clipes = []
+        t0 = time.perf_counter()
+        for idx, r in enumerate(ranks):
+            out = main.TEMP_DIR / f"pronto_{r['rank']}.mp4"
+            origem, offset = (src_intro, INTRO_DURATION) if idx == 0 else (src, 0)
+            main.criar_trecho_video(origem, theme_title, r, out, None, start_offset=offset, frames_mode=frames_mode,
+                                    thumb_mode=thumb_mode, profile=profile, duration=duration)
+            clipes.append(out)
+        wall = time.perf_counter() - t0
+        saida = sum(duracao_video(ffmpeg, c) for c in clipes)
+        resultado["clips"] = {"wall_s": round(wall, 3), "output_s": round(saida, 3),
+                              "frames_per_s": _taxa(saida * fps, wall), "output_s_per_wall_s": _taxa(saida, wall)}
+
+        # 3. Intro (TTS mudo; o drawtext precisa de uma fonte local)
+        intro = main.TEMP_DIR / "intro_final.mp4"
+        t0 = time.perf_counter()
+        try:
+            main.create_intro_video(theme_title, dados["hook_text"], intro, bg_video=src_intro, profile=profile)
+        except subprocess.CalledProcessError as e:
+            print(f"[!] Intro falhou (fonte do drawtext? INTRO_FONT={main.INTRO_FONT}): {e}")
+            # Sem a intro, concat e total medem outro vídeo: ficam registrados como pulados
+            resultado["skipped"] = pular_intro(main, e, "concat", "total")
+            intro = None
+        wall = time.perf_counter() - t0
+        if intro:
+            saida = duracao_video(ffmpeg, intro)
+            resultado["intro"] = {"wall_s": round(wall, 3), "output_s": round(saida, 3),
+                                  "output_s_per_wall_s": _taxa(saida, wall)}
+
+        # 4. Concat final
+        final = main.OUTPUT_DIR / "bench_final.mp4"
+        t0 = time.perf_counter()
+        main.concatenar_videos(([intro] if intro else []) + clipes, final)
+        wall = time.perf_counter() - t0
+        saida = duracao_video(ffmpeg, final)
+        resultado["concat"] = {"wall_s": round(wall, 3), "output_s": round(saida, 3),
+                               "output_s_per_wall_s": _taxa(saida, wall)}
+
+        total_wall = sum(resultado[k]["wall_s"] for k in ("clips", "intro", "concat") if k in resultado)
+        resultado["total"] = {"wall_s": round(total_wall, 3), "output_s": round(saida, 3),
+                              "output_s_per_wall_s": _taxa(saida, total_wall)}
+    return finalizar(main, report, resultado)
+
+
+def medir_programa(main, ranks, dados, src, src_intro, profile, frames_mode, thumb_mode, duration, resultado):
+    """Motor graph: intro + trechos renderizados e codificados num único ffmpeg (sem concat)."""
+    theme_title = dados["theme_title"]
+    final = main.OUTPUT_DIR / "bench_final.mp4"
+    trechos = [(src_intro, r, INTRO_DURATION) if idx == 0 else (src, r, 0) for idx, r in enumerate(ranks)]
+    t0 = time.perf_counter()
+    narracao = main.tts.synthesize(main.intro_narration_text(theme_title, dados["hook_text"]))
+    intro = (theme_title, dados["hook_text"], narracao, src_intro)
+    try:
+        main.renderizar_programa(trechos, [(profile, final)], theme_title, intro=intro, frames_mode=frames_mode,
+                                 thumb_mode=thumb_mode, duration=duration, frames_dir=main.TEMP_DIR)
+    except subprocess.CalledProcessError as e:
+        print(f"[!] Render com intro falhou (fonte do drawtext? INTRO_FONT={main.INTRO_FONT}): {e}")
+        resultado["skipped"] = pular_intro(main, e, "program", "total")
+        t0 = time.perf_counter()
+        main.renderizar_programa(trechos, [(profile, final)], theme_title, frames_mode=frames_mode,
+                                 thumb_mode=thumb_mode, duration=duration, frames_dir=main.TEMP_DIR)
+    wall = time.perf_counter() - t0
+    saida = duracao_video(main.FFMPEG_EXE, final)
+    return {"wall_s": round(wall, 3), "output_s": round(saida, 3), "output_s_per_wall_s": _taxa(saida, wall)}
+
+
+def finalizar(main, report, resultado):
+    import instrumentation
+    resultado["peak_rss_mb"] = instrumentation.peak_rss_mb()
+    resultado["child_peak_rss_mb"] = max((s.child_peak_rss_mb or 0 for s in report.stages), default=None)
+    shutil.rmtree(main.TEMP_DIR, ignore_errors=True)
+    shutil.rmtree(main.OUTPUT_DIR, ignore_errors=True)
+    return resultado
+
+
+def pular_intro(main, erro, *etapas):
+    """Etapas que não puderam ser medidas como na baseline (a intro e as que dependem dela), com o motivo."""
+    motivo = f"intro falhou (drawtext sem fonte ou ffmpeg sem drawtext? INTRO_FONT={main.INTRO_FONT}): {erro}"
+    return {"intro": motivo, **{etapa: "sem a intro" for etapa in etapas}}
+
+
+def rodar_em_subprocesso(cenario, work_dir):
+    """Roda o cenário num processo Python novo e lê o JSON que ele devolve."""
+    saida_json = Path(work_dir) / f"result_{cenario['name']}.json"
+    cmd = [sys.executable, str(Path(__file__).absolute()), "--worker", json.dumps(cenario),
+           "--workdir", str(work_dir), "--worker-out", str(saida_json)]
+    subprocess.run(cmd, check=True, cwd=str(REPO_DIR))
+    with open(saida_json, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _pegar(d, caminho):
+    for parte in caminho.split("."):
+        if not isinstance(d, dict) or parte not in d:
+            return None
+        d = d[parte]
+    return d
+
+
+def mediana_de(resultados):
+    """
+    Mediana métrica a métrica entre as repetições do mesmo cenário: uma rodada
+    atrapalhada pela máquina (ou sortuda) não move o resultado nem a baseline.
+    """
+    primeiro = resultados[0]
+    if isinstance(primeiro, dict):
+        return {k: mediana_de([r.get(k) for r in resultados]) for k in primeiro}
+    numeros = [r for r in resultados if isinstance(r, (int, float)) and not isinstance(r, bool)]
+    if not numeros or len(numeros) != len(resultados):
+        return primeiro
+    return round(statistics.median(numeros), 3)
+
+
+def info_maquina(ffmpeg_exe):
+    try:
+        versao = subprocess.run([ffmpeg_exe, "-version"], capture_output=True, text=True).stdout.splitlines()[0]
+    except (OSError, IndexError):
+        versao = None
+    return {"platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+            "python": platform.python_version(), "ffmpeg": versao}
+
+
+def _piorou(valor, base, maior_melhor, tol):
+    delta = (valor - base) / base
+    return delta < -tol if maior_melhor else delta > tol
+
+
+def comparar(resultados, baseline, tolerancia=TOLERANCE, tolerancia_mem=0.20, rodadas=None):
+    """
+    Compara a mediana de cada métrica com a baseline; devolve a lista de regressões.
+    Com as rodadas, só reprova se nem a melhor delas ficar dentro da tolerância:
+    ruído da máquina deixa uma rodada lenta, não todas. Uma etapa pulada
+    (skipped, ex: intro sem drawtext) que a baseline mediu também reprova.
+    """
+    regressoes = []
+    base = baseline.get("results", {})
+    rodadas = rodadas or {}
+    print(f"\n{'cenário':<26}{'métrica':<30}{'baseline':>11}{'atual':>11}{'delta':>9}")
+    for nome, atual in resultados.items():
+        if nome not in base:
+            print(f"{nome:<26}(sem baseline)")
+            continue
+        pulados = atual.get("skipped") or {}
+        for caminho, maior_melhor in METRICS:
+            a, b = _pegar(atual, caminho), _pegar(base[nome], caminho)
+            etapa = caminho.split(".")[0]
+            if etapa in pulados:
+                if b:
+                    print(f"{nome:<26}{caminho:<30}{b:>11}{'pulada':>11}{'':>9}  <-- PULADA: {pulados[etapa]}")
+                    regressoes.append((nome, caminho, b, None))
+                continue
+            if not a or not b:
+                continue
+            delta = (a - b) / b
+            tol = tolerancia if maior_melhor else tolerancia_mem
+            piorou = _piorou(a, b, maior_melhor, tol)
+            wall_base = _pegar(base[nome], caminho.rsplit(".", 1)[0] + ".wall_s") if "." in caminho else None
+            valores = [v for v in (_pegar(r, caminho) for r in rodadas.get(nome, [])) if v]
+            melhor = (max(valores) if maior_melhor else min(valores)) if valores else a
+            if piorou and wall_base is not None and wall_base < MIN_WALL_S:
+                piorou = False
+                marca = "  (curto demais, ignorado)"
+            elif piorou and not _piorou(melhor, b, maior_melhor, tol):
+                piorou = False
+                marca = f"  (ruído: melhor rodada {melhor})"
+            else:
+                marca = "  <-- REGRESSÃO" if piorou else ""
+            print(f"{nome:<26}{caminho:<30}{b:>11}{a:>11}{delta:>+9.1%}{marca}")
+            if piorou:
+                regressoes.append((nome, caminho, b, a))
+    return regressoes
+
+
+def imprimir(resultados):
+    print(f"\n{'cenário':<30}{'card fps':>10}{'clipes x':>10}{'intro x':>9}{'concat x':>10}{'graph x':>9}{'total x':>9}"
+          f"{'RSS MB':>8}{'ffmpeg MB':>11}")
+    for nome, r in resultados.items():
+        print(f"{nome:<30}{_pegar(r, 'card_frames.frames_per_s') or '-':>10}{_pegar(r, 'clips.output_s_per_wall_s') or '-':>10}"
+              f"{_pegar(r, 'intro.output_s_per_wall_s') or '-':>9}{_pegar(r, 'concat.output_s_per_wall_s') or '-':>10}"
+              f"{_pegar(r, 'program.output_s_per_wall_s') or '-':>9}"
+              f"{_pegar(r, 'total.output_s_per_wall_s') or '-':>9}{r.get('peak_rss_mb') or '-':>8}{r.get('child_peak_rss_mb') or '-':>11}")
+    print("(x = segundos de vídeo gerados por segundo de relógio)")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de render.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--only", nargs="*", default=None, help="roda só estes cenários da suíte")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições por cenário (vale a mediana)")
+    parser.add_argument("--workdir", default=None, help="pasta de trabalho (padrão: temporária)")
+    parser.add_argument("--keep", action="store_true", help="não apaga a pasta de trabalho")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como nova baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="queda de throughput aceita (0.15 = 15%%)")
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-out", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        resultado = rodar_cenario(json.loads(args.worker), args.workdir)
+        with open(args.worker_out, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+        return 0
+
+    configurar_ambiente()
+    import imageio_ffmpeg
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    cenarios = [c for c in SUITES[args.suite] if not args.only or c["name"] in args.only]
+    work_dir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="bench_ranking_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        # Fontes sintéticas fora da medição
+        fontes_dir = work_dir / "sources"
+        fontes_dir.mkdir(exist_ok=True)
+        for dur in sorted({c["duration"] for c in cenarios} | {c["duration"] + INTRO_DURATION for c in cenarios}):
+            sintetizar_clipe(ffmpeg, fontes_dir / f"src_{dur:g}s.mp4", dur)
+
+        resultados, rodadas = {}, {}
+        for c in cenarios:
+            rodadas[c["name"]] = []
+            for i in range(args.repeat):
+                print(f"[*] Cenário {c['name']} ({i + 1}/{args.repeat})...")
+                rodadas[c["name"]].append(rodar_em_subprocesso(c, work_dir))
+            resultados[c["name"]] = mediana_de(rodadas[c["name"]])
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    imprimir(resultados)
+    relatorio = {"suite": args.suite, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat,
+                 "machine": info_maquina(ffmpeg), "results": resultados}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    pulados = {nome: r["skipped"] for nome, r in resultados.items() if r.get("skipped")}
+    for nome, etapas in pulados.items():
+        print(f"[!] {nome}: etapas puladas ({', '.join(etapas)}): {etapas.get('intro', '')}")
+
+    if args.save_baseline:
+        if pulados:
+            print("[!] A baseline fica sem as métricas das etapas puladas: grave-a com um ffmpeg que tenha drawtext.")
+        baseline = {"results": {}}
+        if Path(args.baseline).exists():
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update({k: v for k, v in relatorio.items() if k != "results"})
+        # Etapas puladas não entram: a baseline só guarda o que foi medido de fato
+        baseline.setdefault("results", {}).update(
+            {nome: {k: v for k, v in r.items() if k not in r.get("skipped", {})} for nome, r in resultados.items()})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n[*] Baseline gravada em {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).exists():
+        print("\n[!] Sem baseline para comparar (use --save-baseline).")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("machine", {}).get("cpu_count") != os.cpu_count():
+        print(f"\n[!] Baseline gravada noutra máquina ({baseline.get('machine')}); compare com cuidado.")
+    regressoes = comparar(resultados, baseline, tolerancia=args.tolerance, rodadas=rodadas)
+    if regressoes:
+        print(f"\n[!] {len(regressoes)} regressão(ões) acima da tolerância.")
+        return 1
+    print("\n[*] Sem regressões em relação à baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
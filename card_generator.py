@@ -1,30 +1,81 @@
 import os
 import re
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance, ImageChops
 import math
+import time
 import subprocess
+import threading
+import itertools
+import multiprocessing
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import instrumentation
 
-# Usaremos fontes do sistema
-FONT_PATH_BOLD = "C:/Windows/Fonts/arialbd.ttf"
-FONT_PATH_REGULAR = "C:/Windows/Fonts/arial.ttf"
+try:
+    import numpy as np
+except ImportError: # Backend NumPy é opcional (CARD_BACKEND)
+    np = None
 
-def generate_frames_for_clip(temp_dir, rank_info, theme_title, video_frames_dir=None, duration=5.0, fps=30):
-    """
-    Gera uma sequência de imagens PNG transparentes (frames) com o card animado.
-    """
-    frames_dir = Path(temp_dir) / f"frames_{rank_info['rank']}"
-    frames_dir.mkdir(exist_ok=True)
-    
-    total_frames = int(duration * fps)
-    
-    # Textos
-    rank = f"#{rank_info['rank']}"
-    artist = rank_info['artist']
-    song = rank_info['song']
-    stat = rank_info['stat']
-    
-    # Tentar extrair número e sufixo do stat (ex: "2.5 Billion Views" -> 2.5, " Billion Views")
+# Usaremos fontes do sistema (CARD_FONT_BOLD / CARD_FONT_REGULAR trocam, ex: no Linux)
+FONT_PATH_BOLD = os.getenv("CARD_FONT_BOLD", "C:/Windows/Fonts/arialbd.ttf")
+FONT_PATH_REGULAR = os.getenv("CARD_FONT_REGULAR", "C:/Windows/Fonts/arial.ttf")
+
+# Composição dos frames: "pil", "numpy" ou "auto" (NumPy quando instalado)
+CARD_BACKEND = os.getenv("CARD_BACKEND", "auto")
+
+SLIDE_DURATION = 0.8
+COUNT_DURATION = 1.5
+# Margem transparente (px) em volta da faixa do card na folha
+BAND_MARGIN = 8
+
+# Cores
+NEON_COLOR = (0, 255, 128, 255) # Verde neon
+
+
+# Fontes já abertas, por thread (FreeType não é compartilhado entre threads):
+# num batch os renders seguintes não reabrem os .ttf
+_fonts_cache = threading.local()
+
+
+def load_fonts(scale=1.0):
+    """Carrega as fontes do card (com fallback para a fonte padrão do PIL), com cache por thread."""
+    cache = getattr(_fonts_cache, "fonts", None)
+    if cache is None:
+        cache = _fonts_cache.fonts = {}
+    if scale not in cache:
+        cache[scale] = _open_fonts(scale)
+    return cache[scale]
+
+
+def stat_atlas(scale=1.0):
+    """Atlas de glifos do contador para a fonte "stat" nesta escala (um por thread, como as fontes)."""
+    atlases = getattr(_fonts_cache, "atlases", None)
+    if atlases is None:
+        atlases = _fonts_cache.atlases = {}
+    if scale not in atlases:
+        atlases[scale] = GlyphAtlas(load_fonts(scale)["stat"])
+    return atlases[scale]
+
+
+def _open_fonts(scale):
+    def size(v):
+        return max(1, int(round(v * scale)))
+    try:
+        return {
+            "rank": ImageFont.truetype(FONT_PATH_BOLD, size(140)),
+            "song": ImageFont.truetype(FONT_PATH_BOLD, size(60)),
+            "artist": ImageFont.truetype(FONT_PATH_REGULAR, size(45)),
+            "stat": ImageFont.truetype(FONT_PATH_BOLD, size(50)),
+            "title": ImageFont.truetype(FONT_PATH_BOLD, size(70)),
+        }
+    except IOError:
+        default = ImageFont.load_default()
+        return {k: default for k in ("rank", "song", "artist", "stat", "title")}
+
+
+def parse_stat(stat):
+    """Separa número e sufixo do stat (ex: "2.5 Billion Views" -> 2.5, "Billion Views")."""
     match = re.search(r'([\d\.,]+)\s*(.*)', stat)
     target_num = 0.0
     suffix = stat
@@ -35,137 +86,944 @@ def generate_frames_for_clip(temp_dir, rank_info, theme_title, video_frames_dir=
         except:
             target_num = 0.0
             suffix = stat
-            
-    # Tamanho do vídeo (9:16)
-    W, H = 1080, 1920
-    
-    # Cores
-    neon_color = (0, 255, 128, 255) # Verde neon
-    bg_color = (20, 20, 30, 200) # Dark glass
-    text_color = (255, 255, 255, 255)
-    
-    # Fontes
-    try:
-        font_rank = ImageFont.truetype(FONT_PATH_BOLD, 140)
-        font_song = ImageFont.truetype(FONT_PATH_BOLD, 60)
-        font_artist = ImageFont.truetype(FONT_PATH_REGULAR, 45)
-        font_stat = ImageFont.truetype(FONT_PATH_BOLD, 50)
-        font_title = ImageFont.truetype(FONT_PATH_BOLD, 70)
-    except IOError:
-        font_rank = ImageFont.load_default()
-        font_song = ImageFont.load_default()
-        font_artist = ImageFont.load_default()
-        font_stat = ImageFont.load_default()
-        font_title = ImageFont.load_default()
-
-    # Preparar máscara circular para os frames do vídeo
-    thumb_size = 300
-    mask = Image.new("L", (thumb_size, thumb_size), 0)
-    draw_mask = ImageDraw.Draw(mask)
-    draw_mask.ellipse((0, 0, thumb_size, thumb_size), fill=255)
-    
-    last_valid_thumb = None
-    
-    for frame_idx in range(total_frames):
-        img = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        
-        t = frame_idx / fps
-        
-        # Carregar o frame do vídeo para o thumbnail
-        thumb_img = None
-        if video_frames_dir:
-            # ffmpeg geralmente começa em 1, então frame_idx + 1
-            frame_file = Path(video_frames_dir) / f"thumb_{frame_idx + 1:04d}.jpg"
-            if frame_file.exists():
-                try:
-                    thumb_raw = Image.open(frame_file).convert("RGBA")
-                    thumb_raw = thumb_raw.resize((thumb_size, thumb_size), Image.Resampling.LANCZOS)
-                    thumb_img = Image.new("RGBA", (thumb_size, thumb_size), (0,0,0,0))
-                    thumb_img.paste(thumb_raw, (0,0), mask)
-                    
-                    # Adicionar borda neon
-                    draw_thumb = ImageDraw.Draw(thumb_img)
-                    draw_thumb.ellipse((0, 0, thumb_size-1, thumb_size-1), outline=neon_color, width=8)
-                    last_valid_thumb = thumb_img
-                except Exception as e:
-                    thumb_img = last_valid_thumb
-            else:
-                thumb_img = last_valid_thumb
-        
-        # Animação de entrada (Slide de baixo para cima + Fade In)
-        slide_duration = 0.8
-        progress = min(t / slide_duration, 1.0)
-        # Ease out cubic
-        ease = 1 - pow(1 - progress, 3)
-        
-        y_offset = int((1 - ease) * 500)
-        alpha_mult = int(ease * 255)
-        
-        # Desenhar Cabeçalho (Título do Tema)
-        title_y = 150
-        # draw shadow
-        draw.text((W/2 + 5, title_y + 5), theme_title.upper(), font=font_title, fill=(0,0,0,alpha_mult), anchor="mm")
-        draw.text((W/2, title_y), theme_title.upper(), font=font_title, fill=(255,255,255,alpha_mult), anchor="mm")
-        
+    return target_num, suffix
+
+
+def text_mask(font, text):
+    """Máscara L do texto recortada no bounding box, e o deslocamento dela em relação ao ponto de desenho."""
+    box = font.getbbox(text)
+    img = Image.new("L", (max(1, box[2] - box[0]), max(1, box[3] - box[1])), 0)
+    ImageDraw.Draw(img).text((-box[0], -box[1]), text, font=font, fill=255)
+    return img, box[:2]
+
+
+class GlyphAtlas:
+    """
+    Contador (odômetro) montado com glifos já rasterizados: dígitos e
+    separadores uma vez por fonte, o sufixo (ex: " Billion Views") como um
+    sprite só. Cada valor montado fica em cache como máscara L; o contador
+    passa a maior parte do clipe parado no valor final, então quase todo
+    frame reaproveita a mesma máscara sem passar pelo FreeType.
+    """
+
+    GLYPHS = "0123456789.,-"
+    # Valores montados guardados (o atlas é compartilhado entre clipes da thread)
+    MAX_VALUES = 1024
+
+    def __init__(self, font):
+        self.font = font
+        self._sprites = {}
+        self._values = {}
+
+    def _sprite(self, text):
+        """(máscara L, deslocamento, avanço) de um glifo ou trecho de texto."""
+        sprite = self._sprites.get(text)
+        if sprite is None:
+            img, offset = text_mask(self.font, text)
+            sprite = self._sprites[text] = (img, offset, self.font.getlength(text))
+        return sprite
+
+    def mask(self, text):
+        """Máscara L do texto e o deslocamento dela em relação ao ponto de desenho (como draw.text)."""
+        cached = self._values.get(text)
+        if cached is not None:
+            return cached
+        n = len(text) - len(text.lstrip(self.GLYPHS))
+        partes = list(text[:n]) + ([text[n:]] if text[n:] else []) or [" "]
+        pecas = []
+        x = 0.0
+        for parte in partes:
+            img, (dx, dy), avanco = self._sprite(parte)
+            pecas.append((img, int(x) + dx, dy))
+            x += avanco
+        x0 = min(px for _, px, _ in pecas)
+        y0 = min(py for _, _, py in pecas)
+        x1 = max(px + img.width for img, px, _ in pecas)
+        y1 = max(py + img.height for img, _, py in pecas)
+        mask = Image.new("L", (x1 - x0, y1 - y0), 0)
+        for img, px, py in pecas:
+            # Glifos que se sobrepõem ficam com o maior alpha (como o FreeType do PIL faz)
+            box = (px - x0, py - y0, px - x0 + img.width, py - y0 + img.height)
+            mask.paste(ImageChops.lighter(mask.crop(box), img), box)
+        if len(self._values) >= self.MAX_VALUES:
+            self._values.clear()
+        cached = self._values[text] = (mask, (x0, y0))
+        return cached
+
+    def bbox(self, xy, text):
+        mask, (dx, dy) = self.mask(text)
+        x, y = xy[0] + dx, xy[1] + dy
+        return (x, y, x + mask.width, y + mask.height)
+
+    def draw(self, canvas, xy, text, fill):
+        """Equivale a draw.text(xy, text, fill=fill) num canvas RGBA."""
+        mask, _ = self.mask(text)
+        canvas.paste(fill, self.bbox(xy, text), mask)
+
+
+def _alpha_lut(alpha_mult):
+    return [p * alpha_mult // 255 for p in range(256)]
+
+
+def _faded(sprite, alpha_mult):
+    """Cópia do sprite com o canal alpha multiplicado por alpha_mult/255."""
+    if alpha_mult >= 255:
+        return sprite
+    faded = sprite.copy()
+    faded.putalpha(sprite.getchannel("A").point(_alpha_lut(alpha_mult)))
+    return faded
+
+
+def _intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def build_thumb_layers(size=300, ring_width=8):
+    """Máscara circular (L) e anel neon (RGBA) do thumbnail animado."""
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+    ring = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(ring).ellipse((0, 0, size - 1, size - 1), outline=NEON_COLOR, width=ring_width)
+    return mask, ring
+
+
+def write_thumb_layers(out_dir, size=300, ring_width=8):
+    """Grava máscara e anel do thumbnail em PNG (para o modo filtergraph do ffmpeg)."""
+    mask_path = Path(out_dir) / f"thumb_mask_{size}.png"
+    ring_path = Path(out_dir) / f"thumb_ring_{size}_{ring_width}.png"
+    if not (mask_path.exists() and ring_path.exists()):
+        mask, ring = build_thumb_layers(size, ring_width)
+        # Grava num nome temporário e renomeia: vários renders podem chamar ao mesmo tempo
+        for img, path in ((mask, mask_path), (ring, ring_path)):
+            tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.png")
+            img.save(tmp)
+            os.replace(tmp, path)
+    return str(mask_path), str(ring_path)
+
+
+def _even(v):
+    return int(v) // 2 * 2
+
+
+def animated_frame_count(duration=5.0, fps=30):
+    """Quantos frames iniciais do card mudam (slide + contador); o resto é igual ao último."""
+    fim_animacao = SLIDE_DURATION - 0.2 + COUNT_DURATION
+    return min(int(duration * fps), math.ceil(fim_animacao * fps) + 1)
+
+
+class CardLayout:
+    """
+    Geometria do card, numa "folha" com a largura do quadro 9:16 e só duas
+    faixas: a do título (no topo) e a do card com o espaço do slide. Cada
+    formato de saída (9:16, 1:1, 16:9...) recebe as duas faixas na sua posição
+    pelo filter graph (bands_filter): um único render do card serve a todos.
+    Os valores são os do quadro 1080x1920; scale reduz tudo junto (perfil draft).
+    """
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+        s = self.scaled
+
+        # Largura do quadro 9:16 (o título é centralizado nela)
+        self.W = s(1080)
+
         # Parâmetros do Card Central
-        card_w = 900
-        card_h = 500
-        card_x = (W - card_w) // 2
-        card_y = (H - card_h) // 2 + y_offset
-        
-        # Desenhar Shadow do Card
-        shadow_rect = [card_x - 10, card_y - 10, card_x + card_w + 10, card_y + card_h + 10]
-        draw.rounded_rectangle(shadow_rect, radius=40, fill=(0, 0, 0, int(100 * ease)))
-        
-        # Desenhar Fundo do Card (Glass)
-        card_rect = [card_x, card_y, card_x + card_w, card_y + card_h]
-        draw.rounded_rectangle(card_rect, radius=30, fill=(20, 20, 30, int(220 * ease)), outline=neon_color, width=4)
-        
-        # Desenhar Rank
-        draw.text((card_x + 50, card_y + 50), rank, font=font_rank, fill=neon_color[:3] + (alpha_mult,))
-        
-        # Desenhar Thumbnail (AGORA ANIMADO COM O CLIPE)
-        if thumb_img:
-            # Misturar alpha do thumb com o alpha da animação
-            t_img = thumb_img.copy()
-            if alpha_mult < 255:
-                t_img.putalpha(t_img.split()[3].point(lambda p: p * (alpha_mult/255.0)))
-            img.paste(t_img, (card_x + card_w - 350, card_y + 100), t_img)
-            
-        # Textos: Song e Artist
-        text_start_x = card_x + 50
-        song_y = card_y + 220
-        artist_y = song_y + 70
-        
+        self.card_w = s(900)
+        self.card_h = s(500)
+        self.title_y = s(150)
+        self.title_shadow = s(5)
+        self.slide_px = s(500)
+
+        self.card_pad = s(10)
+        self.shadow_radius = s(40)
+        self.card_radius = s(30)
+        self.outline_width = max(1, s(4))
+
+        self.thumb_size = s(300)
+        self.ring_width = max(1, s(8))
+        self.thumb_dx = self.card_w - s(350)
+        self.thumb_dy = s(100)
+        self.text_dx = s(50)
+        self.rank_dy = s(50)
+        self.song_dy = s(220)
+        self.artist_dy = self.song_dy + s(70)
+        self.stat_dy = self.artist_dy + s(100)
+
+        # Faixas da folha (alturas pares para o chroma 4:2:0); a do card tem uma
+        # margem transparente em volta, então recortar não muda a conversão de cor
+        self.title_band_h = _even(s(300))
+        self.card_band_y = self.title_band_h
+        self.card_band_h = _even(2 * BAND_MARGIN + self.card_h + 2 * self.card_pad + 1 + self.slide_px)
+        self.card_x = (self.W - self.card_w) // 2
+        self.card_y = self.card_band_y + BAND_MARGIN + self.card_pad
+        self.H = self.card_band_y + self.card_band_h
+
+    def band_offsets(self, frame_w, frame_h):
+        """(x, y da faixa do título, y da faixa do card) num quadro frame_w x frame_h, com o card centralizado."""
+        card_y = (frame_h - self.card_h) // 2
+        return _even((frame_w - self.W) // 2), 0, _even(card_y - self.card_pad - BAND_MARGIN)
+
+    def bands_filter(self, card_in, targets, fades="", prefix=""):
+        """
+        Cadeia do filter_complex que leva a folha do card para vários quadros.
+        targets: lista de (fundo, largura, altura, saída); fades: filtros
+        aplicados a cada faixa antes do overlay (ex: fade de entrada/saída).
+        prefix vai nos rótulos internos (vários clipes no mesmo filter graph).
+        Cada faixa vira yuva420p antes dos fades (o fade age sobre o YUV, como
+        no quadro inteiro): em 9:16 o resultado é idêntico a sobrepor o quadro todo.
+        """
+        n = len(targets)
+        p = prefix
+        partes = [f"[{card_in}]split={2 * n}" + "".join(f"[{p}cb{i}]" for i in range(2 * n))]
+        for i, (bg, w, h, out) in enumerate(targets):
+            x, y_title, y_card = self.band_offsets(w, h)
+            partes += [
+                f"[{p}cb{2 * i}]crop={self.W}:{self.title_band_h}:0:0,format=yuva420p{fades}[{p}tb{i}]",
+                f"[{p}cb{2 * i + 1}]crop={self.W}:{self.card_band_h}:0:{self.card_band_y},format=yuva420p{fades}[{p}kb{i}]",
+                f"[{bg}][{p}tb{i}]overlay={x}:{y_title}[{p}tv{i}]",
+                f"[{p}tv{i}][{p}kb{i}]overlay={x}:{y_card}[{out}]",
+            ]
+        return ";".join(partes)
+
+    def scaled(self, v):
+        return int(round(v * self.scale))
+
+    def thumb_overlay_xy(self):
+        """Posição do thumbnail como expressões do filtro overlay (segue o slide do card)."""
+        x = self.card_x + self.thumb_dx
+        y = f"{self.card_y + self.thumb_dy}+trunc({self.slide_px}*pow(1-min(t/{SLIDE_DURATION},1),3))"
+        return str(x), y
+
+    def thumb_filter(self, video_in, mask_in, ring_in, card_in, out, fps=30, prefix=""):
+        """
+        Cadeia do filter_complex que monta o thumbnail circular dentro do ffmpeg:
+        recorta o vídeo, aplica a máscara (alphamerge) e o anel, faz o fade
+        de entrada por expressão e sobrepõe no card.
+        """
+        size = self.thumb_size
+        p = prefix
+        x, y = self.thumb_overlay_xy()
+        # Alpha segue o mesmo ease out cubic do slide; depois do slide o geq fica desligado
+        fade_alpha = f"alpha(X,Y)*(1-pow(1-min(T/{SLIDE_DURATION},1),3))"
+        return (
+            f"[{video_in}]fps={fps},crop='min(iw,ih)':'min(iw,ih)',scale={size}:{size},format=rgba[{p}th_rgb];"
+            f"[{mask_in}]format=gray[{p}th_mask];"
+            f"[{p}th_rgb][{p}th_mask]alphamerge[{p}th_round];"
+            f"[{p}th_round][{ring_in}]overlay=0:0:format=auto[{p}th_ring];"
+            f"[{p}th_ring]geq=r='r(X,Y)':g='g(X,Y)':b='b(X,Y)':a='{fade_alpha}':enable='lt(t,{SLIDE_DURATION})'[{p}th_fade];"
+            f"[{card_in}][{p}th_fade]overlay=x={x}:y='{y}':eval=frame:format=auto[{out}]"
+        )
+
+
+class CardRenderer(CardLayout):
+    """
+    Renderizador em camadas do card animado.
+
+    Título, sombra, vidro, rank, música e artista são rasterizados uma única
+    vez por clipe. Por frame só se compõe o que anima: o slide de entrada
+    (offset + alpha), o contador e o thumbnail circular. Depois do slide cada
+    frame é a base em cache mais os retângulos sujos do contador e do thumb.
+
+    A imagem devolvida por render() é reutilizada entre chamadas.
+    """
+
+    # Camadas estáticas: calculadas uma vez e compartilhadas com os workers do render paralelo
+    STATIC_LAYERS = ("title_sprite", "title_pos", "card_body", "card_outline",
+                     "base_under", "base_full", "text_boxes")
+
+    def __init__(self, rank_info, theme_title, fps=30, static_layers=None, scale=1.0):
+        super().__init__(scale)
+        self.fps = fps
+        self.fonts = load_fonts(scale)
+
+        self.stat = rank_info['stat']
+        self.target_num, self.suffix = parse_stat(self.stat)
+        self.stat_atlas = stat_atlas(scale)
+
         # Truncar nomes muito longos
+        song = rank_info['song']
+        artist = rank_info['artist']
         display_song = song if len(song) < 22 else song[:19] + "..."
         display_artist = artist if len(artist) < 25 else artist[:22] + "..."
-        
-        draw.text((text_start_x, song_y), display_song, font=font_song, fill=(255,255,255,alpha_mult))
-        draw.text((text_start_x, artist_y), display_artist, font=font_artist, fill=(180,180,180,alpha_mult))
-        
-        # Animação do Contador (Odômetro)
-        count_duration = 1.5
-        count_progress = min(max(t - slide_duration + 0.2, 0) / count_duration, 1.0)
+        # (offset relativo ao card, texto, fonte, cor)
+        self.card_texts = [
+            ((self.text_dx, self.song_dy), display_song, self.fonts["song"], (255, 255, 255)),
+            ((self.text_dx, self.artist_dy), display_artist, self.fonts["artist"], (180, 180, 180)),
+        ]
+
+        if static_layers:
+            for name in self.STATIC_LAYERS:
+                setattr(self, name, static_layers[name])
+        else:
+            self._build_static_layers(f"#{rank_info['rank']}", theme_title.upper())
+
+        self.thumb_mask, self.thumb_ring = build_thumb_layers(self.thumb_size, self.ring_width)
+
+        self._thumb_buf = Image.new("RGBA", (self.thumb_size, self.thumb_size), (0, 0, 0, 0))
+
+        self.canvas = Image.new("RGBA", (self.W, self.H), (0, 0, 0, 0))
+        self._draw = ImageDraw.Draw(self.canvas)
+        self._settled = False
+
+    def static_layers(self):
+        return {name: getattr(self, name) for name in self.STATIC_LAYERS}
+
+    def reset(self):
+        """Esquece o estado do frame anterior (o próximo render desenha a base inteira)."""
+        self._settled = False
+
+    def _build_static_layers(self, rank, title):
+        W, H = self.W, self.H
+        font_title = self.fonts["title"]
+
+        # Título do tema (com sombra), recortado no seu bounding box
+        layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        draw.text((W/2 + self.title_shadow, self.title_y + self.title_shadow), title, font=font_title, fill=(0, 0, 0, 255), anchor="mm")
+        draw.text((W/2, self.title_y), title, font=font_title, fill=(255, 255, 255, 255), anchor="mm")
+        box = layer.getbbox() or (0, 0, 1, 1)
+        self.title_sprite = layer.crop(box)
+        self.title_pos = box[:2]
+
+        # Corpo do card (sombra + vidro + rank) relativo a (card_x - pad, card_y - pad)
+        pad = self.card_pad
+        size = (self.card_w + 2 * pad + 1, self.card_h + 2 * pad + 1)
+        self.card_body = Image.new("RGBA", size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(self.card_body)
+        draw.rounded_rectangle([0, 0, self.card_w + 2 * pad, self.card_h + 2 * pad], radius=self.shadow_radius, fill=(0, 0, 0, 100))
+        draw.rounded_rectangle([pad, pad, pad + self.card_w, pad + self.card_h], radius=self.card_radius, fill=(20, 20, 30, 220))
+        draw.text((pad + self.text_dx, pad + self.rank_dy), rank, font=self.fonts["rank"], fill=NEON_COLOR)
+
+        # A borda neon não participa do fade
+        self.card_outline = Image.new("RGBA", size, (0, 0, 0, 0))
+        ImageDraw.Draw(self.card_outline).rounded_rectangle(
+            [pad, pad, pad + self.card_w, pad + self.card_h], radius=self.card_radius, outline=NEON_COLOR, width=self.outline_width)
+        self.card_body.paste(self.card_outline, (0, 0), self.card_outline)
+
+        # Base final (sem thumb e sem contador): em baixo dos textos e completa
+        self.base_under = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+        self.base_under.paste(self.title_sprite, self.title_pos)
+        self.base_under.paste(self.card_body, (self.card_x - pad, self.card_y - pad))
+        self.base_full = self.base_under.copy()
+        draw = ImageDraw.Draw(self.base_full)
+        self.text_boxes = []
+        for (dx, dy), text, font, color in self.card_texts:
+            xy = (self.card_x + dx, self.card_y + dy)
+            draw.text(xy, text, font=font, fill=color + (255,))
+            self.text_boxes.append(draw.textbbox(xy, text, font=font))
+
+    def ease_at(self, t):
+        # Ease out cubic
+        progress = min(t / SLIDE_DURATION, 1.0)
+        return 1 - pow(1 - progress, 3)
+
+    def stat_text_at(self, t):
+        """Texto do contador (odômetro) no instante t."""
+        count_progress = min(max(t - SLIDE_DURATION + 0.2, 0) / COUNT_DURATION, 1.0)
         # Ease out quad for counter
         c_ease = 1 - (1 - count_progress) * (1 - count_progress)
-        
-        current_num = target_num * c_ease
-        
-        if target_num > 0:
-            if isinstance(target_num, float) and target_num < 100: # Ex: 2.5 Billion
-                display_stat = f"{current_num:.1f} {suffix}"
-            else: # Ex: 2500000
-                display_stat = f"{int(current_num):,} {suffix}".replace(',', '.')
+        current_num = self.target_num * c_ease
+
+        if self.target_num > 0:
+            if isinstance(self.target_num, float) and self.target_num < 100: # Ex: 2.5 Billion
+                return f"{current_num:.1f} {self.suffix}"
+            # Ex: 2500000
+            return f"{int(current_num):,} {self.suffix}".replace(',', '.')
+        return self.stat # Se falhou ao extrair, mostra estático
+
+    def prepare_thumb(self, thumb_raw):
+        """Aplica a máscara circular e o anel neon a um frame RGB(A) de thumb_size."""
+        if thumb_raw.size != (self.thumb_size, self.thumb_size):
+            thumb_raw = thumb_raw.resize((self.thumb_size, self.thumb_size), Image.Resampling.LANCZOS)
+        # Reaproveita o mesmo buffer RGBA a cada frame
+        thumb_img = self._thumb_buf
+        thumb_img.paste(thumb_raw, (0, 0))
+        thumb_img.putalpha(self.thumb_mask)
+        thumb_img.paste(self.thumb_ring, (0, 0), self.thumb_ring)
+        return thumb_img
+
+    def render(self, frame_idx, thumb_img=None):
+        """Renderiza o frame frame_idx; thumb_img já vem de prepare_thumb()."""
+        t = frame_idx / self.fps
+        ease = self.ease_at(t)
+        if ease < 1.0:
+            self._settled = False
+            return self._render_sliding(t, ease, thumb_img)
+        return self._render_settled(t, thumb_img)
+
+    # Primitivas de composição (o backend NumPy troca só estas)
+
+    def _clear(self):
+        self.canvas.paste((0, 0, 0, 0), (0, 0, self.W, self.H))
+
+    def _paste_base(self):
+        self.canvas.paste(self.base_full, (0, 0))
+
+    def _paste_layer(self, name, xy, alpha_mult=255):
+        """Copia a camada estática (sem blend), com o alpha multiplicado."""
+        self.canvas.paste(_faded(getattr(self, name), alpha_mult), xy)
+
+    def _blend_layer(self, name, xy):
+        layer = getattr(self, name)
+        self.canvas.paste(layer, xy, layer)
+
+    def _blend_thumb(self, thumb_img, xy, alpha_mult=255):
+        t_img = _faded(thumb_img, alpha_mult)
+        self.canvas.paste(t_img, xy, t_img)
+
+    def _draw_text(self, i, xy, alpha_mult=255):
+        _, text, font, color = self.card_texts[i]
+        self._draw.text(xy, text, font=font, fill=color + (alpha_mult,))
+
+    def _draw_stat(self, xy, text, fill):
+        self.stat_atlas.draw(self.canvas, xy, text, fill)
+
+    def _restore(self, box):
+        self.canvas.paste(self.base_under.crop(box), box[:2])
+
+    def _render_sliding(self, t, ease, thumb_img):
+        # Animação de entrada (Slide de baixo para cima + Fade In)
+        self._clear()
+
+        y_offset = int((1 - ease) * self.slide_px)
+        alpha_mult = int(ease * 255)
+        card_x, card_y = self.card_x, self.card_y + y_offset
+
+        self._paste_layer("title_sprite", self.title_pos, alpha_mult)
+        pos = (card_x - self.card_pad, card_y - self.card_pad)
+        self._paste_layer("card_body", pos, alpha_mult)
+        self._blend_layer("card_outline", pos)
+
+        if thumb_img is not None:
+            self._blend_thumb(thumb_img, (card_x + self.thumb_dx, card_y + self.thumb_dy), alpha_mult)
+
+        for i, ((dx, dy), _, _, _) in enumerate(self.card_texts):
+            self._draw_text(i, (card_x + dx, card_y + dy), alpha_mult)
+        self._draw_stat((card_x + self.text_dx, card_y + self.stat_dy), self.stat_text_at(t),
+                        NEON_COLOR[:3] + (alpha_mult,))
+        return self.canvas
+
+    def _render_settled(self, t, thumb_img):
+        if not self._settled:
+            self._paste_base()
+            self._settled = True
+            self._thumb_drawn = False
+            self._stat_text, self._stat_box = None, None
+
+        stat_xy = (self.card_x + self.text_dx, self.card_y + self.stat_dy)
+        stat_text = self.stat_text_at(t)
+        if stat_text != self._stat_text:
+            stat_box = self.stat_atlas.bbox(stat_xy, stat_text)
         else:
-            display_stat = stat # Se falhou ao extrair, mostra estático
+            stat_box = self._stat_box
+        thumb_xy = (self.card_x + self.thumb_dx, self.card_y + self.thumb_dy)
+        thumb_box = thumb_xy + (thumb_xy[0] + self.thumb_size, thumb_xy[1] + self.thumb_size)
+
+        # Retângulos sujos: o thumb (anterior ou atual) e o contador quando muda de valor
+        dirty = []
+        if thumb_img is not None or self._thumb_drawn:
+            dirty.append(thumb_box)
+        if stat_text != self._stat_text:
+            dirty += [b for b in (self._stat_box, stat_box) if b]
+
+        # Texto que cruza uma área restaurada precisa ser redesenhado por inteiro
+        # (redesenhar só um pedaço deixaria a borda antialias mais grossa)
+        boxes = list(enumerate(self.text_boxes)) + [("stat", stat_box)]
+        redraw = set()
+        changed = True
+        while changed:
+            changed = False
+            for key, box in boxes:
+                if key not in redraw and any(_intersects(box, d) for d in dirty):
+                    redraw.add(key)
+                    dirty.append(box)
+                    changed = True
+
+        for box in dirty:
+            self._restore(box)
+
+        if thumb_img is not None:
+            self._blend_thumb(thumb_img, thumb_xy)
+        for i, ((dx, dy), _, _, _) in enumerate(self.card_texts):
+            if i in redraw:
+                self._draw_text(i, (self.card_x + dx, self.card_y + dy))
+        if "stat" in redraw:
+            self._draw_stat(stat_xy, stat_text, NEON_COLOR)
+
+        self._thumb_drawn = thumb_img is not None
+        self._stat_text, self._stat_box = stat_text, stat_box
+        return self.canvas
+
+
+def _div255(v):
+    # Mesmo arredondamento do PIL nos pastes com máscara (DIV255)
+    v = v + 128
+    return ((v >> 8) + v) >> 8
+
+
+def _clip(W, H, x, y, w, h):
+    """Fatias (destino, origem) de um sprite w x h colado em (x, y), recortado no canvas; None se fica fora."""
+    x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, W), min(y + h, H)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+
+def _alpha_plan(alpha):
+    """
+    Classifica um alpha que não muda entre frames: máscara dos pixels opacos
+    (cópia direta, nos 4 canais) e índices da borda antialias com os pesos do blend.
+    """
+    edge = np.nonzero((alpha > 0) & (alpha < 255))
+    m = alpha[edge][:, None].astype(np.uint16)
+    return np.repeat((alpha == 255)[..., None], 4, axis=2), edge, m, 255 - m
+
+
+class NumpyCardRenderer(CardRenderer):
+    """
+    O mesmo card composto em arrays NumPy: canvas e buffers pré-alocados,
+    fades por tabela, blends vetorizados e pastes por fatias, sem Images
+    intermediárias por frame. Usa as fórmulas de arredondamento do PIL, então
+    os frames saem idênticos aos do CardRenderer.
+
+    self.canvas é uma Image sobre o mesmo buffer (só para tobytes/save).
+    """
+
+    LAYERS = ("title_sprite", "card_body", "card_outline", "base_under", "base_full")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._layers = {name: np.asarray(getattr(self, name)) for name in self.LAYERS}
+        self._buf = np.zeros((self.H, self.W, 4), np.uint8)
+        self.canvas = Image.frombuffer("RGBA", (self.W, self.H), self._buf, "raw", "RGBA", 0, 1)
+        self._text_masks = []
+        for _, text, font, _ in self.card_texts:
+            mask, offset = text_mask(font, text)
+            self._text_masks.append((np.asarray(mask), offset))
+        self._stat_masks = {}
+        self._luts = {}
+        self._thumb_mask = np.asarray(self.thumb_mask)
+        self._thumb_ring = np.asarray(self.thumb_ring)
+        self._thumb = np.zeros((self.thumb_size, self.thumb_size, 4), np.uint8)
+        self._thumb_faded = np.zeros_like(self._thumb)
+        # Anel, alpha final do thumb e borda neon não mudam: só a borda antialias precisa de conta
+        self._ring_plan = _alpha_plan(self._thumb_ring[..., 3])
+        self.prepare_thumb(Image.new("RGB", (self.thumb_size, self.thumb_size)))
+        self._thumb_plan = _alpha_plan(self._thumb[..., 3].copy())
+        self._outline_plan = _alpha_plan(self._layers["card_outline"][..., 3])
+
+    def _lut(self, alpha_mult):
+        lut = self._luts.get(alpha_mult)
+        if lut is None:
+            lut = self._luts[alpha_mult] = np.array(_alpha_lut(alpha_mult), np.uint8)
+        return lut
+
+    @staticmethod
+    def _blend(dst, src, mask):
+        """dst = src sobre dst com a máscara (mesma conta do Image.paste com máscara)."""
+        m = mask[..., None].astype(np.uint16)
+        dst[...] = _div255(dst * (255 - m) + src * m)
+
+    @staticmethod
+    def _blend_planned(dst, src, plan):
+        """_blend com a máscara = alpha de src já classificado: 255 é cópia, 0 não muda, o resto faz a conta."""
+        opaque, edge, m, inv = plan
+        np.copyto(dst, src, where=opaque)
+        if edge[0].size:
+            dst[edge] = _div255(dst[edge] * inv + src[edge] * m)
+
+    def _region(self, xy, shape):
+        return _clip(self.W, self.H, int(xy[0]), int(xy[1]), shape[1], shape[0])
+
+    def prepare_thumb(self, thumb_raw):
+        if thumb_raw.size != (self.thumb_size, self.thumb_size):
+            thumb_raw = thumb_raw.resize((self.thumb_size, self.thumb_size), Image.Resampling.LANCZOS)
+        if thumb_raw.mode not in ("RGB", "RGBA"):
+            thumb_raw = thumb_raw.convert("RGB")
+        thumb = self._thumb
+        # O packer do PIL já entrega RGBX (4 bytes por pixel): cópia contínua em vez de fatia por canal
+        raw = thumb_raw.tobytes("raw", "RGBX" if thumb_raw.mode == "RGB" else "RGBA")
+        thumb.reshape(-1)[:] = np.frombuffer(raw, np.uint8)
+        thumb[..., 3] = self._thumb_mask
+        self._blend_planned(thumb, self._thumb_ring, self._ring_plan)
+        return thumb
+
+    def _clear(self):
+        self._buf.fill(0)
+
+    def _paste_base(self):
+        self._buf[...] = self._layers["base_full"]
+
+    def _paste_layer(self, name, xy, alpha_mult=255):
+        src = self._layers[name]
+        region = self._region(xy, src.shape)
+        if region is None:
+            return
+        dst, src = self._buf[region[0]], src[region[1]]
+        dst[...] = src
+        if alpha_mult < 255:
+            dst[..., 3] = self._lut(alpha_mult)[src[..., 3]]
+
+    def _blend_layer(self, name, xy):
+        src = self._layers[name]
+        region = self._region(xy, src.shape)
+        if region is None:
+            return
+        dst = self._buf[region[0]]
+        if name == "card_outline" and dst.shape == src.shape:
+            self._blend_planned(dst, src, self._outline_plan)
+        else:
+            src = src[region[1]]
+            self._blend(dst, src, src[..., 3])
+
+    def _blend_thumb(self, thumb_img, xy, alpha_mult=255):
+        region = self._region(xy, thumb_img.shape)
+        if alpha_mult >= 255 and region is not None and self._buf[region[0]].shape == thumb_img.shape:
+            self._blend_planned(self._buf[region[0]], thumb_img, self._thumb_plan)
+            return
+        if alpha_mult < 255:
+            faded = self._thumb_faded
+            faded[...] = thumb_img
+            faded[..., 3] = self._lut(alpha_mult)[thumb_img[..., 3]]
+            thumb_img = faded
+        region = self._region(xy, thumb_img.shape)
+        if region is not None:
+            src = thumb_img[region[1]]
+            self._blend(self._buf[region[0]], src, src[..., 3])
+
+    def _fill(self, mask, xy, fill):
+        """Pinta a cor fill pela máscara (o que draw.text faz num canvas RGBA)."""
+        region = self._region(xy, mask.shape)
+        if region is None:
+            return
+        dst, mask = self._buf[region[0]], mask[region[1]]
+        ink = np.array(fill, np.uint16)
+        # Como o PIL: onde o destino é transparente a cor da tinta entra inteira (só o alpha faz blend)
+        m_cor = np.where((dst[..., 3] == 0) & (mask != 0), np.uint8(255), mask)
+        self._blend(dst[..., :3], ink[:3], m_cor)
+        m = mask.astype(np.uint16)
+        dst[..., 3] = _div255(dst[..., 3] * (255 - m) + ink[3] * m)
+
+    def _draw_text(self, i, xy, alpha_mult=255):
+        mask, (dx, dy) = self._text_masks[i]
+        color = self.card_texts[i][3]
+        self._fill(mask, (xy[0] + dx, xy[1] + dy), color + (alpha_mult,))
+
+    def _draw_stat(self, xy, text, fill):
+        mask = self._stat_masks.get(text)
+        if mask is None:
+            if len(self._stat_masks) >= GlyphAtlas.MAX_VALUES:
+                self._stat_masks.clear()
+            mask = self._stat_masks[text] = np.asarray(self.stat_atlas.mask(text)[0])
+        x0, y0, _, _ = self.stat_atlas.bbox(xy, text)
+        self._fill(mask, (x0, y0), fill)
+
+    def _restore(self, box):
+        x0, y0, x1, y1 = box
+        region = _clip(self.W, self.H, x0, y0, x1 - x0, y1 - y0)
+        if region is not None:
+            self._buf[region[0]] = self._layers["base_under"][region[0]]
+
+
+def card_renderer_class(backend=None):
+    """Classe do renderer para o backend pedido ("pil", "numpy" ou "auto")."""
+    backend = backend or CARD_BACKEND
+    if backend == "numpy" and np is None:
+        print("[!] CARD_BACKEND=numpy, mas o NumPy não está instalado; usando PIL.")
+    if backend in ("numpy", "auto") and np is not None:
+        return NumpyCardRenderer
+    return CardRenderer
+
+
+class DirectoryFrameSource:
+    """Frames do thumbnail a partir de uma pasta thumb_%04d.jpg (extração antiga)."""
+
+    def __init__(self, frames_dir):
+        self.frames_dir = Path(frames_dir)
+
+    def __iter__(self):
+        # ffmpeg geralmente começa em 1
+        idx = 1
+        while True:
+            frame_file = self.frames_dir / f"thumb_{idx:04d}.jpg"
+            if not frame_file.exists():
+                return
+            try:
+                yield Image.open(frame_file)
+            except Exception:
+                yield None
+            idx += 1
+
+
+class VideoFrameSource:
+    """
+    Decodifica o trecho do clipe uma única vez via ffmpeg (rawvideo por pipe)
+    já recortado em quadrado e no tamanho do thumbnail.
+    Sem JPEG, sem disco: cada frame é lido num buffer reutilizado, e a Image
+    entregue também é a mesma a cada iteração.
+    """
+
+    def __init__(self, ffmpeg_exe, video_path, start_offset=0, duration=7.0, fps=30, size=300):
+        self.ffmpeg_exe = ffmpeg_exe
+        self.video_path = video_path
+        self.start_offset = start_offset
+        self.duration = duration
+        self.fps = fps
+        self.size = size
+
+    def __iter__(self):
+        cmd = [
+            self.ffmpeg_exe, "-v", "error", "-ss", str(self.start_offset), "-i", str(self.video_path),
+            "-t", str(self.duration),
+            "-vf", f"fps={self.fps},crop='min(iw,ih)':'min(iw,ih)',scale={self.size}:{self.size}",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"
+        ]
+        frame_bytes = self.size * self.size * 3
+        buf = bytearray(frame_bytes)
+        view = memoryview(buf)
+        img = Image.new("RGB", (self.size, self.size))
+        proc = instrumentation.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                lidos = 0
+                while lidos < frame_bytes:
+                    n = proc.stdout.readinto(view[lidos:])
+                    if not n:
+                        return
+                    lidos += n
+                img.frombytes(buf)
+                yield img
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            instrumentation.track_process(proc)
+
+
+def iter_card_frames(rank_info, theme_title, video_frames_dir=None, duration=5.0, fps=30, frame_source=None, animated_only=False, scale=1.0):
+    """
+    Gera os frames do card animado como Images RGBA.
+    frame_source é um iterável de frames do thumbnail (ex: VideoFrameSource);
+    video_frames_dir mantém compatibilidade com a pasta de JPEGs.
+    Com animated_only=True para depois do último frame que muda (o ffmpeg repete o resto).
+    A mesma Image é reutilizada a cada frame: consuma antes de pedir o próximo.
+    """
+    total_frames = animated_frame_count(duration, fps) if animated_only else int(duration * fps)
+    renderer = card_renderer_class()(rank_info, theme_title, fps=fps, scale=scale)
+    
+    if frame_source is None and video_frames_dir:
+        frame_source = DirectoryFrameSource(video_frames_dir)
+    thumbs = iter(frame_source) if frame_source is not None else None
+    
+    last_valid_thumb = None
+    
+    try:
+        for frame_idx in range(total_frames):
+            # Frame do vídeo para o thumbnail (se acabar, repete o último válido)
+            thumb_img = None
+            if thumbs is not None:
+                thumb_raw = next(thumbs, None)
+                if thumb_raw is not None:
+                    try:
+                        thumb_img = renderer.prepare_thumb(thumb_raw)
+                        last_valid_thumb = thumb_img
+                    except Exception as e:
+                        thumb_img = last_valid_thumb
+                else:
+                    thumb_img = last_valid_thumb
             
-        stat_y = artist_y + 100
-        draw.text((text_start_x, stat_y), display_stat, font=font_stat, fill=neon_color[:3] + (alpha_mult,))
-        
-        # Salvar Frame
-        out_path = frames_dir / f"frame_{frame_idx:04d}.png"
-        img.save(out_path)
+            yield renderer.render(frame_idx, thumb_img)
+    finally:
+        if thumbs is not None and hasattr(thumbs, "close"):
+            thumbs.close()
+
+
+# --- RENDER PARALELO (process pool) ---
+
+# Renderers do processo worker por clipe (fontes + camadas estáticas). O pool
+# é do job inteiro e atende vários clipes, então cada worker guarda os últimos
+_worker_renderers = OrderedDict()
+_WORKER_RENDERERS_MAX = 4
+_clip_ids = itertools.count()
+
+
+def card_frame_pool(workers):
+    """
+    Pool de processos do render dos cards, para reaproveitar em todos os clipes
+    de um job. Usa spawn: o processo pai já tem threads (pools, TTS, pipes do
+    ffmpeg) e um fork no meio delas pode herdar locks presos.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _worker_renderer(spec):
+    """Renderer e buffer de thumbnail do clipe no worker; montados no primeiro chunk que chega."""
+    clip_id, rank_info, theme_title, fps, scale, backend = spec
+    achado = _worker_renderers.get(clip_id)
+    if achado is None:
+        # Montar as camadas estáticas aqui sai mais barato que serializá-las do processo pai
+        renderer = card_renderer_class(backend)(rank_info, theme_title, fps=fps, scale=scale)
+        size = renderer.thumb_size
+        achado = _worker_renderers[clip_id] = (renderer, Image.new("RGB", (size, size)))
+        while len(_worker_renderers) > _WORKER_RENDERERS_MAX:
+            _worker_renderers.popitem(last=False)
+    else:
+        _worker_renderers.move_to_end(clip_id)
+    return achado
+
+
+def _render_chunk(spec, start, thumbs, frames_dir=None):
+    """Renderiza os frames [start, start + len(thumbs)) no worker; thumbs são RGB crus ou None."""
+    renderer, thumb_buf = _worker_renderer(spec)
+    # Os chunks não são contíguos no mesmo worker: recomeça da base
+    renderer.reset()
+    out = []
+    for i, raw in enumerate(thumbs):
+        thumb_img = None
+        if raw is not None:
+            thumb_buf.frombytes(raw)
+            thumb_img = renderer.prepare_thumb(thumb_buf)
+        img = renderer.render(start + i, thumb_img)
+        if frames_dir:
+            img.save(Path(frames_dir) / f"frame_{start + i:04d}.png")
+        else:
+            out.append(img.tobytes())
+    return out
+
+
+def _iter_thumb_payloads(frame_source, total_frames, size):
+    """Um thumbnail RGB cru (ou None) por frame, repetindo o último válido quando a fonte acaba."""
+    thumbs = iter(frame_source) if frame_source is not None else None
+    last_valid = None
+    try:
+        for _ in range(total_frames):
+            thumb_raw = next(thumbs, None) if thumbs is not None else None
+            if thumb_raw is not None:
+                try:
+                    if thumb_raw.size != (size, size):
+                        thumb_raw = thumb_raw.resize((size, size), Image.Resampling.LANCZOS)
+                    last_valid = thumb_raw.convert("RGB").tobytes()
+                except Exception:
+                    pass
+            yield last_valid
+    finally:
+        if thumbs is not None and hasattr(thumbs, "close"):
+            thumbs.close()
+
+
+def iter_card_frames_parallel(rank_info, theme_title, video_frames_dir=None, duration=5.0, fps=30,
+                              frame_source=None, animated_only=False, workers=2, chunk_size=8, frames_dir=None, scale=1.0,
+                              pool=None):
+    """
+    Renderiza os frames do card num pool de processos, em chunks de frames
+    consecutivos. Cada worker monta o renderer do clipe uma vez (fontes e
+    camadas estáticas). No máximo 2 chunks por worker ficam em voo, então a
+    memória não cresce com a duração do clipe.
+
+    pool é o card_frame_pool do job; sem ele, um pool é criado só para este clipe.
+    Gera os buffers RGBA crus em ordem; com frames_dir os workers gravam os
+    PNGs direto e nada é gerado.
+    """
+    total_frames = animated_frame_count(duration, fps) if animated_only else int(duration * fps)
+    thumb_size = CardLayout(scale=scale).thumb_size
+    if frame_source is None and video_frames_dir:
+        frame_source = DirectoryFrameSource(video_frames_dir)
+    payloads = _iter_thumb_payloads(frame_source, total_frames, thumb_size)
+    spec = (next(_clip_ids), rank_info, theme_title, fps, scale, CARD_BACKEND)
+    proprio = pool is None
+    if proprio:
+        pool = card_frame_pool(workers)
+    pending = deque()
+    next_start = 0
+
+    def submit():
+        nonlocal next_start
+        count = min(chunk_size, total_frames - next_start)
+        thumbs = [next(payloads) for _ in range(count)]
+        pending.append(pool.submit(_render_chunk, spec, next_start, thumbs, frames_dir))
+        next_start += count
+
+    try:
+        while next_start < total_frames and len(pending) < workers * 2:
+            submit()
+        while pending:
+            frames = pending.popleft().result()
+            if next_start < total_frames:
+                submit()
+            yield from frames
+    finally:
+        for fut in pending:
+            fut.cancel()
+        payloads.close()
+        if proprio:
+            pool.shutdown()
+
+
+def _timed_frames(frames, **meta):
+    """
+    Repassa os frames medindo só o tempo gasto gerando cada um (o consumidor
+    não conta) e registra o total como a etapa card_frames do relatório.
+    """
+    wall = cpu = 0.0
+    n = 0
+    it = iter(frames)
+    try:
+        while True:
+            t0, c0 = time.perf_counter(), time.thread_time()
+            try:
+                frame = next(it)
+            except StopIteration:
+                return
+            finally:
+                wall += time.perf_counter() - t0
+                cpu += time.thread_time() - c0
+            n += 1
+            yield frame
+    finally:
+        if hasattr(it, "close"):
+            it.close()
+        instrumentation.record("card_frames", wall, cpu, frames=n, **meta)
+
+
+def iter_raw_frames_for_clip(rank_info, theme_title, video_frames_dir=None, duration=5.0, fps=30, frame_source=None, animated_only=False, workers=1, scale=1.0, pool=None):
+    """
+    Gera os frames do card como buffers RGBA crus (a folha do CardLayout, W x H x 4
+    bytes cada), prontos para um input `-f rawvideo -pix_fmt rgba` do ffmpeg.
+    Com workers > 1 o render é dividido entre processos (os do pool, se houver).
+    """
+    if workers > 1:
+        frames = iter_card_frames_parallel(rank_info, theme_title, video_frames_dir, duration, fps,
+                                           frame_source, animated_only, workers=workers, scale=scale, pool=pool)
+    else:
+        frames = (img.tobytes() for img in iter_card_frames(rank_info, theme_title, video_frames_dir, duration, fps,
+                                                            frame_source, animated_only, scale))
+    yield from _timed_frames(frames, rank=rank_info.get('rank'), workers=workers)
+
+
+def generate_frames_for_clip(temp_dir, rank_info, theme_title, video_frames_dir=None, duration=5.0, fps=30, frame_source=None, animated_only=False, workers=1, scale=1.0, pool=None):
+    """
+    Gera uma sequência de imagens PNG transparentes (frames) com o card animado.
+    Caminho de debug: o fluxo normal usa iter_raw_frames_for_clip direto no ffmpeg.
+    Cada PNG é a folha do CardLayout (faixa do título + faixa do card), não o
+    quadro composto: o bands_filter posiciona as faixas em cada formato de saída.
+    """
+    frames_dir = Path(temp_dir) / f"frames_{rank_info['rank']}"
+    frames_dir.mkdir(exist_ok=True)
+    
+    with instrumentation.stage("card_frames", rank=rank_info.get('rank'), workers=workers) as st:
+        if workers > 1:
+            for _ in iter_card_frames_parallel(rank_info, theme_title, video_frames_dir, duration, fps, frame_source,
+                                               animated_only, workers=workers, frames_dir=frames_dir, scale=scale,
+                                               pool=pool):
+                pass
+            return str(frames_dir)
         
+        frames = iter_card_frames(rank_info, theme_title, video_frames_dir, duration, fps, frame_source, animated_only, scale)
+        for frame_idx, img in enumerate(frames):
+            # Salvar Frame
+            out_path = frames_dir / f"frame_{frame_idx:04d}.png"
+            img.save(out_path)
+            st.add_file(out_path)
+            
     return str(frames_dir)
@@ -0,0 +1,465 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import contextvars
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+
+try:
+    import resource # Não existe no Windows
+except ImportError:
+    resource = None
+
+# Instrumentação leve do pipeline: cada etapa (ranking, busca, download,
+# frames, encode, TTS, concat) registra tempo de parede, CPU, pico de memória,
+# bytes baixados/gravados e códigos de saída dos subprocessos. Cada execução
+# vira um run_report.json ao lado do vídeo final.
+
+_report_var = contextvars.ContextVar("run_report", default=None)
+_stage_var = contextvars.ContextVar("run_stage", default=None)
+
+
+def _rss_mb(maxrss):
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    if sys.platform == "darwin":
+        return round(maxrss / (1024 * 1024), 1)
+    return round(maxrss / 1024, 1)
+
+
+def peak_rss_mb():
+    """Pico de memória residente deste processo (None se a plataforma não informa)."""
+    if resource is None:
+        return None
+    return _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+class Stage:
+    """Métricas de uma etapa; os campos extras (rank, modelo...) vão em meta."""
+
+    def __init__(self, name, meta):
+        self.name = name
+        self.meta = meta
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.child_cpu_s = 0.0
+        self.child_peak_rss_mb = None
+        self.peak_rss_mb = None
+        self.bytes_downloaded = 0
+        self.bytes_written = 0
+        self.exit_codes = []
+        self.ok = True
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add_bytes(self, downloaded=0, written=0):
+        with self._lock:
+            self.bytes_downloaded += downloaded
+            self.bytes_written += written
+
+    def add_file(self, path, downloaded=False):
+        """Soma o tamanho de um arquivo gerado (ou baixado) pela etapa."""
+        try:
+            size = Path(path).stat().st_size
+        except OSError:
+            return
+        self.add_bytes(downloaded=size if downloaded else 0, written=0 if downloaded else size)
+
+    def add_process(self, returncode, rusage=None):
+        with self._lock:
+            self.exit_codes.append(returncode)
+            if rusage is not None:
+                self.child_cpu_s += rusage.ru_utime + rusage.ru_stime
+                rss = _rss_mb(rusage.ru_maxrss)
+                self.child_peak_rss_mb = max(self.child_peak_rss_mb or 0, rss)
+
+    def to_dict(self):
+        d = {"stage": self.name, **self.meta,
+             "wall_s": round(self.wall_s, 3), "cpu_s": round(self.cpu_s, 3),
+             "child_cpu_s": round(self.child_cpu_s, 3),
+             "peak_rss_mb": self.peak_rss_mb, "child_peak_rss_mb": self.child_peak_rss_mb,
+             "bytes_downloaded": self.bytes_downloaded, "bytes_written": self.bytes_written,
+             "exit_codes": self.exit_codes, "ok": self.ok}
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+class _NullStage(Stage):
+    """Etapa descartada quando não há relatório ativo."""
+
+    def __init__(self, name="", meta=None):
+        super().__init__(name, meta or {})
+
+
+class RunReport:
+    """Relatório de uma execução do pipeline."""
+
+    def __init__(self, name, **meta):
+        self.name = name
+        self.meta = meta
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self.stages = []
+        self.status = "running"
+        self._lock = threading.Lock()
+
+    def add(self, stage):
+        with self._lock:
+            self.stages.append(stage)
+
+    def to_dict(self):
+        stages = [s.to_dict() for s in self.stages]
+        resumo = {}
+        for s in stages:
+            r = resumo.setdefault(s["stage"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "child_cpu_s": 0.0,
+                                               "bytes_downloaded": 0, "bytes_written": 0, "failures": 0})
+            r["count"] += 1
+            for k in ("wall_s", "cpu_s", "child_cpu_s"):
+                r[k] = round(r[k] + s[k], 3)
+            r["bytes_downloaded"] += s["bytes_downloaded"]
+            r["bytes_written"] += s["bytes_written"]
+            r["failures"] += 0 if s["ok"] else 1
+        return {
+            "name": self.name, **self.meta,
+            "started_at": self.started_at, "status": self.status,
+            "wall_s": round(time.perf_counter() - self._t0, 3),
+            "cpu_s": round(time.process_time() - self._cpu0, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "summary": resumo,
+            "stages": stages,
+        }
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+@contextmanager
+def run_report(name, **meta):
+    """Ativa um RunReport para o contexto atual (e as tasks criadas com in_context)."""
+    report = RunReport(name, **meta)
+    token = _report_var.set(report)
+    try:
+        yield report
+        if report.status == "running":
+            report.status = "ok"
+    except BaseException:
+        report.status = "failed"
+        raise
+    finally:
+        _report_var.reset(token)
+
+
+def current_report():
+    return _report_var.get()
+
+
+def in_context(fn):
+    """Envolve fn para rodar numa cópia do contexto atual (para submit em pools de threads)."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# Campos que o stage() põe nos eventos de progresso: o meta da etapa não pode usá-los
+RESERVED_META = frozenset({"stage", "percent", "status", "wall_s"})
+
+
+@contextmanager
+def stage(name, **meta):
+    """Mede uma etapa do pipeline. Sem relatório ativo, mede e descarta."""
+    reservados = RESERVED_META.intersection(meta)
+    if reservados:
+        raise ValueError(f"Campos reservados no meta da etapa {name}: {', '.join(sorted(reservados))}")
+    report = _report_var.get()
+    st = Stage(name, meta) if report is not None else _NullStage(name, meta)
+    token = _stage_var.set(st)
+    emit(name, status="start", **meta)
+    t0 = time.perf_counter()
+    cpu0 = time.thread_time()
+    try:
+        yield st
+    except BaseException as e:
+        st.ok = False
+        st.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        st.wall_s = time.perf_counter() - t0
+        st.cpu_s = time.thread_time() - cpu0
+        st.peak_rss_mb = peak_rss_mb()
+        _stage_var.reset(token)
+        if report is not None:
+            report.add(st)
+        emit(name, status="ok" if st.ok else "failed", wall_s=round(st.wall_s, 3), **meta)
+
+
+def record(name, wall_s, cpu_s=0.0, **meta):
+    """Registra uma etapa medida por fora (ex: tempo acumulado de render dentro de um gerador)."""
+    report = _report_var.get()
+    if report is None:
+        return
+    st = Stage(name, meta)
+    st.wall_s = wall_s
+    st.cpu_s = cpu_s
+    st.peak_rss_mb = peak_rss_mb()
+    report.add(st)
+
+
+def current_stage():
+    return _stage_var.get() or _NullStage()
+
+
+# Eventos de progresso para quem acompanha a execução (ex: a barra da GUI):
+# dicts {"stage", "rank", "percent", "status", "job", ...} entregues aos
+# listeners na thread que gerou o evento (o listener não pode bloquear)
+_listeners = []
+_listeners_lock = threading.Lock()
+
+
+def add_listener(fn):
+    with _listeners_lock:
+        _listeners.append(fn)
+
+
+def remove_listener(fn):
+    with _listeners_lock:
+        if fn in _listeners:
+            _listeners.remove(fn)
+
+
+def emit(stage, rank=None, percent=None, **fields):
+    """Envia um evento de progresso; sem listeners não custa nada."""
+    with _listeners_lock:
+        ouvintes = list(_listeners)
+    if not ouvintes:
+        return
+    report = _report_var.get()
+    evento = {"stage": stage, "rank": rank, "percent": percent,
+              "job": report.meta.get("job") if report is not None else None, **fields}
+    for fn in ouvintes:
+        try:
+            fn(evento)
+        except Exception:
+            pass # Um listener com defeito não derruba o pipeline
+
+
+class Progress:
+    """Porcentagem de um trabalho com número conhecido de passos; cada step() emite um evento."""
+
+    def __init__(self, total):
+        self.total = max(1, total)
+        self.done = 0
+        self._lock = threading.Lock()
+
+    def step(self, stage, rank=None, **fields):
+        with self._lock:
+            self.done = min(self.total, self.done + 1)
+            percent = round(100 * self.done / self.total, 1)
+        emit(stage, rank=rank, percent=percent, status="done", **fields)
+
+
+class Popen(subprocess.Popen):
+    """
+    subprocess.Popen que guarda o rusage do filho (CPU e pico de memória) onde
+    há os.wait4: wait() e poll() (e o communicate/with que passam por eles)
+    reapam o filho com os.wait4 em vez do waitpid do subprocess.
+    """
+
+    rusage = None
+
+    def __init__(self, *args, **kwargs):
+        self._reap_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _reap(self, flags):
+        if self.returncode is not None:
+            return self.returncode
+        try:
+            pid, status, rusage = os.wait4(self.pid, flags)
+        except ChildProcessError:
+            # Reapado fora daqui: o subprocess define o código de saída, sem rusage
+            return super().poll()
+        if pid == self.pid:
+            self.rusage = rusage
+            self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def poll(self):
+        if not hasattr(os, "wait4"):
+            return super().poll()
+        # Outra thread já está no wait(): o filho ainda não foi reapado
+        if not self._reap_lock.acquire(blocking=False):
+            return self.returncode
+        try:
+            return self._reap(os.WNOHANG)
+        finally:
+            self._reap_lock.release()
+
+    def wait(self, timeout=None):
+        if not hasattr(os, "wait4"):
+            return super().wait(timeout)
+        if timeout is not None:
+            # Com prazo o wait4 não pode bloquear: consulta em passos curtos
+            fim = time.monotonic() + timeout
+            while self.poll() is None:
+                if time.monotonic() >= fim:
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+                time.sleep(0.005)
+            return self.returncode
+        with self._reap_lock:
+            return self._reap(0)
+
+
+def track_process(proc):
+    """Anota código de saída e rusage de um Popen já finalizado na etapa atual."""
+    current_stage().add_process(proc.returncode, getattr(proc, "rusage", None))
+
+
+def run(cmd, check=False, **kwargs):
+    """subprocess.run instrumentado: o código de saída e a CPU do filho vão para a etapa atual."""
+    input_data = kwargs.pop("input", None)
+    with Popen(cmd, **kwargs) as proc:
+        try:
+            stdout, stderr = proc.communicate(input_data)
+        except BaseException:
+            proc.kill()
+            raise
+    track_process(proc)
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+# --- AGREGAÇÃO DE VÁRIAS EXECUÇÕES ---
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    k = (len(valores) - 1) * p
+    i = int(k)
+    j = min(i + 1, len(valores) - 1)
+    return round(valores[i] + (valores[j] - valores[i]) * (k - i), 3)
+
+
+def load_reports(paths):
+    reports = []
+    for p in paths:
+        p = Path(p)
+        arquivos = sorted(p.glob("*run_report.json")) if p.is_dir() else [p]
+        for arq in arquivos:
+            try:
+                with open(arq, "r", encoding="utf-8") as f:
+                    reports.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"[!] Ignorando {arq}: {e}")
+    return reports
+
+
+def aggregate(reports):
+    """Resumo de várias execuções: por etapa, contagem, média/p50/p95/máx de tempo e CPU."""
+    por_etapa = {}
+    for rep in reports:
+        for s in rep.get("stages", []):
+            por_etapa.setdefault(s["stage"], []).append(s)
+    etapas = {}
+    for nome, lista in por_etapa.items():
+        wall = [s["wall_s"] for s in lista]
+        cpu = [s["cpu_s"] + s.get("child_cpu_s", 0) for s in lista]
+        etapas[nome] = {
+            "count": len(lista),
+            "failures": sum(1 for s in lista if not s.get("ok", True)),
+            "wall_mean_s": round(sum(wall) / len(wall), 3),
+            "wall_p50_s": _percentil(wall, 0.5),
+            "wall_p95_s": _percentil(wall, 0.95),
+            "wall_max_s": round(max(wall), 3),
+            "cpu_mean_s": round(sum(cpu) / len(cpu), 3),
+            "bytes_downloaded": sum(s.get("bytes_downloaded", 0) for s in lista),
+            "bytes_written": sum(s.get("bytes_written", 0) for s in lista),
+        }
+    walls = [r.get("wall_s", 0) for r in reports]
+    return {
+        "runs": len(reports),
+        "failed_runs": sum(1 for r in reports if r.get("status") != "ok"),
+        "run_wall_mean_s": round(sum(walls) / len(walls), 3) if walls else None,
+        "run_wall_p95_s": _percentil(walls, 0.95),
+        "peak_rss_mb_max": max((r.get("peak_rss_mb") or 0 for r in reports), default=None),
+        "stages": etapas,
+    }
+
+
+def print_aggregate(summary):
+    print(f"Execuções: {summary['runs']} ({summary['failed_runs']} com falha)  "
+          f"média {summary['run_wall_mean_s']}s  p95 {summary['run_wall_p95_s']}s  "
+          f"pico RSS {summary['peak_rss_mb_max']} MB")
+    print(f"{'etapa':<16}{'n':>5}{'falhas':>8}{'média':>9}{'p50':>9}{'p95':>9}{'máx':>9}{'cpu':>9}")
+    etapas = sorted(summary["stages"].items(), key=lambda kv: -kv[1]["wall_mean_s"] * kv[1]["count"])
+    for nome, e in etapas:
+        print(f"{nome:<16}{e['count']:>5}{e['failures']:>8}{e['wall_mean_s']:>9}{e['wall_p50_s']:>9}"
+              f"{e['wall_p95_s']:>9}{e['wall_max_s']:>9}{e['cpu_mean_s']:>9}")
+
+
+def import_times(module, python=None):
+    """
+    Saída do `python -X importtime -c "import module"` num processo novo.
+    Lista de {"module", "self_ms", "cumulative_ms", "depth"} (depth 0 = o próprio módulo).
+    """
+    cmd = [python or sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    res = subprocess.run(cmd, capture_output=True, text=True, cwd=str(Path(__file__).parent))
+    if res.returncode != 0:
+        raise RuntimeError(f"import {module} falhou:\n{res.stderr[-2000:]}")
+    entradas = []
+    for linha in res.stderr.splitlines():
+        partes = linha.split("|")
+        if not linha.startswith("import time:") or len(partes) != 3:
+            continue
+        try:
+            proprio, acumulado = int(partes[0].split(":")[1]), int(partes[1])
+        except ValueError:
+            continue # cabeçalho
+        nome = partes[2].rstrip()
+        entradas.append({"module": nome.strip(), "self_ms": proprio / 1000, "cumulative_ms": acumulado / 1000,
+                         "depth": (len(nome) - len(nome.lstrip()) - 1) // 2})
+    return entradas
+
+
+def print_import_times(module, entradas, top=12):
+    """Tempo total de `import module` e os imports diretos mais caros."""
+    fim = next((i for i in range(len(entradas) - 1, -1, -1)
+                if entradas[i]["module"] == module and entradas[i]["depth"] == 0), None)
+    if fim is None:
+        print(f"import {module}: ?")
+        return
+    print(f"import {module}: {entradas[fim]['cumulative_ms']:.1f} ms")
+    # Os filhos aparecem antes do pai: os imports diretos são os de depth 1 logo antes da raiz
+    inicio = fim
+    while inicio > 0 and entradas[inicio - 1]["depth"] > 0:
+        inicio -= 1
+    diretos = sorted((e for e in entradas[inicio:fim] if e["depth"] == 1), key=lambda e: -e["cumulative_ms"])
+    for e in diretos[:top]:
+        print(f"  {e['module']:<32}{e['cumulative_ms']:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Resumo de vários run_report.json, ou tempo de import dos módulos.")
+    parser.add_argument("command", choices=["aggregate", "importtime"])
+    parser.add_argument("paths", nargs="+",
+                        help="aggregate: arquivos run_report.json ou pastas (ex: output/); importtime: módulos (ex: app_gui main)")
+    parser.add_argument("--json", dest="json_out", default=None, help="grava o resumo também em JSON")
+    args = parser.parse_args()
+    if args.command == "importtime":
+        for modulo in args.paths:
+            print_import_times(modulo, import_times(modulo))
+        sys.exit(0)
+    resumo = aggregate(load_reports(args.paths))
+    print_aggregate(resumo)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from media_cache import file_sha256
+
+# Manifesto de um job: cada etapa (ranking, download, clipe, intro, vídeo final)
+# grava as suas saídas junto com o hash das entradas. Numa retomada, a etapa
+# cujas entradas não mudaram e cujas saídas ainda estão no disco é pulada.
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class JobManifest:
+    """
+    manifest.json na pasta persistente do job (jobs/job_<id>), mais o
+    ranking.json editável. As saídas são conferidas por tamanho e mtime.
+    """
+
+    def __init__(self, job_dir):
+        self.job_dir = Path(job_dir)
+        self.path = self.job_dir / "manifest.json"
+        self.ranking_path = self.job_dir / "ranking.json"
+        self._lock = threading.Lock()
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {"created": time.time(), "stages": {}}
+
+    @staticmethod
+    def key(**inputs):
+        """Hash estável das entradas de uma etapa (qualquer coisa serializável em JSON)."""
+        raw = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def digest(self, path):
+        """sha256 de um arquivo; reaproveita o já gravado no manifesto se o arquivo não mudou."""
+        if path is None or not Path(path).exists():
+            return None
+        path = Path(path).absolute()
+        size, mtime = _stat(path)
+        with self._lock:
+            for stage in self._data["stages"].values():
+                for out in stage.get("outputs", []):
+                    if out and out["path"] == str(path) and out["size"] == size and out["mtime_ns"] == mtime:
+                        return out["sha256"]
+        return file_sha256(path)
+
+    def outputs(self, stage, input_hash):
+        """Saídas gravadas da etapa se o hash das entradas bate e os arquivos estão intactos; senão None."""
+        with self._lock:
+            entry = self._data["stages"].get(stage)
+        if not entry or entry.get("input_hash") != input_hash:
+            return None
+        paths = []
+        for out in entry.get("outputs", []):
+            if out is None:
+                paths.append(None)
+                continue
+            p = Path(out["path"])
+            try:
+                if _stat(p) != (out["size"], out["mtime_ns"]):
+                    return None
+            except OSError:
+                return None
+            paths.append(p)
+        return paths
+
+    def record(self, stage, input_hash, outputs):
+        """Grava as saídas (caminhos ou None) de uma etapa concluída."""
+        registros = []
+        for p in outputs:
+            if p is None or not Path(p).exists():
+                registros.append(None)
+                continue
+            p = Path(p).absolute()
+            size, mtime = _stat(p)
+            registros.append({"path": str(p), "size": size, "mtime_ns": mtime, "sha256": file_sha256(p)})
+        with self._lock:
+            self._data["stages"][stage] = {"input_hash": input_hash, "outputs": registros, "finished": time.time()}
+            self._save()
+
+    def load_ranking(self):
+        """Ranking do job (ranking.json pode ter sido editado à mão antes da retomada)."""
+        try:
+            with open(self.ranking_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_ranking(self, dados):
+        tmp = self.ranking_path.with_name(f"ranking.json.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.ranking_path)
+
+    def _save(self):
+        tmp = self.path.with_name(f"manifest.json.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
@@ -0,0 +1,62 @@
+import threading
+
+# Carregamento preguiçoso: dependências pesadas (groq, yt_dlp, edge_tts, PIL)
+# e objetos com efeitos colaterais (cliente da API, caches em disco) só são
+# criados no primeiro uso, ou em segundo plano com prefetch() — a janela da
+# GUI aparece sem esperar por eles.
+
+
+class LazyObject:
+    """Proxy que cria o objeto com factory() no primeiro acesso a um atributo (thread-safe)."""
+
+    def __init__(self, factory, name=None):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", "objeto"))
+        object.__setattr__(self, "_obj", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        obj = object.__getattribute__(self, "_obj")
+        if obj is None:
+            with object.__getattribute__(self, "_lock"):
+                obj = object.__getattribute__(self, "_obj")
+                if obj is None:
+                    obj = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_obj", obj)
+        return obj
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        obj = object.__getattribute__(self, "_obj")
+        return repr(obj) if obj is not None else f"<{object.__getattribute__(self, '_name')} (não carregado)>"
+
+
+def load(obj):
+    """O objeto real por trás de um LazyObject (criando-o se preciso); outros objetos voltam como estão."""
+    return obj._load() if isinstance(obj, LazyObject) else obj
+
+
+def is_loaded(obj):
+    return not isinstance(obj, LazyObject) or object.__getattribute__(obj, "_obj") is not None
+
+
+def prefetch(*loaders, name="prefetch"):
+    """
+    Roda os carregadores (LazyObject ou funções sem argumentos) numa thread em
+    segundo plano. Um que falha só é avisado: o erro volta a aparecer no uso.
+    """
+    def carregar():
+        for loader in loaders:
+            try:
+                load(loader) if isinstance(loader, LazyObject) else loader()
+            except Exception as e:
+                print(f"[!] Pré-carregamento falhou ({loader!r}): {e}")
+
+    thread = threading.Thread(target=carregar, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -5,36 +5,174 @@ import time
 import re
 import sys
 import textwrap
-import asyncio
-import edge_tts
+import shutil
+import threading
+import queue
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
 from dotenv import load_dotenv
-from groq import Groq
-import yt_dlp
-from card_generator import generate_frames_for_clip
-import imageio_ffmpeg
+from media_cache import SearchCache, SegmentCache
+from audio_mastering import measure_loudness, audio_filter, loudnorm_filter
+from render_profiles import get_profile, parse_aspects
+from media_probe import check_concat_compatible, media_duration
+from scratch import ScratchSpace, sweep_stale
+from job_manifest import JobManifest
+from video_resolver import make_plan, plan_from_entries, resolve_all
+from lazy import LazyObject, prefetch
+import instrumentation
+from instrumentation import stage
 
 load_dotenv()
 
 BASE_DIR = Path(__file__).parent.absolute()
 TEMP_DIR = BASE_DIR / "temp"
 OUTPUT_DIR = BASE_DIR / "output"
+# Saídas de cada etapa por job (retomáveis com --resume); apagadas depois de JOB_KEEP_DAYS
+JOBS_DIR = BASE_DIR / "jobs"
+JOB_KEEP_DAYS = float(os.getenv("JOB_KEEP_DAYS", "7"))
+# Suba quando o render mudar de aparência: invalida clipes e intros já prontos nos jobs
+RENDER_VERSION = 2
 HISTORY_FILE = BASE_DIR / "temas_usados.txt"
-FFMPEG_EXE = imageio_ffmpeg.get_ffmpeg_exe()
 
-# Garantir que as pastas existam
-for d in [TEMP_DIR, OUTPUT_DIR]:
-    d.mkdir(exist_ok=True)
+# Frames do card: "stream" manda RGBA cru direto para o ffmpeg por pipe,
+# "png" grava a sequência frame_%04d.png em temp/ (útil para debug). Os PNGs são
+# as folhas do CardLayout (faixa do título + faixa do card), não o quadro final:
+# cada formato de saída recebe as faixas pelo bands_filter na montagem
+CARD_FRAMES_MODE = os.getenv("CARD_FRAMES_MODE", "stream")
+# Máximo de frames renderizados aguardando o ffmpeg (limita a memória)
+FRAME_QUEUE_SIZE = 4
+# Thumbnail circular: "python" compõe no PIL frame a frame, "filtergraph" monta
+# dentro do ffmpeg e o Python só renderiza os frames do card que animam
+THUMB_MODE = os.getenv("THUMB_MODE", "python")
+# Pipeline por rank: downloads (rede) e renders (CPU) rodam em pools separados
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "3"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0")) or os.cpu_count() or 1
+# Buscas simultâneas no YouTube na fase de resolução do ranking
+RESOLVE_WORKERS = int(os.getenv("RESOLVE_WORKERS", "4"))
+# Processos renderizando os frames de um mesmo card (1 = serial; some com RENDER_WORKERS)
+CARD_RENDER_WORKERS = int(os.getenv("CARD_RENDER_WORKERS", "1"))
+# Cache local de buscas e trechos do YouTube (MEDIA_CACHE=0 desliga)
+CACHE_DIR = Path(os.getenv("MEDIA_CACHE_DIR", BASE_DIR / "cache"))
+MEDIA_CACHE = os.getenv("MEDIA_CACHE", "1") != "0"
+MEDIA_CACHE_MAX_GB = float(os.getenv("MEDIA_CACHE_MAX_GB", "2"))
+MEDIA_CACHE_MAX_AGE_DAYS = float(os.getenv("MEDIA_CACHE_MAX_AGE_DAYS", "30"))
+# Pasta de trabalho por job em temp/job_<id>; frames do card em /dev/shm se houver RAM
+# (SCRATCH_TMPFS: auto, 1 = sempre, 0 = nunca) e espaço mínimo livre em disco
+SCRATCH_TMPFS = os.getenv("SCRATCH_TMPFS", "auto")
+SCRATCH_MIN_FREE_MB = int(os.getenv("SCRATCH_MIN_FREE_MB", "1024"))
+# Fonte do drawtext da intro (no Linux, ex: /usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf)
+INTRO_FONT = os.getenv("INTRO_FONT", "C:/Windows/Fonts/arialbd.ttf")
+# Loudness: "gain" (ganho linear medido por trecho), "measured" (loudnorm em 2 passadas)
+# ou "final" (um ganho só no vídeo final)
+AUDIO_MASTERING = os.getenv("AUDIO_MASTERING", "gain")
+# Narração da intro: voz/velocidade do Edge-TTS e backend ("edge", ou "silent"/"tone"
+# para rodar offline); os áudios ficam em cache em CACHE_DIR/tts
+TTS_VOICE = os.getenv("TTS_VOICE", "en-US-ChristopherNeural")
+TTS_RATE = os.getenv("TTS_RATE", "+25%")
+TTS_BACKEND = os.getenv("TTS_BACKEND", "edge")
+# Formatos gerados em cada job ("9:16,1:1,16:9"): um decode e um render do card
+# servem todos; o primeiro é o principal (o vídeo devolvido e o do relatório)
+OUTPUT_ASPECTS = os.getenv("OUTPUT_ASPECTS", "9:16")
+# Motor de render: "segments" (intro e cada clipe num MP4, render paralelo, concat
+# por cópia) ou "graph" (o vídeo inteiro num filter_complex e um encode só)
+RENDER_ENGINE = os.getenv("RENDER_ENGINE", "segments")
+RENDER_ENGINES = ("segments", "graph")
+# Motor graph: segundos de xfade entre os segmentos (0 = cortes secos, como no concat)
+TRANSITION_DURATION = float(os.getenv("TRANSITION_DURATION", "0"))
+# Ranking por LLM: "groq" (modelos em paralelo escalonado, respostas em cache),
+# "replay" (só cache e fixtures, sem rede) ou "fixture" (só as fixtures)
+RANKING_PROVIDER = os.getenv("RANKING_PROVIDER", "groq")
+RANKING_MODELS = [m.strip() for m in os.getenv("RANKING_MODELS", "").split(",") if m.strip()] or None
+RANKING_HEDGE_S = float(os.getenv("RANKING_HEDGE_S", "8"))
+RANKING_TIMEOUT_S = float(os.getenv("RANKING_TIMEOUT_S", "60"))
+RANKING_FIXTURES = Path(os.getenv("RANKING_FIXTURES", BASE_DIR / "bench" / "fixtures"))
+# Suba quando o template do prompt em generate_ranking_data mudar: invalida os rankings em cache
+RANKING_PROMPT_VERSION = 1
+DOWNLOAD_FORMAT = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Importar este módulo é barato: groq, yt_dlp, edge_tts, PIL e o ffmpeg do
+# imageio_ffmpeg só carregam no primeiro uso (ou em segundo plano com prefetch_backends())
 
-def clear_temp():
-    """Limpa a pasta temporária para evitar conflitos."""
-    for f in TEMP_DIR.glob("*"):
-        try:
-            os.remove(f)
-        except:
-            pass
+_ffmpeg_lock = threading.Lock()
+_ffmpeg_exe = None
+
+def ffmpeg_exe():
+    """Caminho do ffmpeg (o imageio_ffmpeg procura/valida o binário na primeira chamada)."""
+    global _ffmpeg_exe
+    with _ffmpeg_lock:
+        if _ffmpeg_exe is None:
+            import imageio_ffmpeg
+            _ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+    return _ffmpeg_exe
+
+def __getattr__(name):
+    # main.FFMPEG_EXE continua funcionando para quem importa o módulo
+    if name == "FFMPEG_EXE":
+        return ffmpeg_exe()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def criar_pastas():
+    for d in [TEMP_DIR, OUTPUT_DIR]:
+        d.mkdir(parents=True, exist_ok=True)
+
+def _groq_client():
+    from groq import Groq
+    return Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+def _ranking_provider():
+    from ranking_provider import (MODES, DEFAULT_MODELS, RankingCache, HedgedGroqProvider, FixtureRankingProvider,
+                                  CachedRankingProvider)
+    if RANKING_PROVIDER not in MODES:
+        raise ValueError(f"Provedor de ranking desconhecido: {RANKING_PROVIDER} (opções: {', '.join(MODES)})")
+    if RANKING_PROVIDER == "fixture":
+        return FixtureRankingProvider(RANKING_FIXTURES)
+    # Chave do cache: tema pedido + modelos + versão do prompt (replay acha o que o groq gravou)
+    cache = RankingCache(CACHE_DIR / "rankings", max_age_days=MEDIA_CACHE_MAX_AGE_DAYS)
+    modelos = RANKING_MODELS or DEFAULT_MODELS
+    if RANKING_PROVIDER == "replay":
+        return CachedRankingProvider(cache, FixtureRankingProvider(RANKING_FIXTURES), record=False,
+                                     models=modelos, version=RANKING_PROMPT_VERSION)
+    # GROQ_BASE_URL aponta o cliente para um servidor local compatível (substituto offline)
+    return CachedRankingProvider(cache, HedgedGroqProvider(groq_client, modelos, hedge_delay=RANKING_HEDGE_S,
+                                                           timeout=RANKING_TIMEOUT_S),
+                                 models=modelos, version=RANKING_PROMPT_VERSION)
+
+def _youtube_session():
+    from youtube_session import YouTubeSession
+    return YouTubeSession(ffmpeg_exe(), DOWNLOAD_FORMAT)
+
+def _tts_service():
+    from tts_service import TTSService
+    return TTSService(CACHE_DIR / "tts", voice=TTS_VOICE, rate=TTS_RATE, backend=TTS_BACKEND,
+                      ffmpeg_exe=ffmpeg_exe(), max_age_days=MEDIA_CACHE_MAX_AGE_DAYS)
+
+groq_client = LazyObject(_groq_client, "groq_client")
+ranking_provider = LazyObject(_ranking_provider, "ranking_provider")
+
+search_cache = LazyObject(lambda: SearchCache(CACHE_DIR / "search.json", max_age_days=MEDIA_CACHE_MAX_AGE_DAYS),
+                          "search_cache") if MEDIA_CACHE else None
+# Busca e download do trecho no mesmo processo (conexões e info dicts reaproveitados)
+youtube = LazyObject(_youtube_session, "youtube")
+
+segment_cache = LazyObject(lambda: SegmentCache(CACHE_DIR / "segments", max_bytes=int(MEDIA_CACHE_MAX_GB * 1024 ** 3),
+                                                max_age_days=MEDIA_CACHE_MAX_AGE_DAYS),
+                           "segment_cache") if MEDIA_CACHE else None
+tts = LazyObject(_tts_service, "tts")
+
+def _importar_backends():
+    import yt_dlp, card_generator
+    if RANKING_PROVIDER == "groq":
+        import groq
+    if TTS_BACKEND == "edge":
+        import edge_tts
+
+def prefetch_backends():
+    """Carrega em segundo plano as dependências pesadas e os objetos preguiçosos; devolve a thread."""
+    llm = [groq_client] if RANKING_PROVIDER == "groq" else []
+    return prefetch(ffmpeg_exe, _importar_backends, *llm, ranking_provider, youtube, tts,
+                    *[c for c in (search_cache, segment_cache) if c is not None])
 
 def load_history():
     if HISTORY_FILE.exists():
@@ -52,84 +190,190 @@ def escape_ffmpeg_text(text):
     text = text.replace("'", "\u2019") 
     return text
 
+def ffmpeg_font_path(path):
+    """Caminho de fonte no formato do drawtext (barras normais e ':' escapado)."""
+    return str(path).replace('\\', '/').replace(':', '\\:')
+
 def wrap_text_for_ffmpeg(text, max_chars=30):
     """Quebra o texto em linhas para caber na tela."""
     wrapper = textwrap.TextWrapper(width=max_chars)
     lines = wrapper.wrap(text)
     return lines
 
+# --- MASTERIZAÇÃO DO ÁUDIO ---
+
+# Trechos baixados nesta execução -> chave no SegmentCache (video_id, início, fim, formato)
+_trechos_em_cache = {}
+_trechos_lock = threading.Lock()
+
+def lembrar_trecho(path, video_id, start, end, fmt):
+    with _trechos_lock:
+        _trechos_em_cache[str(path)] = (video_id, start, end, fmt)
+
+def medir_loudness(media, start_offset=0, duration=None):
+    """
+    Loudness da janela usada do trecho; a medição fica no cache junto do trecho
+    baixado (achado pela chave do download, sem reler o arquivo).
+    """
+    with _trechos_lock:
+        chave = _trechos_em_cache.get(str(media)) if segment_cache else None
+    nome = f"loudness:{float(start_offset)}:{duration}"
+    if chave:
+        stats = segment_cache.get_meta(*chave, nome)
+        if stats:
+            return stats
+    with stage("loudness"):
+        stats = measure_loudness(ffmpeg_exe(), media, start_offset, duration)
+    if chave:
+        segment_cache.set_meta(*chave, nome, stats)
+    return stats
+
+def filtro_loudness(media, start_offset=0, duration=None):
+    """Filtro de áudio do segmento conforme AUDIO_MASTERING (loudnorm de uma passada se a medição falhar)."""
+    if AUDIO_MASTERING == "final":
+        return "anull"
+    try:
+        return audio_filter(medir_loudness(media, start_offset, duration), AUDIO_MASTERING)
+    except Exception as e:
+        print(f"[!] Falha ao medir o loudness de {Path(media).name}: {e}")
+        return loudnorm_filter()
+
+def masterizar_final(arquivo_final, profile):
+    """AUDIO_MASTERING=final: um ganho linear no programa inteiro; o vídeo é copiado."""
+    arquivo_final = Path(arquivo_final)
+    tmp = arquivo_final.with_name(arquivo_final.stem + "_master" + arquivo_final.suffix)
+    with stage("master") as st:
+        stats = measure_loudness(ffmpeg_exe(), arquivo_final)
+        cmd = [ffmpeg_exe(), "-y", "-i", str(arquivo_final), "-map", "0", "-c:v", "copy",
+               "-af", audio_filter(stats, "gain"), *profile.audio_args(), str(tmp)]
+        instrumentation.run(cmd, check=True)
+        os.replace(tmp, arquivo_final)
+        st.add_file(arquivo_final)
+    return arquivo_final
+
+class Segmento:
+    """
+    Um trecho do vídeo (intro ou clipe) como pedaço de um filter_complex: as
+    entradas do ffmpeg, os filtros que terminam em [{tag}v{i}] e [{tag}a{i}]
+    (um par por saída) e, no modo stream, os frames do card para o stdin.
+    """
+
+    def __init__(self, entradas, filtro, frames=None, n_frames=0, png_dir=None, duration=None):
+        self.entradas = entradas
+        self.filtro = filtro
+        self.frames = frames
+        self.n_frames = n_frames
+        self.png_dir = png_dir
+        self.duration = duration
+
+    @property
+    def n_inputs(self):
+        return self.entradas.count("-i")
+
 # --- FUNÇÕES DE INTRODUÇÃO (NOVO) ---
 
-async def generate_tts_audio(text, output_file):
-    """Gera áudio narrado usando Edge-TTS (Voz Neural)."""
-    # Voz masculina assertiva e rápida (+20%)
-    communicate = edge_tts.Communicate(text, "en-US-ChristopherNeural", rate="+25%")
-    await communicate.save(output_file)
+def intro_narration_text(theme_title, hook_text):
+    return f"{theme_title}. {hook_text}"
 
-def create_intro_video(theme_title, hook_text, out_path, bg_video=None):
-    """Cria um vídeo de intro com título, gancho narrado e fundo dinâmico."""
-    print(f"[*] Criando INTRO com HOOK: {hook_text}")
-    
-    # 1. Gerar o áudio da narração (Theme + Hook)
-    audio_path = str(TEMP_DIR / "intro_audio.mp3")
-    text_to_say = f"{theme_title}. {hook_text}"
-    asyncio.run(generate_tts_audio(text_to_say, audio_path))
-    
-    # 2. Filtros de texto
+def montar_intro(theme_title, hook_text, audio_path, perfis, bg_video=None, base=0, tag="", duration=None):
+    """
+    Segmento da intro (título e gancho sobre o fundo, com a narração) para os
+    perfis dados. duration corta vídeo e áudio nesse tempo (no render do vídeo
+    inteiro, onde não há -shortest por segmento).
+    """
+    profile = perfis[0]
+    s = profile.scaled
+    n = len(perfis)
+    t = tag
+
+    # Filtros de texto
     title_lines = wrap_text_for_ffmpeg(theme_title.upper(), max_chars=15)
     hook_lines = wrap_text_for_ffmpeg(hook_text.upper(), max_chars=20)
-    
-    draw_filters = ""
-    # Título (Cima)
-    for i, line in enumerate(title_lines):
-        safe_line = escape_ffmpeg_text(line)
-        draw_filters += (f",drawtext=fontfile='C\\:/Windows/Fonts/arialbd.ttf':text='{safe_line}':"
-                         f"fontcolor=yellow:fontsize=80:x=(w-text_w)/2:y=600+({i}*100):borderw=4")
-    
-    # Hook (Meio/Baixo)
-    for i, line in enumerate(hook_lines):
-        safe_line = escape_ffmpeg_text(line)
-        draw_filters += (f",drawtext=fontfile='C\\:/Windows/Fonts/arialbd.ttf':text='{safe_line}':"
-                         f"fontcolor=white:fontsize=65:x=(w-text_w)/2:y=1100+({i}*80):borderw=4")
+    font = ffmpeg_font_path(INTRO_FONT)
 
-    # 3. Configurar entrada de vídeo
-    if bg_video and Path(bg_video).exists():
-        v_input = ["-i", str(bg_video)]
-        v_filter = f"[0:v]scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920:(iw-ow)/2:(ih-oh)/2,boxblur=25:25,colorchannelmixer=rr=0.5:gg=0.5:bb=0.5{draw_filters}[v]"
+    def draw_filters(H):
+        # Alturas do quadro 9:16 (1920) proporcionais à altura de cada formato
+        def y(v):
+            return int(round(v * H / 1920))
+        filtros = ""
+        # Título (Cima)
+        for i, line in enumerate(title_lines):
+            safe_line = escape_ffmpeg_text(line)
+            filtros += (f",drawtext=fontfile='{font}':text='{safe_line}':"
+                        f"fontcolor=yellow:fontsize={s(80)}:x=(w-text_w)/2:y={y(600)}+({i}*{s(100)}):borderw={s(4)}")
+        # Hook (Meio/Baixo)
+        for i, line in enumerate(hook_lines):
+            safe_line = escape_ffmpeg_text(line)
+            filtros += (f",drawtext=fontfile='{font}':text='{safe_line}':"
+                        f"fontcolor=white:fontsize={s(65)}:x=(w-text_w)/2:y={y(1100)}+({i}*{s(80)}):borderw={s(4)}")
+        return filtros
+
+    # Entrada de vídeo (um decode do fundo para todas as saídas)
+    com_fundo = bool(bg_video and Path(bg_video).exists())
+    if com_fundo:
+        entradas = ["-i", str(bg_video)]
     else:
-        v_input = ["-f", "lavfi", "-i", "color=c=black:s=1080x1920"]
-        v_filter = f"[0:v]setsar=1{draw_filters}[v]"
+        entradas = ["-f", "lavfi", "-i", f"color=c=black:s={profile.size}:r={profile.fps}"]
+    entradas += ["-i", str(audio_path)]
+    corte = ""
+    if duration:
+        # Fundo mais curto que a narração segura o último frame
+        corte = f",tpad=stop_mode=clone:stop_duration={duration:.3f},trim=duration={duration:.3f}"
+    bg_ins = [f"{base}:v"] if n == 1 else [f"{t}bg{i}" for i in range(n)]
+    v_filter = "" if n == 1 else f"[{base}:v]split={n}" + "".join(f"[{b}]" for b in bg_ins) + ";"
+    for i, p in enumerate(perfis):
+        W, H = p.width, p.height
+        if com_fundo:
+            v_filter += f"[{bg_ins[i]}]scale={W}:{H}:force_original_aspect_ratio=increase,crop={W}:{H}:(iw-ow)/2:(ih-oh)/2,setsar=1,boxblur={s(25)}:{s(25)},colorchannelmixer=rr=0.5:gg=0.5:bb=0.5"
+        else:
+            v_filter += f"[{bg_ins[i]}]scale={W}:{H},setsar=1"
+        v_filter += f"{draw_filters(H)}{corte}[{t}v{i}];"
+    a_filter = f"[{base + 1}:a]{filtro_loudness(audio_path)}"
+    if duration:
+        a_filter += f",atrim=duration={duration:.3f}"
+    a_filter += f"[{t}a0]" if n == 1 else f",asplit={n}" + "".join(f"[{t}a{i}]" for i in range(n))
+    return Segmento(entradas, v_filter + a_filter, duration=duration)
 
-    cmd = [
-        FFMPEG_EXE, "-y",
-        *v_input,
-        "-i", audio_path,
-        "-filter_complex", f"{v_filter};[1:a]loudnorm=I=-16:TP=-1.5:LRA=11[a]",
-        "-map", "[v]", "-map", "[a]",
-        "-shortest",
-        "-c:v", "libx264", "-r", "30", "-pix_fmt", "yuv420p", "-preset", "fast", "-crf", "22",
-        "-c:a", "aac", "-b:a", "192k", str(out_path)
-    ]
+def create_intro_video(theme_title, hook_text, out_path, bg_video=None, profile=None, temp_dir=None, narration=None,
+                       variants=None):
+    """
+    Cria um vídeo de intro com título, gancho narrado e fundo dinâmico.
+    narration: Future do tts.start() já em andamento (sem ele, sintetiza aqui).
+    variants: [(perfil, caminho)] de saídas extras em outras proporções, no mesmo ffmpeg.
+    """
+    profile = get_profile(profile)
+    saidas = [(profile, out_path)] + list(variants or [])
+    print(f"[*] Criando INTRO com HOOK: {hook_text}")
+    audio_path = esperar_narracao(narration, theme_title, hook_text)
+    seg = montar_intro(theme_title, hook_text, audio_path, [p for p, _ in saidas], bg_video=bg_video)
+
+    cmd = [ffmpeg_exe(), "-y", *seg.entradas, "-filter_complex", seg.filtro]
+    for i, (p, caminho) in enumerate(saidas):
+        cmd += ["-map", f"[v{i}]", "-map", f"[a{i}]", "-shortest", *p.output_args(), str(caminho)]
     
-    subprocess.run(cmd, check=True)
+    with stage("intro_encode", outputs=len(saidas)) as st:
+        instrumentation.run(cmd, check=True)
+        for _, caminho in saidas:
+            st.add_file(caminho)
     return out_path
 
+def esperar_narracao(narration, theme_title, hook_text):
+    """Caminho do áudio da narração (Theme + Hook): normalmente já ficou pronto durante os downloads."""
+    if narration is None:
+        narration = tts.start(intro_narration_text(theme_title, hook_text))
+    with stage("tts", backend=tts.backend, ready=narration.done()) as st:
+        audio_path = str(narration.result())
+        st.add_file(audio_path, downloaded=True)
+    return audio_path
+
 # --- FIM FUNÇÕES INTRO ---
 
-def generate_ranking_data():
+def generate_ranking_data(theme=None):
     history = load_history()
     history_str = "\n".join([f"- {h}" for h in history[-20:]])
     
     print("[*] Pedindo para a IA criar um tema, ranking e um HOOK viral...")
     
-    # Lista de modelos para fallback caso um falhe ou esteja congestionado
-    models_to_try = [
-        "llama-3.3-70b-versatile",
-        "llama-3.1-70b-versatile",
-        "mixtral-8x7b-32768",
-        "llama3-70b-8192"
-    ]
-    
     prompt = f"""
     Act as a STRICT Music Historian and Viral Producer. 
     Your goal is to create a "Top 10" or "Top 5" ranking based on 100% REAL and VERIFIED data.
@@ -140,6 +384,8 @@ def generate_ranking_data():
     - ITEMS: Each item MUST include "artist", "song", and the exact "stat" (e.g., "3.2 Billion Views", "14 Weeks at #1").
     - STARTING HOOK: Create a "hook_text" that references the data (e.g., "These numbers are legendary!").
     
+    {f'REQUIRED THEME (use exactly this theme): {theme}' if theme else ''}
+    
     PREVIOUSLY USED (DO NOT REPEAT):
     {history_str}
     
@@ -158,108 +404,93 @@ def generate_ranking_data():
     }}
     """
     
-    for model_name in models_to_try:
-        try:
-            print(f"[*] Tentando modelo: {model_name}...")
-            chat_completion = groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=model_name,
-            )
-            res = chat_completion.choices[0].message.content
-            txt = res.replace('```json', '').replace('```', '').strip()
-            return json.loads(txt)
-        except Exception as e:
-            print(f"[!] Erro com o modelo {model_name}: {e}")
-            continue # Tenta o próximo modelo
-            
-    print("[!] Todos os modelos de IA falharam.")
-    return {"theme_title": "Error", "ranking": [], "hook_text": "Let's find out!"}
+    # Modelos em paralelo escalonado (RANKING_HEDGE_S), JSON validado e resposta em cache
+    # (um ranking em cache cujo tema já está no histórico não é repetido)
+    from ranking_provider import RankingError
+    try:
+        dados, fonte = ranking_provider.generate(prompt, theme=theme, avoid=history)
+    except RankingError as e:
+        print(f"[!] {e}")
+        return {"theme_title": "Error", "ranking": [], "hook_text": "Let's find out!"}
+    print(f"[*] Ranking gerado por {fonte}.")
+    if instrumentation.current_report():
+        instrumentation.current_report().meta["ranking_source"] = fonte
+    return dados
+
+def resolver_musica(artist, song, duration_sec=7):
+    """Escolhe o vídeo de uma música (cache de buscas ou YouTube) e a janela do trecho."""
+    escolhido = search_cache.get(artist, song, duration_sec) if search_cache else None
+    if escolhido:
+        print(f"[*] Busca em cache: {artist} - {song}")
+        print(f"    -> Selecionado: {escolhido['title']} [Score: {escolhido['score']}]")
+        return make_plan(escolhido['video_id'], escolhido['url'], escolhido['title'], escolhido['score'],
+                         escolhido['duration'], duration_sec)
 
-def download_video_trecho(artist, song, out_path, duration_sec=7):
     search_query = f"{artist} - {song} Official Music Video"
     print(f"[*] Buscando Oficial no YouTube: '{search_query}'")
-    
-    ydl_opts = {
-        'quiet': True,
-        'noplaylist': True,
-        'match_filter': yt_dlp.utils.match_filter_func("!is_live"), 
-        'ignoreerrors': True,
-        'default_search': 'ytsearch3', 
-    }
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    with stage("search", song=song):
         try:
-            info = ydl.extract_info(search_query, download=False)
-            
-            candidates = []
-            if 'entries' in info:
-                for entry in info['entries']:
-                    if not entry: continue
-                    title_lower = entry.get('title', '').lower()
-                    channel_lower = entry.get('uploader', '').lower()
-                    
-                    score = 0
-                    # Bonus por canal oficial e VEVO
-                    if "vevo" in channel_lower or channel_lower.endswith("- topic"): score += 50
-                    if artist.lower() in channel_lower: score += 30
-                    
-                    # Bonus por título exato
-                    if "official" in title_lower: score += 20
-                    if song.lower() in title_lower: score += 20
-                    if "video" in title_lower or "music" in title_lower: score += 10
-                    
-                    # Penalidades severas para evitar lixo
-                    if any(x in title_lower for x in ["review", "reaction", "cover", "lyrics", "live", "fan-made", "parody", "karaoke", "remix"]):
-                        score -= 200
-                    if any(x in channel_lower for x in ["reaction", "lyrics"]):
-                        score -= 150
-                    
-                    candidates.append((score, entry))
-            
-            if not candidates:
-                print("[!] Nenhum video valido encontrado.")
-                return None, None
-                
-            # Seleciona o que tiver o score mais alto
-            best_video = sorted(candidates, key=lambda x: x[0], reverse=True)[0][1]
-            print(f"    -> Selecionado: {best_video['title']} [Score: {sorted(candidates, key=lambda x: x[0], reverse=True)[0][0]}]")
-            
-            target_url = best_video['webpage_url']
-            duration = best_video.get('duration', 180)
-            
+            plano = plan_from_entries(youtube.search(search_query), artist, song, duration_sec)
         except Exception as e:
             print(f"[!] Erro ao buscar: {e}")
+            return None
+    if not plano:
+        print(f"[!] Nenhum video valido encontrado para {artist} - {song}.")
+        return None
+    print(f"    -> Selecionado: {plano['title']} [Score: {plano['score']}]")
+    if search_cache:
+        search_cache.put(artist, song, duration_sec, plano['video_id'], plano['url'], plano['title'], plano['score'], plano['duration'])
+    return plano
+
+def download_video_trecho(artist, song, out_path, duration_sec=7, plano=None):
+    if plano is None:
+        plano = resolver_musica(artist, song, duration_sec)
+        if plano is None:
             return None, None
+    video_id = plano['video_id']
+    target_url = plano['url']
+    start_time, end_time = plano['start'], plano['end']
 
-    start_time = max(0, int(duration * 0.35))
-    end_time = start_time + duration_sec
-    
-    print(f"[*] Baixando trecho (de {start_time}s até {end_time}s)...")
-    
-    cmd = [
-        sys.executable, "-m", "yt_dlp",
-        "--quiet", "--no-warnings",
-        "--download-sections", f"*{start_time}-{end_time}",
-        "--force-keyframes-at-cuts",
-        "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-        "--ffmpeg-location", FFMPEG_EXE,
-        "-o", str(out_path),
-        target_url
+    em_cache = segment_cache.get(video_id, start_time, end_time, DOWNLOAD_FORMAT) if segment_cache else None
+    baixado = None
+    with stage("download", song=song, cache_hit=bool(em_cache)) as st:
+        if em_cache:
+            print(f"[*] Trecho em cache (de {start_time}s até {end_time}s), sem download.")
+            shutil.copyfile(em_cache, out_path)
+            baixado = out_path
+        else:
+            print(f"[*] Baixando trecho (de {start_time}s até {end_time}s)...")
+            
+            try:
+                youtube.download_section(video_id, target_url, start_time, end_time, out_path, label=f"{artist} - {song}")
+                # Só o arquivo final conta: sobras .part/.ytdl ou formatos ainda não mesclados não são trecho
+                if out_path.is_file() and out_path.stat().st_size > 0:
+                    baixado = out_path
+                else:
+                    print(f"[!] Download de {artist} - {song} terminou sem gerar {out_path.name}.")
+            except Exception as e:
+                print(f"[!] Erro ao baixar trecho: {e}")
+            if baixado:
+                st.add_file(baixado, downloaded=True)
+
+    if baixado is None:
+        return None, None
+    if segment_cache and not em_cache:
+        try:
+            segment_cache.put(baixado, video_id, start_time, end_time, DOWNLOAD_FORMAT)
+        except OSError as e:
+            print(f"[!] Não foi possível guardar o trecho no cache: {e}")
+    if segment_cache:
+        lembrar_trecho(baixado, video_id, start_time, end_time, DOWNLOAD_FORMAT)
+    # Extrair thumbnail (primeiro frame)
+    thumb_path = out_path.with_suffix('.jpg')
+    cmd_thumb = [
+        ffmpeg_exe(), "-y", "-i", str(baixado), "-vframes", "1", "-q:v", "2", str(thumb_path)
     ]
-    
-    subprocess.run(cmd)
-    
-    arquivos_possiveis = list(Path(out_path).parent.glob(out_path.name + "*"))
-    if arquivos_possiveis:
-        baixado = arquivos_possiveis[0]
-        # Extrair thumbnail (primeiro frame)
-        thumb_path = out_path.with_suffix('.jpg')
-        cmd_thumb = [
-            FFMPEG_EXE, "-y", "-i", str(baixado), "-vframes", "1", "-q:v", "2", str(thumb_path)
-        ]
-        subprocess.run(cmd_thumb, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return baixado, thumb_path
-    return out_path, None
+    with stage("thumb", song=song) as st:
+        instrumentation.run(cmd_thumb, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        st.add_file(thumb_path)
+    return baixado, thumb_path
 
 def create_text_filter(text, font_size, y_start, color="white", box_color="black@0.6", border_w=3):
     max_chars = 25
@@ -287,70 +518,430 @@ def create_text_filter(text, font_size, y_start, color="white", box_color="black
         )
     return filters
 
-def criar_trecho_video(video_orig, theme_title, rank_info, out_path, thumb_path, start_offset=0):
-    print(f"[*] Extraindo frames do vídeo para animação circular (start: {start_offset}s)...")
-    video_frames_dir = TEMP_DIR / f"video_frames_{rank_info['rank']}"
-    video_frames_dir.mkdir(exist_ok=True)
-    
-    cmd_extract = [
-        FFMPEG_EXE, "-y", "-ss", str(start_offset), "-i", str(video_orig),
-        "-t", "7.0",
-        "-vf", "fps=30,crop='min(iw,ih)':'min(iw,ih)',scale=300:300",
-        "-q:v", "2", str(video_frames_dir / "thumb_%04d.jpg")
-    ]
-    subprocess.run(cmd_extract, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def pipe_frames_to_ffmpeg(cmd, frames, max_buffered=FRAME_QUEUE_SIZE):
+    """
+    Roda o ffmpeg escrevendo os frames (bytes) no stdin dele.
+    A renderização roda numa thread produtora com fila limitada: se o ffmpeg
+    atrasar, a fila enche e o render espera (backpressure).
+    """
+    proc = instrumentation.Popen(cmd, stdin=subprocess.PIPE)
+    fila = queue.Queue(maxsize=max_buffered)
+    parar = threading.Event()
+    erro_render = []
+
+    def produzir():
+        try:
+            for frame in frames:
+                while not parar.is_set():
+                    try:
+                        fila.put(frame, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if parar.is_set():
+                    return
+        except Exception as e:
+            erro_render.append(e)
+        finally:
+            while not parar.is_set():
+                try:
+                    fila.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
 
+    # A thread herda o contexto: o tempo de render entra no relatório da execução
+    produtor = threading.Thread(target=instrumentation.in_context(produzir), daemon=True)
+    produtor.start()
+    try:
+        while True:
+            frame = fila.get()
+            if frame is None:
+                break
+            proc.stdin.write(frame)
+    except (BrokenPipeError, OSError):
+        pass # ffmpeg encerrou antes; o código de saída diz o motivo
+    finally:
+        parar.set()
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        returncode = proc.wait()
+        instrumentation.track_process(proc)
+        produtor.join()
+
+    if erro_render:
+        raise erro_render[0]
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+def montar_trecho(video_orig, theme_title, rank_info, perfis, start_offset=0, frames_mode=None, thumb_mode=None,
+                  card_workers=None, duration=7.0, frames_root=None, base=0, tag="", card_in=None, card_pool=None):
+    """
+    Segmento do clipe de um rank para os perfis dados (mesma escala e fps).
+    As entradas começam no índice base; card_in é o rótulo de um stream de
+    folhas do card que já está no grafo (sem ele o clipe traz a própria entrada).
+    card_pool: pool de processos do job para o render do card (card_frame_pool).
+    """
+    from card_generator import (generate_frames_for_clip, iter_raw_frames_for_clip, VideoFrameSource,
+                                CardLayout, write_thumb_layers, animated_frame_count)
+    frames_mode = frames_mode or CARD_FRAMES_MODE
+    thumb_mode = thumb_mode or THUMB_MODE
+    card_workers = card_workers or CARD_RENDER_WORKERS
+    profile = perfis[0]
+    fps = profile.fps
+    fade_out = duration - 0.5
+    if any(p.scale != profile.scale or p.fps != fps for p in perfis):
+        raise ValueError("As variantes precisam da mesma escala e fps do perfil principal")
+    layout = CardLayout(profile.scale)
+    t = tag
+
+    if thumb_mode == "filtergraph":
+        # Thumb no filter graph: só os frames que animam saem do Python
+        thumb_source = None
+        animated_only = True
+        n_frames = animated_frame_count(duration, fps)
+        mask_path, ring_path = write_thumb_layers(frames_root, layout.thumb_size, layout.ring_width)
+    else:
+        # Frames do thumbnail circular: decodificados uma vez por pipe, direto para o render
+        thumb_source = VideoFrameSource(ffmpeg_exe(), video_orig, start_offset=start_offset, duration=duration, fps=fps, size=layout.thumb_size)
+        animated_only = False
+        n_frames = int(duration * fps)
+
+    entradas = ["-ss", str(start_offset), "-t", str(duration), "-i", str(video_orig)]
+    src, card = f"{base}:v", card_in
+    frames, png_dir = None, None
     print(f"[*] Gerando UI Cards animados para #{rank_info['rank']}...")
-    frames_dir = generate_frames_for_clip(TEMP_DIR, rank_info, theme_title, video_frames_dir=video_frames_dir, duration=7.0, fps=30)
-    
-    # Sequence de imagens
-    frames_input = str(Path(frames_dir) / "frame_%04d.png").replace('\\', '/')
-    
-    # Fundo do vídeo (blur e escurecimento + Fade)
-    v_filter = (
-        f"[0:v]scale=1080:1920:force_original_aspect_ratio=increase,"
-        f"crop=1080:1920:(iw-ow)/2:(ih-oh)/2,"
-        f"setsar=1," 
-        f"boxblur=20:20,"
-        f"colorchannelmixer=rr=0.4:gg=0.4:bb=0.4,"
-        f"fade=t=in:st=0:d=0.5,fade=t=out:st=6.5:d=0.5[bg];" # Fades de 0.5s
-        f"[1:v]scale=1080:1920,fade=t=in:st=0:d=0.5,fade=t=out:st=6.5:d=0.5[overlay];"
-        f"[bg][overlay]overlay=0:0[v]"
-    )
+    if frames_mode == "png":
+        png_dir = generate_frames_for_clip(frames_root, rank_info, theme_title, duration=duration, fps=fps,
+                                           frame_source=thumb_source, animated_only=animated_only, workers=card_workers,
+                                           scale=profile.scale, pool=card_pool)
+        # Sequence de imagens
+        entradas += ["-framerate", str(fps), "-i", str(Path(png_dir) / "frame_%04d.png").replace('\\', '/')]
+        card = f"{base + 1}:v"
+    else:
+        # Frames RGBA crus pelo stdin, sem arquivos intermediários (gerados durante o encode)
+        frames = iter_raw_frames_for_clip(rank_info, theme_title, duration=duration, fps=fps,
+                                          frame_source=thumb_source, animated_only=animated_only, workers=card_workers,
+                                          scale=profile.scale, pool=card_pool)
+        if card_in is None:
+            entradas += ["-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{layout.W}x{layout.H}", "-framerate", str(fps), "-i", "pipe:0"]
+            card = f"{base + 1}:v"
+
+    n = len(perfis)
+    card_chain = f"[{card}]"
+    bg_ins = [src] if n == 1 else [f"{t}src{i}" for i in range(n)]
+    src_split = "" if n == 1 else f"[{src}]split={n}" + "".join(f"[{b}]" for b in bg_ins) + ";"
+    if thumb_mode == "filtergraph":
+        proximo = base + entradas.count("-i")
+        mask_in, ring_in = f"{proximo}:v", f"{proximo + 1}:v"
+        entradas += [
+            "-loop", "1", "-framerate", str(fps), "-t", str(duration), "-i", mask_path,
+            "-loop", "1", "-framerate", str(fps), "-t", str(duration), "-i", ring_path,
+        ]
+        # Segura o último frame do card até o fim do trecho e monta o thumb por cima
+        hold = max(duration - n_frames / fps, 0)
+        # O decode do trecho alimenta o thumb e os fundos de todas as saídas
+        bg_ins = [f"{t}src{i}" for i in range(n)]
+        src_split = f"[{src}]split={n + 1}[{t}thumb_src]" + "".join(f"[{b}]" for b in bg_ins) + ";"
+        card_chain = (
+            f"[{card}]tpad=stop_mode=clone:stop_duration={hold:.3f}[{t}card_hold];"
+            + layout.thumb_filter(f"{t}thumb_src", mask_in, ring_in, f"{t}card_hold", f"{t}card", fps=fps, prefix=t) + ";"
+            + f"[{t}card]"
+        )
+
+    # Fundo de cada saída (blur e escurecimento + Fade) e o card por cima
+    fades = f",fade=t=in:st=0:d=0.5,fade=t=out:st={fade_out}:d=0.5" # Fades de 0.5s
+    v_filter = src_split + f"{card_chain}null[{t}sheet];"
+    for i, p in enumerate(perfis):
+        W, H = p.width, p.height
+        v_filter += (
+            f"[{bg_ins[i]}]scale={W}:{H}:force_original_aspect_ratio=increase,"
+            f"crop={W}:{H}:(iw-ow)/2:(ih-oh)/2,"
+            f"setsar=1,"
+            f"boxblur={profile.scaled(20)}:{profile.scaled(20)},"
+            f"colorchannelmixer=rr=0.4:gg=0.4:bb=0.4"
+            f"{fades}[{t}bg{i}];"
+        )
+    v_filter += layout.bands_filter(f"{t}sheet", [(f"{t}bg{i}", p.width, p.height, f"{t}v{i}") for i, p in enumerate(perfis)],
+                                    fades=fades, prefix=t)
+    a_filter = f"[{base}:a]{filtro_loudness(video_orig, start_offset, duration)},afade=t=in:st=0:d=0.5,afade=t=out:st={fade_out}:d=0.5"
+    a_filter += f"[{t}a0]" if n == 1 else f",asplit={n}" + "".join(f"[{t}a{i}]" for i in range(n))
+    return Segmento(entradas, f"{v_filter};{a_filter}", frames=frames, n_frames=n_frames, png_dir=png_dir,
+                    duration=duration)
+
+def criar_trecho_video(video_orig, theme_title, rank_info, out_path, thumb_path, start_offset=0, frames_mode=None, thumb_mode=None, card_workers=None, profile=None, duration=7.0, temp_dir=None, frames_dir=None, variants=None, card_pool=None):
+    """
+    Renderiza o clipe de um rank. variants: [(perfil, caminho)] de saídas extras
+    em outras proporções (mesma escala): o trecho é decodificado e o card
+    renderizado uma vez só, e o mesmo ffmpeg codifica todas as saídas.
+    """
+    frames_mode = frames_mode or CARD_FRAMES_MODE
+    thumb_mode = thumb_mode or THUMB_MODE
+    profile = get_profile(profile)
+    temp_dir = Path(temp_dir or TEMP_DIR)
+    frames_root = Path(frames_dir or temp_dir) # máscara/anel do thumb e PNGs do card
+    saidas = [(profile, out_path)] + list(variants or [])
+    seg = montar_trecho(video_orig, theme_title, rank_info, [p for p, _ in saidas], start_offset=start_offset,
+                        frames_mode=frames_mode, thumb_mode=thumb_mode, card_workers=card_workers, duration=duration,
+                        frames_root=frames_root, card_pool=card_pool)
 
     cmd = [
-        FFMPEG_EXE, "-y", 
-        "-ss", str(start_offset), "-t", "7.0", "-i", str(video_orig),
-        "-framerate", "30", "-i", frames_input, # Imagens do card
-        "-filter_complex", f"{v_filter};[0:a]afade=t=in:st=0:d=0.5,afade=t=out:st=6.5:d=0.5,loudnorm=I=-16:TP=-1.5:LRA=11[a]", 
-        "-map", "[v]", "-map", "[a]",
-        "-c:v", "libx264", "-r", "30", "-g", "60", "-sc_threshold", "0", 
-        "-pix_fmt", "yuv420p", "-preset", "fast", "-crf", "20",
-        "-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2",
-        str(out_path)
+        ffmpeg_exe(), "-y", 
+        *seg.entradas, # Trecho, imagens do card e (modo filtergraph) máscara e anel do thumb
+        "-filter_complex", seg.filtro,
+    ]
+    for i, (p, caminho) in enumerate(saidas):
+        cmd += ["-map", f"[v{i}]", "-map", f"[a{i}]", *p.output_args(), str(caminho)]
+    # No modo stream o render dos frames acontece durante o encode (e também aparece em card_frames)
+    with stage("encode", rank=rank_info['rank'], frames_mode=frames_mode, thumb_mode=thumb_mode, outputs=len(saidas)) as st:
+        if seg.frames is None:
+            instrumentation.run(cmd, check=True)
+            shutil.rmtree(seg.png_dir, ignore_errors=True) # libera o tmpfs para o próximo clipe
+        else:
+            pipe_frames_to_ffmpeg(cmd, seg.frames)
+        for _, caminho in saidas:
+            st.add_file(caminho)
+
+def renderizar_programa(clipes, saidas, theme_title, intro=None, frames_mode=None, thumb_mode=None, card_workers=None,
+                        duration=7.0, frames_dir=None, transition=None, card_pool=None):
+    """
+    Motor "graph": o vídeo inteiro (intro + clipes) num único filter_complex e
+    um único encode, sem MP4 intermediários nem concat por cópia.
+    clipes: [(trecho baixado, rank_info, start_offset)] na ordem do vídeo;
+    intro: (título, gancho, áudio da narração, fundo) ou None;
+    saidas: [(perfil, caminho)]; transition > 0 troca os cortes secos por xfade.
+    No modo stream as folhas de todos os cards vão em fila pelo stdin e cada
+    clipe pega a sua fatia com trim.
+    """
+    frames_mode = frames_mode or CARD_FRAMES_MODE
+    transition = TRANSITION_DURATION if transition is None else transition
+    perfis = [p for p, _ in saidas]
+    profile = perfis[0]
+    frames_root = Path(frames_dir or TEMP_DIR)
+    entradas, filtros, segmentos = [], [], []
+    base = 0
+    stream = frames_mode != "png" and bool(clipes)
+    if stream:
+        from card_generator import CardLayout
+        layout = CardLayout(profile.scale)
+        entradas += ["-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{layout.W}x{layout.H}",
+                     "-framerate", str(profile.fps), "-i", "pipe:0"]
+        base = 1
+    if intro:
+        titulo, gancho, audio_path, bg_video = intro
+        # Sem -shortest aqui: a intro só termina no corte pela duração da narração
+        # (o fundo preto do lavfi não acaba, e as junções com xfade dependem dela)
+        duracao_intro = media_duration(ffmpeg_exe(), audio_path)
+        if not duracao_intro:
+            raise ValueError(f"Não foi possível medir a duração da narração ({audio_path})")
+        seg = montar_intro(titulo, gancho, audio_path, perfis, bg_video=bg_video, base=base, tag="s0",
+                           duration=duracao_intro)
+        segmentos.append(seg)
+        base += seg.n_inputs
+    for k, (video, r, offset) in enumerate(clipes):
+        seg = montar_trecho(video, theme_title, r, perfis, start_offset=offset, frames_mode=frames_mode,
+                            thumb_mode=thumb_mode, card_workers=card_workers, duration=duration,
+                            frames_root=frames_root, base=base, tag=f"s{len(segmentos)}",
+                            card_in=f"c{k}" if stream else None, card_pool=card_pool)
+        segmentos.append(seg)
+        base += seg.n_inputs
+    for seg in segmentos:
+        entradas += seg.entradas
+        filtros.append(seg.filtro)
+
+    if stream:
+        # Uma fatia do stdin por clipe, na ordem em que os frames são escritos
+        filtros.append("[0:v]split=" + str(len(clipes)) + "".join(f"[c{k}raw]" for k in range(len(clipes))))
+        inicio = 0
+        for k, seg in enumerate(segmentos[len(segmentos) - len(clipes):]):
+            filtros.append(f"[c{k}raw]trim=start_frame={inicio}:end_frame={inicio + seg.n_frames},setpts=PTS-STARTPTS[c{k}]")
+            inicio += seg.n_frames
+
+    n = len(segmentos)
+    for i, p in enumerate(perfis):
+        if transition <= 0 or n == 1:
+            filtros.append("".join(f"[s{k}v{i}][s{k}a{i}]" for k in range(n)) + f"concat=n={n}:v=1:a=1[v{i}][a{i}]")
+            continue
+        # xfade precisa de fps e timebase iguais nas duas entradas
+        for k in range(n):
+            filtros.append(f"[s{k}v{i}]fps={p.fps},settb=AVTB,format=yuv420p[x{k}v{i}]")
+        v, a, offset = f"x0v{i}", f"s0a{i}", 0.0
+        for k in range(1, n):
+            offset += segmentos[k - 1].duration - transition
+            v_out = f"v{i}" if k == n - 1 else f"j{k}v{i}"
+            a_out = f"a{i}" if k == n - 1 else f"j{k}a{i}"
+            filtros.append(f"[{v}][x{k}v{i}]xfade=transition=fade:duration={transition}:offset={offset:.3f}[{v_out}]")
+            filtros.append(f"[{a}][s{k}a{i}]acrossfade=d={transition}[{a_out}]")
+            v, a = v_out, a_out
+
+    cmd = [ffmpeg_exe(), "-y", *entradas, "-filter_complex", ";".join(filtros)]
+    for i, (p, caminho) in enumerate(saidas):
+        cmd += ["-map", f"[v{i}]", "-map", f"[a{i}]", *p.output_args(), str(caminho)]
+    with stage("program", segments=n, outputs=len(saidas), frames_mode=frames_mode, transition=transition) as st:
+        try:
+            if stream:
+                pipe_frames_to_ffmpeg(cmd, itertools.chain.from_iterable(seg.frames for seg in segmentos if seg.frames))
+            else:
+                instrumentation.run(cmd, check=True)
+        finally:
+            for seg in segmentos:
+                if seg.png_dir:
+                    shutil.rmtree(seg.png_dir, ignore_errors=True)
+        for _, caminho in saidas:
+            st.add_file(caminho)
+    return saidas[0][1]
+
+def concatenar_videos(arquivos, arquivo_final, temp_dir=None):
+    """
+    Junta os trechos (intro + ranking) com o concat demuxer, sem recodificar.
+    Levanta SegmentMismatchError se algum trecho não segue a mesma especificação de saída.
+    """
+    temp_dir = Path(temp_dir or TEMP_DIR)
+    concat_txt = temp_dir / "concat.txt"
+    with open(concat_txt, "w", encoding="utf-8") as f:
+        for p in arquivos:
+            # Trechos da pasta temp entram pelo nome (o ffmpeg roda com cwd=temp)
+            safe_path = p.name if Path(p).parent == temp_dir else Path(p).absolute().as_posix()
+            f.write(f"file '{safe_path}'\n")
+    
+    cmd_concat = [
+        ffmpeg_exe(), "-y", "-f", "concat", "-safe", "0", 
+        "-i", str(concat_txt), "-c", "copy", str(arquivo_final)
     ]
-    subprocess.run(cmd, check=True)
+    # Só concatena se todos os segmentos podem ser copiados (senão o áudio/vídeo final sai quebrado)
+    with stage("probe", segments=len(arquivos)):
+        check_concat_compatible(ffmpeg_exe(), arquivos)
+    with stage("concat", segments=len(arquivos)) as st:
+        instrumentation.run(cmd_concat, check=True, cwd=str(temp_dir))
+        st.add_file(arquivo_final)
+    return arquivo_final
+
+def salvar_relatorio(report, arquivo_final=None):
+    """Grava o run_report.json ao lado do vídeo final (ou em output/ se a execução falhou)."""
+    if arquivo_final:
+        destino = Path(arquivo_final).with_name(Path(arquivo_final).stem + "_run_report.json")
+    else:
+        job = report.meta.get("job")
+        destino = OUTPUT_DIR / f"Falha_{int(time.time())}{f'_{job}' if job else ''}_run_report.json"
+    try:
+        report.save(destino)
+        print(f"[*] Relatório da execução: {destino}")
+    except OSError as e:
+        print(f"[!] Não foi possível gravar o relatório: {e}")
+
+def estimar_bytes_frames(profile, frames_mode=None, clips=10, duration=7.0):
+    """Espaço que os frames do card de um vídeo ocupam (PNGs do card comprimem ~8x)."""
+    if (frames_mode or CARD_FRAMES_MODE) != "png":
+        return 16 * 1024 * 1024 # só máscara/anel do thumb
+    return clips * int(duration * profile.fps) * profile.width * profile.height * 4 // 8
+
+def ultimo_job():
+    """Id do job mais recente em jobs/ (para --resume sem id)."""
+    jobs = sorted(JOBS_DIR.glob("job_*/manifest.json"), key=lambda p: p.stat().st_mtime)
+    return jobs[-1].parent.name[len("job_"):] if jobs else None
+
+def main(download_workers=None, render_workers=None, profile=None, theme=None, temp_dir=None,
+         download_pool=None, render_pool=None, job_id=None, resume=None, aspects=None, engine=None):
+    """
+    Gera um vídeo. resume=<id do job> (ou "latest") reaproveita as etapas já
+    concluídas desse job cujas entradas não mudaram. aspects: proporções das
+    saídas (padrão OUTPUT_ASPECTS); devolve o vídeo da primeira. engine: motor
+    de render (padrão RENDER_ENGINE).
+    """
+    profile = get_profile(profile)
+    criar_pastas()
+    if resume:
+        job_id = ultimo_job() if resume == "latest" else resume
+        if not job_id or not (JOBS_DIR / f"job_{job_id}" / "manifest.json").exists():
+            print(f"[!] Job para retomar não encontrado: {resume}")
+            return None
+    else:
+        sweep_stale(JOBS_DIR, max_age_hours=JOB_KEEP_DAYS * 24)
+    job_id = job_id or f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    job_dir = JOBS_DIR / f"job_{job_id}"
+    print(f"[*] Job {job_id} (para retomar: python main.py --resume {job_id})")
+    report = None
+    arquivo_final = None
+    try:
+        with instrumentation.run_report("ranking_video", profile=profile.name, job=job_id) as report, \
+             ExitStack() as scratch_stack:
+            frames_dir = None
+            if temp_dir is None:
+                # Pasta só deste job, apagada no fim com sucesso ou erro
+                scratch = scratch_stack.enter_context(ScratchSpace(
+                    job_id, TEMP_DIR,
+                    frames_bytes=estimar_bytes_frames(profile), tmpfs=SCRATCH_TMPFS, min_free_mb=SCRATCH_MIN_FREE_MB))
+                temp_dir, frames_dir = scratch.path, scratch.frames_path
+            arquivo_final = gerar_video(download_workers, render_workers, profile, theme=theme, temp_dir=temp_dir,
+                                        frames_dir=frames_dir, download_pool=download_pool, render_pool=render_pool,
+                                        job_id=job_id, job_dir=job_dir, aspects=aspects, engine=engine)
+            if not arquivo_final:
+                report.status = "failed"
+    finally:
+        if report is not None:
+            salvar_relatorio(report, arquivo_final)
+    return arquivo_final
+
+# Jobs simultâneos do modo batch: o próximo só pede um tema depois que o
+# anterior entrou no histórico (evita temas repetidos no mesmo lote)
+_history_lock = threading.Lock()
 
-def main():
-    clear_temp()
+def gerar_video(download_workers=None, render_workers=None, profile=None, theme=None, temp_dir=None,
+                frames_dir=None, download_pool=None, render_pool=None, job_id=None, job_dir=None, aspects=None,
+                engine=None):
+    """
+    Gera um vídeo completo com os intermediários em temp_dir (frames do card em
+    frames_dir); com download_pool/render_pool usa os pools compartilhados do batch.
+    As saídas de cada etapa ficam em job_dir com o manifesto do job: as que já
+    existem para as mesmas entradas são reaproveitadas.
+    Cada proporção de aspects gera o seu vídeo final; devolve o da primeira.
+    engine="graph" pula os MP4 intermediários: depois dos downloads, um único
+    ffmpeg renderiza o vídeo inteiro (ver renderizar_programa).
+    """
+    profile = get_profile(profile)
+    engine = engine or RENDER_ENGINE
+    if engine not in RENDER_ENGINES:
+        raise ValueError(f"Motor de render desconhecido: {engine} (opções: {', '.join(RENDER_ENGINES)})")
+    # Um perfil por formato; cada clipe e a intro saem em todos num ffmpeg só
+    perfis = [profile.for_aspect(a) for a in parse_aspects(aspects or OUTPUT_ASPECTS)]
+    profile = perfis[0]
+
+    def saidas(nome):
+        # Formato principal sem sufixo (mesmos nomes de antes); os outros com a proporção
+        return [job_dir / (f"{nome}.mp4" if i == 0 else f"{nome}_{p.tag}.mp4") for i, p in enumerate(perfis)]
+
+    def variantes(caminhos):
+        return list(zip(perfis[1:], caminhos[1:]))
+    temp_dir = Path(temp_dir or TEMP_DIR)
+    job_dir = Path(job_dir or temp_dir)
+    manifest = JobManifest(job_dir)
     print("=" * 50)
     print("🎬 AUTOMACAO TOP 5 (AUDIO PRO & INTRO NARRADA) 🎬")
     print("=" * 50)
     
-    dados = generate_ranking_data()
-    theme_title = dados.get('theme_title', 'TOP 5 MUSIC RANKING')
-    ranking = dados.get('ranking', [])
-    
-    if not ranking:
-        print("[!] Erro: Nenhum ranking gerado.")
-        return
+    dados = manifest.load_ranking()
+    if dados and dados.get('ranking'):
+        print(f"[*] Ranking do job reaproveitado ({manifest.ranking_path})")
+        theme_title = dados.get('theme_title', 'TOP 5 MUSIC RANKING')
+        ranking = dados['ranking']
+        print(f"\n🎼 TEMA: {theme_title}")
+    else:
+        with _history_lock:
+            dados = generate_ranking_data(theme)
+            theme_title = dados.get('theme_title', 'TOP 5 MUSIC RANKING')
+            ranking = dados.get('ranking', [])
+            
+            if not ranking:
+                print("[!] Erro: Nenhum ranking gerado.")
+                return
 
-    print(f"\n🎼 TEMA: {theme_title}")
-    save_history(theme_title)
-    
-    arquivos_ranking = []
-    video_para_intro = None
-    arquivos_finais = []
+            print(f"\n🎼 TEMA: {theme_title}")
+            save_history(theme_title)
+        manifest.save_ranking(dados)
+    if instrumentation.current_report():
+        instrumentation.current_report().meta["theme"] = theme_title
     
     # 1. GERA OS CLIPES DO RANKING PRIMEIRO
     # Garantir que o rank seja inteiro para ordenação correta
@@ -362,73 +953,321 @@ def main():
             
     ranks = sorted(ranking, key=lambda x: x['rank'], reverse=True)
     
-    primeiro_processado = True
     intro_duration = 4.0
-    
-    for r in ranks:
+    hook_text = dados.get('hook_text', "Wait until you see #1!")
+    # A narração da intro só depende do texto: sintetiza enquanto as músicas são resolvidas e baixadas
+    narracao = tts.start(intro_narration_text(theme_title, hook_text))
+    download_workers = download_workers or DOWNLOAD_WORKERS
+    render_workers = render_workers or RENDER_WORKERS
+    if download_pool is None:
+        print(f"[*] Pipeline: {download_workers} download(s) e {render_workers} render(s) em paralelo "
+              f"(perfil {profile.name}, motor {engine})")
+
+    def duracao_download(idx):
+        # O primeiro (ex: #10) baixa tempo extra para a intro
+        return 7 + intro_duration if idx == 0 else 7
+
+    def chave_download(idx, r):
+        return manifest.key(artist=r['artist'], song=r['song'], duration=duracao_download(idx))
+
+    # Resolve todas as músicas (busca + escolha do vídeo) antes de baixar qualquer uma;
+    # os trechos já salvos no job não precisam de busca
+    pendentes = {idx: (r['artist'], r['song'], duracao_download(idx)) for idx, r in enumerate(ranks)
+                 if not manifest.outputs(f"download_{r['rank']}", chave_download(idx, r))}
+    if pendentes:
+        print(f"\n[*] Resolvendo {len(pendentes)} música(s) no YouTube...")
+    # Barra de progresso: resolução, download e render de cada rank, intro e vídeo final
+    progresso = instrumentation.Progress(2 * len(ranks) + 3)
+    with stage("resolve", songs=len(pendentes)):
+        planos = resolve_all(pendentes, resolver_musica, max_in_flight=RESOLVE_WORKERS)
+    progresso.step("resolve")
+    sem_video = [ranks[idx] for idx, plano in planos.items() if plano is None]
+    for r in sem_video:
+        print(f"[!] Sem vídeo para #{r['rank']}: {r['artist']} - {r['song']}. Ignorando.")
+
+    def baixar(idx, r):
         pos = r['rank']
         print(f"\n[*] Processando #{pos}: {r['artist']} - {r['song']}")
-        
-        vid_bruto = TEMP_DIR / f"bruto_{pos}.mp4"
-        
-        # Se for o primeiro (ex: #10), baixar tempo extra para a intro
-        duracao_download = 7 + intro_duration if primeiro_processado else 7
-        baixado, thumb_path = download_video_trecho(r['artist'], r['song'], vid_bruto, duration_sec=duracao_download)
-        
-        if not baixado or not Path(baixado).exists():
-            print(f"[!] Falha ao baixar #{pos}. Ignorando.")
-            continue
-            
-        # O primeiro vídeo baixado será usado como fundo da intro (take contínuo)
-        if primeiro_processado:
-            video_para_intro = baixado
-            # Criar a intro usando os primeiros segundos do primeiro clipe
-            try:
-                hook_text = dados.get('hook_text', "Wait until you see #1!")
-                intro_path = TEMP_DIR / "intro_final.mp4"
-                # A intro só usa o início do vídeo
-                create_intro_video(theme_title, hook_text, intro_path, bg_video=video_para_intro)
-                if intro_path.exists():
-                    arquivos_finais.append(intro_path)
-            except Exception as e:
-                print(f"[!] Erro ao criar intro dinâmica: {e}")
+        chave = chave_download(idx, r)
+        salvo = manifest.outputs(f"download_{pos}", chave)
+        if salvo:
+            print(f"[*] #{pos}: trecho do job reaproveitado.")
+            return salvo[0], salvo[1]
+        plano = planos.get(idx)
+        if plano is None:
+            return None, None
+        vid_bruto = job_dir / f"bruto_{pos}.mp4"
+        for velho in job_dir.glob(vid_bruto.name + "*"):
+            velho.unlink()
+        baixado, thumb_path = download_video_trecho(r['artist'], r['song'], vid_bruto,
+                                                    duration_sec=duracao_download(idx), plano=plano)
+        if baixado and Path(baixado).exists():
+            manifest.record(f"download_{pos}", chave, [baixado, thumb_path])
+        return baixado, thumb_path
 
-        vid_pronto = TEMP_DIR / f"pronto_{pos}.mp4"
+    def renderizar(idx, r, baixado, thumb_path):
+        pos = r['rank']
+        vid_pronto, *_ = prontos = saidas(f"pronto_{pos}")
+        # O primeiro clipe do ranking começa depois do trecho usado na intro
+        offset = intro_duration if idx == 0 else 0
+        chave = manifest.key(segment=manifest.digest(baixado), rank=r, theme=theme_title, offset=offset,
+                             profile=[vars(p) for p in perfis], thumb_mode=THUMB_MODE, audio=AUDIO_MASTERING,
+                             version=RENDER_VERSION)
+        salvo = manifest.outputs(f"clip_{pos}", chave)
+        if salvo:
+            print(f"[*] #{pos}: clipe do job reaproveitado.")
+            return salvo
         try:
-            # Se for o primeiro, o clipe do ranking começa após a intro
-            offset = intro_duration if primeiro_processado else 0
-            criar_trecho_video(baixado, theme_title, r, vid_pronto, thumb_path, start_offset=offset)
-            if vid_pronto.exists():
-                arquivos_ranking.append(vid_pronto)
+            criar_trecho_video(baixado, theme_title, r, vid_pronto, thumb_path, start_offset=offset, profile=profile,
+                               temp_dir=temp_dir, frames_dir=frames_dir, variants=variantes(prontos), card_pool=card_pool)
+            if all(p.exists() for p in prontos):
+                manifest.record(f"clip_{pos}", chave, prontos)
+                return prontos
         except Exception as e:
             print(f"[!] Erro ao processar video #{pos}: {e}")
-            
-        primeiro_processado = False
+        return None
+
+    def renderizar_intro(video_para_intro):
+        # A intro usa o início do primeiro clipe como fundo (take contínuo)
+        intro_path, *_ = intros = saidas("intro_final")
+        chave = manifest.key(theme=theme_title, hook=hook_text, bg=manifest.digest(video_para_intro),
+                             profile=[vars(p) for p in perfis], font=INTRO_FONT, audio=AUDIO_MASTERING,
+                             tts=[tts.voice, tts.rate, tts.backend], version=RENDER_VERSION)
+        salvo = manifest.outputs("intro", chave)
+        if salvo:
+            print("[*] Intro do job reaproveitada.")
+            return salvo
+        try:
+            create_intro_video(theme_title, hook_text, intro_path, bg_video=video_para_intro, profile=profile,
+                               temp_dir=temp_dir, narration=narracao, variants=variantes(intros))
+            if all(p.exists() for p in intros):
+                manifest.record("intro", chave, intros)
+                return intros
+        except Exception as e:
+            print(f"[!] Erro ao criar intro dinâmica: {e}")
+        return None
+
+    def nomes_finais():
+        nome_final = re.sub(r'[^a-zA-Z0-9]', '', theme_title)
+        sufixo = f"_{job_id}" if job_id else ""
+        base_final = f"Viral_{nome_final}_{int(time.time())}{sufixo}"
+        return [OUTPUT_DIR / (f"{base_final}.mp4" if i == 0 else f"{base_final}_{p.tag}.mp4") for i, p in enumerate(perfis)]
+
+    def renderizar_video_inteiro(baixados):
+        # Motor graph: intro e clipes entram direto no filter graph do vídeo final
+        validos = [(idx, r) for idx, r in enumerate(ranks) if baixados[idx]]
+        if not validos:
+            print("[!] Nenhum video gerado.")
+            return
+        # O primeiro clipe do ranking começa depois do trecho usado na intro
+        trechos = [(baixados[idx], r, intro_duration if idx == 0 else 0) for idx, r in validos]
+        # A intro usa o início do primeiro clipe como fundo; sem ele, fundo preto (como no motor segments)
+        fundo_intro = baixados[0] if baixados[0] and Path(baixados[0]).exists() else None
+        chave = manifest.key(segments=[manifest.digest(b) for b, _, _ in trechos], ranks=[r for _, r, _ in trechos],
+                             theme=theme_title, hook=hook_text, bg=manifest.digest(fundo_intro),
+                             profile=[vars(p) for p in perfis], thumb_mode=THUMB_MODE, font=INTRO_FONT,
+                             audio=AUDIO_MASTERING, tts=[tts.voice, tts.rate, tts.backend],
+                             transition=TRANSITION_DURATION, version=RENDER_VERSION)
+        finais = manifest.outputs("program", chave)
+        if finais:
+            print(f"\n[*] Nada mudou desde o último render deste job.")
+        else:
+            audio_path = esperar_narracao(narracao, theme_title, hook_text)
+            print(f"\n[*] 🎞️ Renderizando o vídeo inteiro (Intro Dinâmica + {len(trechos)} clipe(s)) num ffmpeg só...")
+            finais = nomes_finais()
+            try:
+                renderizar_programa(trechos, list(zip(perfis, finais)), theme_title,
+                                    intro=(theme_title, hook_text, audio_path, fundo_intro), frames_dir=frames_dir or temp_dir,
+                                    card_pool=card_pool)
+            except Exception as e:
+                print(f"[!] Erro ao renderizar o vídeo: {e}")
+                return
+            if AUDIO_MASTERING == "final":
+                for p, arquivo in zip(perfis, finais):
+                    masterizar_final(arquivo, p)
+            manifest.record("program", chave, finais)
+        for _, r in validos:
+            progresso.step("render", rank=r['rank'], ok=True)
+        progresso.step("intro", ok=True)
+        progresso.step("final", output=str(finais[0]))
+        print(f"\n✅ SUCESSO! Video salvo em:\n" + "\n".join(str(p) for p in finais))
+        return finais[0]
+
+    # Resultados indexados pela posição no ranking: a ordem final não depende
+    # de qual download/render termina primeiro
+    clipes = [None] * len(ranks)
+    baixados = [None] * len(ranks)
+    intro_future = None
+    with ExitStack() as pools:
+        # Sem pools do batch, cria os deste vídeo (e espera por eles na saída)
+        if download_pool is None:
+            download_pool = pools.enter_context(ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="download"))
+        if render_pool is None:
+            render_pool = pools.enter_context(ThreadPoolExecutor(max_workers=render_workers, thread_name_prefix="render"))
+        # Processos do render dos cards: um pool por job, reaproveitado em todos os clipes
+        card_pool = None
+        if CARD_RENDER_WORKERS > 1:
+            from card_generator import card_frame_pool
+            card_pool = pools.enter_context(card_frame_pool(CARD_RENDER_WORKERS))
+        downloads = {download_pool.submit(instrumentation.in_context(baixar), idx, r): idx for idx, r in enumerate(ranks)}
+        renders = {}
+        for fut in as_completed(downloads):
+            idx = downloads[fut]
+            r = ranks[idx]
+            try:
+                baixado, thumb_path = fut.result()
+            except Exception as e:
+                print(f"[!] Erro ao baixar #{r['rank']}: {e}")
+                baixado, thumb_path = None, None
+
+            ok = baixado and Path(baixado).exists()
+            progresso.step("download", rank=r['rank'], ok=bool(ok))
+            if engine == "graph":
+                # Nada renderiza antes de todos os downloads: o vídeo sai de um ffmpeg só
+                if ok:
+                    baixados[idx] = baixado
+                else:
+                    print(f"[!] Falha ao baixar #{r['rank']}. Ignorando.")
+                    progresso.step("render", rank=r['rank'], ok=False)
+                continue
+            if idx == 0:
+                intro_future = render_pool.submit(instrumentation.in_context(renderizar_intro), baixado if ok else None)
+                intro_future.add_done_callback(lambda f: progresso.step("intro", ok=f.exception() is None and bool(f.result())))
+            if not ok:
+                print(f"[!] Falha ao baixar #{r['rank']}. Ignorando.")
+                progresso.step("render", rank=r['rank'], ok=False)
+                continue
+            renders[render_pool.submit(instrumentation.in_context(renderizar), idx, r, baixado, thumb_path)] = idx
 
-    # Adiciona os clipes do ranking após a intro já adicionada
-    arquivos_finais.extend(arquivos_ranking)
+        for fut in as_completed(renders):
+            clipes[renders[fut]] = fut.result()
+            progresso.step("render", rank=ranks[renders[fut]]['rank'], ok=bool(clipes[renders[fut]]))
+
+        if engine == "graph":
+            return renderizar_video_inteiro(baixados)
+
+    # Segmentos de cada formato: arquivos_finais[i] são os do formato perfis[i]
+    arquivos_finais = [[] for _ in perfis]
+    intro_paths = intro_future.result() if intro_future else None
+    # Adiciona os clipes do ranking após a intro
+    for segmentos in ([intro_paths] if intro_paths else []) + [c for c in clipes if c]:
+        for i, seg in enumerate(segmentos):
+            arquivos_finais[i].append(seg)
         
-    if not arquivos_finais:
+    if not arquivos_finais[0]:
         print("[!] Nenhum video gerado.")
         return
         
+    chave = manifest.key(segments=[[manifest.digest(p) for p in segs] for segs in arquivos_finais],
+                         audio=AUDIO_MASTERING)
+    salvo = manifest.outputs("final", chave)
+    if salvo:
+        print(f"\n[*] Nada mudou desde o último render deste job.")
+        print(f"\n✅ SUCESSO! Video salvo em:\n" + "\n".join(str(p) for p in salvo))
+        progresso.step("final", output=str(salvo[0]))
+        return salvo[0]
+
     print("\n[*] 🎞️ Unindo tudo (Intro Dinâmica + Ranking)...")
-    concat_txt = TEMP_DIR / "concat.txt"
-    with open(concat_txt, "w", encoding="utf-8") as f:
-        for p in arquivos_finais:
-            safe_path = str(p.name)
-            f.write(f"file '{safe_path}'\n")
-            
-    nome_final = re.sub(r'[^a-zA-Z0-9]', '', theme_title)
-    arquivo_final = OUTPUT_DIR / f"Viral_{nome_final}_{int(time.time())}.mp4"
+    finais = nomes_finais()
+    for p, segs, arquivo_final in zip(perfis, arquivos_finais, finais):
+        concatenar_videos(segs, arquivo_final, temp_dir=temp_dir)
+        if AUDIO_MASTERING == "final":
+            masterizar_final(arquivo_final, p)
+    manifest.record("final", chave, finais)
+    progresso.step("final", output=str(finais[0]))
     
-    cmd_concat = [
-        FFMPEG_EXE, "-y", "-f", "concat", "-safe", "0", 
-        "-i", str(concat_txt), "-c", "copy", str(arquivo_final)
-    ]
-    subprocess.run(cmd_concat, check=True, cwd=str(TEMP_DIR))
-    
-    print(f"\n✅ SUCESSO! Video salvo em:\n{arquivo_final}")
+    print(f"\n✅ SUCESSO! Video salvo em:\n" + "\n".join(str(p) for p in finais))
+    return finais[0]
     
+def batch(count=None, jobs=2, themes=None, profile=None, download_workers=None, render_workers=None, aspects=None,
+          engine=None):
+    """
+    Gera vários vídeos numa execução só: até `jobs` vídeos ao mesmo tempo,
+    todos dividindo os mesmos pools de download e render. Cada job tem a sua
+    pasta de trabalho (ScratchSpace); a falha de um job fica registrada e o lote continua.
+    """
+    profile = get_profile(profile)
+    criar_pastas()
+    temas = list(themes or [])
+    count = count or len(temas) or 1
+    download_workers = download_workers or DOWNLOAD_WORKERS
+    render_workers = render_workers or RENDER_WORKERS
+    lote = time.strftime("%Y%m%d_%H%M%S")
+    print(f"[*] Lote {lote}: {count} vídeo(s), {jobs} por vez, {download_workers} download(s) e "
+          f"{render_workers} render(s) compartilhados (perfil {profile.name})")
+
+    def rodar_job(i, download_pool, render_pool):
+        job_id = f"{lote}_{i + 1:03d}"
+        tema = temas[i] if i < len(temas) else None
+        t0 = time.perf_counter()
+        arquivo, erro = None, None
+        try:
+            arquivo = main(profile=profile, theme=tema, download_pool=download_pool,
+                           render_pool=render_pool, job_id=job_id, aspects=aspects, engine=engine)
+            if not arquivo:
+                erro = "nenhum vídeo gerado"
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        return {"job": job_id, "theme": tema, "status": "ok" if arquivo else "failed",
+                "output": str(arquivo) if arquivo else None, "error": erro,
+                "wall_s": round(time.perf_counter() - t0, 1)}
+
+    resultados = []
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="download") as download_pool, \
+         ThreadPoolExecutor(max_workers=render_workers, thread_name_prefix="render") as render_pool, \
+         ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="job") as job_pool:
+        futuros = [job_pool.submit(rodar_job, i, download_pool, render_pool) for i in range(count)]
+        for fut in as_completed(futuros):
+            r = fut.result()
+            resultados.append(r)
+            if r["status"] == "ok":
+                print(f"\n[*] Job {r['job']} concluído em {r['wall_s']}s: {r['output']}")
+            else:
+                print(f"\n[!] Job {r['job']} falhou: {r['error']}")
+    wall = time.perf_counter() - inicio
+
+    resultados.sort(key=lambda r: r["job"])
+    ok = sum(1 for r in resultados if r["status"] == "ok")
+    por_hora = ok * 3600 / wall if wall > 0 else 0
+    print("\n" + "=" * 50)
+    print(f"📦 LOTE {lote}: {ok}/{count} vídeo(s) em {wall / 60:.1f} min ({por_hora:.1f} vídeos/hora)")
+    for r in resultados:
+        if r["status"] != "ok":
+            print(f"    [!] {r['job']} ({r['theme'] or 'tema livre'}): {r['error']}")
+    print("=" * 50)
+
+    resumo = {"batch": lote, "profile": profile.name, "count": count, "jobs": jobs, "ok": ok,
+              "failed": count - ok, "wall_s": round(wall, 1), "videos_per_hour": round(por_hora, 2),
+              "results": resultados}
+    with open(OUTPUT_DIR / f"Lote_{lote}_batch_report.json", "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+    return resultados
+
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Gera um vídeo de ranking musical.")
+    parser.add_argument("--profile", default=None, help="perfil de render: final (padrão) ou draft")
+    parser.add_argument("--aspects", default=None, help="proporções das saídas, ex: 9:16,1:1,16:9 (padrão: OUTPUT_ASPECTS)")
+    parser.add_argument("--engine", choices=RENDER_ENGINES, default=None,
+                        help="motor de render: segments (clipes em paralelo + concat) ou graph (um encode só)")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None, metavar="JOB",
+                        help="retoma um job (sem id: o mais recente), refazendo só as etapas que mudaram")
+    sub = parser.add_subparsers(dest="command")
+    p_batch = sub.add_parser("batch", help="gera vários vídeos numa execução só")
+    p_batch.add_argument("--count", type=int, default=None, help="quantidade de vídeos (padrão: 1 por tema do arquivo)")
+    p_batch.add_argument("--jobs", type=int, default=2, help="vídeos gerados ao mesmo tempo")
+    p_batch.add_argument("--themes", default=None, help="arquivo com um tema por linha")
+    p_batch.add_argument("--profile", default=argparse.SUPPRESS, help="perfil de render")
+    p_batch.add_argument("--aspects", default=argparse.SUPPRESS, help="proporções das saídas")
+    p_batch.add_argument("--engine", choices=RENDER_ENGINES, default=argparse.SUPPRESS, help="motor de render")
+    args = parser.parse_args()
+    if args.command == "batch":
+        temas = None
+        if args.themes:
+            with open(args.themes, "r", encoding="utf-8") as f:
+                temas = [l.strip() for l in f if l.strip() and not l.startswith("#")]
+        resultados = batch(count=args.count, jobs=args.jobs, themes=temas, profile=args.profile,
+                           aspects=args.aspects, engine=args.engine)
+        sys.exit(0 if any(r["status"] == "ok" for r in resultados) else 1)
+    main(profile=args.profile, resume=args.resume, aspects=args.aspects, engine=args.engine)
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+# Cache local de buscas e trechos baixados do YouTube.
+# Músicas clássicas reaparecem em vários temas: com o cache quente elas não
+# geram nenhum tráfego para o YouTube.
+
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def _now():
+    return time.time()
+
+
+def _write_json_atomic(path, data):
+    tmp = Path(path).with_name(f"{Path(path).name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SearchCache:
+    """
+    (artista, música, duração do trecho) -> vídeo escolhido na busca (id, url,
+    score, duração). A duração do trecho entra na chave porque a escolha
+    depende dela (vídeos curtos demais para o trecho ficam de fora).
+    Índice JSON único com expiração por idade e LRU por número de entradas.
+    """
+
+    def __init__(self, index_path, max_entries=5000, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.index_path = Path(index_path)
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._entries = _load_json(self.index_path)
+
+    @staticmethod
+    def key(artist, song, duration_sec):
+        return f"{artist.strip().lower()}|{song.strip().lower()}|{float(duration_sec):g}"
+
+    def get(self, artist, song, duration_sec):
+        with self._lock:
+            entry = self._entries.get(self.key(artist, song, duration_sec))
+            if not entry:
+                return None
+            if _now() - entry.get("created", 0) > self.max_age:
+                del self._entries[self.key(artist, song, duration_sec)]
+                self._save()
+                return None
+            # Integridade: sem id ou url a entrada não serve para baixar
+            if not entry.get("video_id") or not entry.get("url"):
+                del self._entries[self.key(artist, song, duration_sec)]
+                self._save()
+                return None
+            entry["last_used"] = _now()
+            self._save()
+            return dict(entry)
+
+    def put(self, artist, song, duration_sec, video_id, url, title, score, duration):
+        with self._lock:
+            agora = _now()
+            self._entries[self.key(artist, song, duration_sec)] = {
+                "video_id": video_id, "url": url, "title": title,
+                "score": score, "duration": duration,
+                "created": agora, "last_used": agora,
+            }
+            self._evict()
+            self._save()
+
+    def _evict(self):
+        agora = _now()
+        for k in [k for k, e in self._entries.items() if agora - e.get("created", 0) > self.max_age]:
+            del self._entries[k]
+        excesso = len(self._entries) - self.max_entries
+        if excesso > 0:
+            por_uso = sorted(self._entries, key=lambda k: self._entries[k].get("last_used", 0))
+            for k in por_uso[:excesso]:
+                del self._entries[k]
+
+    def _save(self):
+        _write_json_atomic(self.index_path, self._entries)
+
+
+class SegmentCache:
+    """
+    Trechos baixados endereçados por conteúdo: a chave é (video_id, início, fim,
+    formato) e cada arquivo guarda o sha256 para checar integridade na leitura.
+    Despejo LRU por tamanho total e por idade.
+    Cada entrada aceita metadados extras (ex: medição de loudness).
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / "index.json"
+        self._entries = _load_json(self.index_path)
+
+    @staticmethod
+    def key(video_id, start, end, fmt):
+        raw = f"{video_id}|{start}|{end}|{fmt}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, video_id, start, end, fmt):
+        """Caminho do trecho em cache, ou None (ausente, expirado ou corrompido)."""
+        k = self.key(video_id, start, end, fmt)
+        with self._lock:
+            entry = self._entries.get(k)
+            if not entry:
+                return None
+            path = self.cache_dir / entry["file"]
+            valido = (
+                _now() - entry.get("created", 0) <= self.max_age
+                and path.exists()
+                and path.stat().st_size == entry.get("size")
+                and file_sha256(path) == entry.get("sha256")
+            )
+            if not valido:
+                self._drop(k)
+                self._save()
+                return None
+            entry["last_used"] = _now()
+            self._save()
+            return path
+
+    def put(self, src_path, video_id, start, end, fmt):
+        """Copia um trecho recém-baixado para o cache e devolve o caminho em cache."""
+        src_path = Path(src_path)
+        k = self.key(video_id, start, end, fmt)
+        nome = k + "".join(src_path.suffixes)
+        destino = self.cache_dir / nome
+        tmp = destino.with_name(f"{nome}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(src_path, tmp)
+        sha = file_sha256(tmp)
+        os.replace(tmp, destino)
+        with self._lock:
+            agora = _now()
+            self._entries[k] = {
+                "file": nome, "size": destino.stat().st_size, "sha256": sha,
+                "video_id": video_id, "start": start, "end": end, "format": fmt,
+                "created": agora, "last_used": agora, "meta": {},
+            }
+            self._evict()
+            self._save()
+        return destino
+
+    def get_meta(self, video_id, start, end, fmt, name):
+        with self._lock:
+            entry = self._entries.get(self.key(video_id, start, end, fmt))
+            return entry.get("meta", {}).get(name) if entry else None
+
+    def set_meta(self, video_id, start, end, fmt, name, value):
+        with self._lock:
+            entry = self._entries.get(self.key(video_id, start, end, fmt))
+            if entry:
+                entry.setdefault("meta", {})[name] = value
+                self._save()
+
+    def find(self, sha256):
+        """Chave (video_id, início, fim, formato) do trecho com esse conteúdo, ou None."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.get("sha256") == sha256:
+                    return entry["video_id"], entry["start"], entry["end"], entry["format"]
+        return None
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(e.get("size", 0) for e in self._entries.values())
+
+    def _drop(self, k):
+        entry = self._entries.pop(k, None)
+        if entry:
+            try:
+                os.remove(self.cache_dir / entry["file"])
+            except OSError:
+                pass
+
+    def _evict(self):
+        agora = _now()
+        for k in [k for k, e in self._entries.items() if agora - e.get("created", 0) > self.max_age]:
+            self._drop(k)
+        total = sum(e.get("size", 0) for e in self._entries.values())
+        for k in sorted(self._entries, key=lambda k: self._entries[k].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries[k].get("size", 0)
+            self._drop(k)
+
+    def _save(self):
+        _write_json_atomic(self.index_path, self._entries)
@@ -0,0 +1,198 @@
+import re
+import struct
+import hashlib
+import subprocess
+from pathlib import Path
+import instrumentation
+
+# Conferência dos segmentos antes do concat com -c copy: o demuxer só copia
+# pacotes, então intro e clipes precisam ter os mesmos parâmetros de stream.
+# No MP4 o SPS/PPS do H.264 fica no avcC e o arquivo final leva só o do
+# primeiro segmento, então ele também tem que ser idêntico em todos.
+
+
+class SegmentMismatchError(RuntimeError):
+    """Segmentos que não podem ser concatenados sem recodificar."""
+
+
+_INPUT_RE = re.compile(r"^Input #(\d+), .* from '(.*)':$")
+_STREAM_RE = re.compile(r"^\s*Stream #(\d+):\d+.*?: (Video|Audio): (.*)$")
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+# Campos comparados entre os segmentos
+VIDEO_KEYS = ("codec", "profile", "pix_fmt", "size", "sar", "fps", "tbn", "avcc")
+AUDIO_KEYS = ("codec", "profile", "sample_rate", "layout", "sample_fmt")
+
+
+def _campos(texto):
+    """Divide a descrição do stream nas vírgulas de fora dos parênteses/colchetes."""
+    campos, nivel, atual = [], 0, ""
+    for c in texto:
+        if c in "([":
+            nivel += 1
+        elif c in ")]":
+            nivel -= 1
+        if c == "," and nivel == 0:
+            campos.append(atual.strip())
+            atual = ""
+        else:
+            atual += c
+    campos.append(atual.strip())
+    return campos
+
+
+def _codec_e_perfil(campo):
+    # "h264 (High) (avc1 / 0x31637661)" -> ("h264", "High"); a tag (com "/") não é perfil
+    codec = campo.split()[0]
+    m = re.match(r"\w+ \(([^)/]+)\)", campo)
+    return codec, (m.group(1) if m else None)
+
+
+def _parse_video(texto):
+    campos = _campos(texto)
+    codec, perfil = _codec_e_perfil(campos[0])
+    info = {"codec": codec, "profile": perfil,
+            "pix_fmt": campos[1].split("(")[0] if len(campos) > 1 else None,
+            "size": None, "sar": None, "fps": None, "tbn": None}
+    for c in campos[2:]:
+        m = re.match(r"(\d+x\d+)(?: \[SAR (\d+:\d+))?", c)
+        if m and info["size"] is None:
+            info["size"], info["sar"] = m.group(1), m.group(2)
+        elif c.endswith(" fps"):
+            info["fps"] = c.split()[0]
+        elif " tbn" in c:
+            info["tbn"] = c.split()[0]
+    return info
+
+
+def _parse_audio(texto):
+    campos = _campos(texto)
+    codec, perfil = _codec_e_perfil(campos[0])
+    info = {"codec": codec, "profile": perfil, "sample_rate": None, "layout": None, "sample_fmt": None}
+    resto = [c for c in campos[1:] if not c.endswith("kb/s") and "kb/s " not in c]
+    for c in resto:
+        if c.endswith(" Hz"):
+            info["sample_rate"] = int(c.split()[0])
+        elif info["layout"] is None:
+            info["layout"] = c
+        elif info["sample_fmt"] is None:
+            info["sample_fmt"] = c
+    return info
+
+
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+# Tamanho do cabeçalho fixo da sample entry antes das caixas filhas
+_SAMPLE_ENTRY_HEADER = {b"avc1": 78, b"avc3": 78}
+
+
+def _boxes(f, start, end):
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def avcc_digest(path):
+    """sha1 do avcC (SPS/PPS) da trilha H.264 de um MP4; None se não há."""
+    with open(path, "rb") as f:
+        fim = f.seek(0, 2)
+
+        def procurar(start, end):
+            for kind, body, box_end in _boxes(f, start, end):
+                if kind in _CONTAINERS:
+                    achado = procurar(body, box_end)
+                    if achado:
+                        return achado
+                elif kind == b"stsd":
+                    # versão/flags e número de entradas, depois as sample entries
+                    for entry, e_body, e_end in _boxes(f, body + 8, box_end):
+                        skip = _SAMPLE_ENTRY_HEADER.get(entry)
+                        if skip is None:
+                            continue
+                        for child, c_body, c_end in _boxes(f, e_body + skip, e_end):
+                            if child == b"avcC":
+                                f.seek(c_body)
+                                return hashlib.sha1(f.read(c_end - c_body)).hexdigest()
+            return None
+
+        return procurar(0, fim)
+
+
+def probe_segments(ffmpeg_exe, paths):
+    """
+    Parâmetros de vídeo/áudio de vários arquivos num único `ffmpeg -i a -i b ...`
+    (sem ffprobe). Devolve uma lista de {"path", "video", "audio"} na ordem de paths.
+    """
+    paths = [Path(p) for p in paths]
+    faltando = [str(p) for p in paths if not p.exists()]
+    if faltando:
+        raise SegmentMismatchError(f"Segmentos não encontrados: {', '.join(faltando)}")
+    cmd = [ffmpeg_exe, "-hide_banner"]
+    for p in paths:
+        cmd += ["-i", str(p)]
+    # Sem saída o ffmpeg só lista as entradas e sai com erro; o código de saída não importa
+    res = instrumentation.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    infos = [{"path": str(p), "video": None, "audio": None} for p in paths]
+    for linha in res.stderr.decode("utf-8", errors="replace").splitlines():
+        m = _STREAM_RE.match(linha)
+        if not m:
+            continue
+        i = int(m.group(1))
+        tipo = m.group(2).lower()
+        # Só o primeiro stream de cada tipo entra no concat
+        if i < len(infos) and infos[i][tipo] is None:
+            infos[i][tipo] = _parse_video(m.group(3)) if tipo == "video" else _parse_audio(m.group(3))
+    for info, p in zip(infos, paths):
+        if info["video"] is not None:
+            info["video"]["avcc"] = avcc_digest(p) if info["video"]["codec"] == "h264" else None
+    return infos
+
+
+def media_duration(ffmpeg_exe, path):
+    """Duração do arquivo em segundos (a do cabeçalho que o `ffmpeg -i` mostra), ou None."""
+    res = instrumentation.run([ffmpeg_exe, "-hide_banner", "-i", str(path)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    m = _DURATION_RE.search(res.stderr.decode("utf-8", errors="replace"))
+    if not m:
+        return None
+    h, mi, s = m.groups()
+    return int(h) * 3600 + int(mi) * 60 + float(s)
+
+
+def concat_mismatches(infos):
+    """Diferenças de cada segmento em relação ao primeiro (lista de textos; vazia = pode copiar)."""
+    if not infos:
+        return []
+    ref = infos[0]
+    problemas = []
+    for info in infos:
+        nome = Path(info["path"]).name
+        for tipo, chaves in (("video", VIDEO_KEYS), ("audio", AUDIO_KEYS)):
+            a, b = ref[tipo], info[tipo]
+            if a is None or b is None:
+                if (a is None) != (b is None):
+                    problemas.append(f"{nome}: {'sem' if b is None else 'com'} stream de {tipo}")
+                continue
+            for k in chaves:
+                if a.get(k) != b.get(k):
+                    problemas.append(f"{nome}: {tipo} {k} {b.get(k)} (esperado {a.get(k)})")
+    return problemas
+
+
+def check_concat_compatible(ffmpeg_exe, paths):
+    """Levanta SegmentMismatchError se os segmentos não podem ir para o concat com -c copy."""
+    infos = probe_segments(ffmpeg_exe, paths)
+    problemas = concat_mismatches(infos)
+    if problemas:
+        raise SegmentMismatchError("Segmentos incompatíveis com concat sem recodificar:\n  " + "\n  ".join(problemas))
+    return infos
@@ -0,0 +1,301 @@
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+import instrumentation
+
+# Geração do ranking (tema, gancho e itens) por LLM. Em vez de tentar um
+# modelo por vez sem prazo, o pedido vai para o primeiro modelo e, se ele não
+# responder dentro do orçamento de latência (ou falhar), o próximo entra em
+# paralelo ("hedging"): vale a primeira resposta válida. Toda resposta passa
+# por extract_json + validate_ranking e fica num cache em disco pela chave do
+# pedido (tema pedido, modelos e versão do prompt; o histórico de temas fica de
+# fora, senão a chave mudaria a cada vídeo); o modo replay responde só do cache
+# e das fixtures, sem rede (batch e benchmark offline).
+
+DEFAULT_MODELS = [
+    "llama-3.3-70b-versatile",
+    "llama-3.1-70b-versatile",
+    "mixtral-8x7b-32768",
+    "llama3-70b-8192",
+]
+# Quanto esperar pela resposta de um modelo antes de disparar o próximo
+DEFAULT_HEDGE_DELAY_S = 8.0
+# Prazo total do pedido (todos os modelos juntos)
+DEFAULT_TIMEOUT_S = 60.0
+DEFAULT_MAX_AGE_DAYS = 30
+MODES = ("groq", "replay", "fixture")
+
+
+class RankingError(RuntimeError):
+    """Nenhum provedor conseguiu um ranking válido."""
+
+
+class RankingSchemaError(ValueError):
+    """Resposta que não segue o formato do ranking."""
+
+
+def extract_json(text):
+    """
+    Primeiro objeto JSON do texto, onde quer que ele esteja: cercas ```json,
+    frases antes ou depois e texto com chaves soltas não atrapalham.
+    """
+    decoder = json.JSONDecoder()
+    inicio = text.find("{")
+    while inicio >= 0:
+        try:
+            obj, _ = decoder.raw_decode(text, inicio)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        inicio = text.find("{", inicio + 1)
+    raise RankingSchemaError("Nenhum objeto JSON na resposta")
+
+
+def _texto(item, campo, problemas, onde):
+    valor = item.get(campo)
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        valor = str(valor)
+    if not isinstance(valor, str) or not valor.strip():
+        problemas.append(f"{onde}: '{campo}' ausente ou vazio")
+        return None
+    return valor.strip()
+
+
+def validate_ranking(data):
+    """
+    Confere o formato {theme_title, hook_text, ranking: [{rank, artist, song, stat}]}
+    e devolve uma cópia normalizada (rank inteiro, textos sem espaços nas pontas).
+    Levanta RankingSchemaError com todos os problemas encontrados.
+    """
+    if not isinstance(data, dict):
+        raise RankingSchemaError("O ranking precisa ser um objeto JSON")
+    problemas = []
+    tema = _texto(data, "theme_title", problemas, "raiz")
+    gancho = data.get("hook_text")
+    gancho = gancho.strip() if isinstance(gancho, str) and gancho.strip() else "Wait until you see #1!"
+    itens = data.get("ranking")
+    if not isinstance(itens, list) or not itens:
+        problemas.append("raiz: 'ranking' precisa ser uma lista não vazia")
+        itens = []
+    ranking, vistos = [], set()
+    for i, item in enumerate(itens):
+        onde = f"ranking[{i}]"
+        if not isinstance(item, dict):
+            problemas.append(f"{onde}: não é um objeto")
+            continue
+        try:
+            rank = int(str(item.get("rank")).strip().lstrip("#"))
+        except ValueError:
+            problemas.append(f"{onde}: 'rank' não é um número ({item.get('rank')!r})")
+            rank = None
+        if rank is not None and (rank < 1 or rank in vistos):
+            problemas.append(f"{onde}: 'rank' {rank} inválido ou repetido")
+        vistos.add(rank)
+        artista = _texto(item, "artist", problemas, onde)
+        musica = _texto(item, "song", problemas, onde)
+        stat = _texto(item, "stat", problemas, onde)
+        ranking.append({"rank": rank, "artist": artista, "song": musica, "stat": stat})
+    if problemas:
+        raise RankingSchemaError("Ranking inválido: " + "; ".join(problemas))
+    return {"theme_title": tema, "hook_text": gancho, "ranking": ranking}
+
+
+def prompt_key(prompt):
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+def request_key(theme=None, models=None, version=1):
+    """
+    Chave do cache para um pedido: só as entradas estáveis (tema pedido,
+    modelos e versão do template do prompt), sem a lista de temas já usados.
+    """
+    pedido = {"theme": (theme or "").strip().lower(), "models": list(models or []), "version": version}
+    return hashlib.sha1(json.dumps(pedido, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RankingCache:
+    """
+    Respostas já validadas por chave do pedido (request_key), um JSON por chave.
+    Cada arquivo guarda várias respostas (uma por tema, as mais novas primeiro,
+    até max_per_key): sem tema pedido, o cache serve enquanto houver uma cujo
+    tema ainda não foi usado. As respostas expiram por idade.
+    """
+
+    def __init__(self, cache_dir, max_age_days=DEFAULT_MAX_AGE_DAYS, max_per_key=8):
+        self.cache_dir = Path(cache_dir)
+        self.max_age = max_age_days * 86400
+        self.max_per_key = max_per_key
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def _entries(self, key):
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return []
+        # Formato antigo: uma resposta só por arquivo
+        entradas = dados.get("entries", [dados]) if isinstance(dados, dict) else []
+        agora = time.time()
+        return [e for e in entradas if isinstance(e, dict) and agora - e.get("created", 0) <= self.max_age]
+
+    def get(self, key, avoid=()):
+        """Resposta mais nova cujo tema não está em avoid: (dados, fonte), ou None."""
+        usados = {t.strip().lower() for t in avoid}
+        for entry in self._entries(key):
+            try:
+                dados = validate_ranking(entry["data"])
+            except (ValueError, KeyError):
+                continue
+            if dados["theme_title"].lower() not in usados:
+                return dados, entry.get("source")
+        return None
+
+    def put(self, key, data, source, prompt=None):
+        # A resposta nova substitui a de mesmo tema e entra na frente
+        tema = str(data.get("theme_title", "")).strip().lower()
+        entradas = [e for e in self._entries(key)
+                    if str(e.get("data", {}).get("theme_title", "")).strip().lower() != tema]
+        entradas.insert(0, {"prompt": prompt, "source": source, "created": time.time(), "data": data})
+        path = self.path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": entradas[:self.max_per_key]}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+
+class HedgedGroqProvider:
+    """
+    Pede o ranking aos modelos em cascata com sobreposição: o modelo i+1 é
+    disparado quando o i falha ou passa hedge_delay segundos sem responder.
+    """
+
+    def __init__(self, client, models=None, hedge_delay=DEFAULT_HEDGE_DELAY_S, timeout=DEFAULT_TIMEOUT_S):
+        self.client = client
+        self.models = list(models or DEFAULT_MODELS)
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+
+    def _pedir(self, model, prompt):
+        print(f"[*] Tentando modelo: {model}...")
+        with instrumentation.stage("ranking", model=model) as st:
+            chat_completion = self.client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=model,
+                timeout=self.timeout,
+            )
+            res = chat_completion.choices[0].message.content or ""
+            st.add_bytes(downloaded=len(res.encode("utf-8")))
+            return validate_ranking(extract_json(res))
+
+    def generate(self, prompt, theme=None, avoid=()):
+        """Primeiro ranking válido entre os modelos; devolve (dados, modelo). Os temas já usados vão no prompt."""
+        prazo = time.monotonic() + self.timeout
+        pool = ThreadPoolExecutor(max_workers=len(self.models), thread_name_prefix="ranking")
+        pendentes = {}
+        fila = list(self.models)
+        erros = []
+
+        def disparar():
+            model = fila.pop(0)
+            pendentes[pool.submit(instrumentation.in_context(self._pedir), model, prompt)] = model
+
+        try:
+            disparar()
+            while pendentes:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                prontos, _ = wait(pendentes, timeout=min(self.hedge_delay, restante) if fila else restante,
+                                  return_when=FIRST_COMPLETED)
+                if not prontos:
+                    # Orçamento de latência estourado: o próximo modelo entra em paralelo
+                    if fila:
+                        print(f"[*] {', '.join(pendentes.values())} sem resposta em {self.hedge_delay:g}s: "
+                              f"disparando {fila[0]} em paralelo")
+                        disparar()
+                    continue
+                for fut in prontos:
+                    model = pendentes.pop(fut)
+                    try:
+                        return fut.result(), model
+                    except Exception as e:
+                        print(f"[!] Erro com o modelo {model}: {e}")
+                        erros.append(f"{model}: {e}")
+                        # Falha não espera o orçamento: o próximo entra na hora
+                        if fila:
+                            disparar()
+        finally:
+            # Os pedidos perdedores terminam sozinhos em segundo plano
+            pool.shutdown(wait=False, cancel_futures=True)
+        motivo = "; ".join(erros) if not pendentes else f"prazo de {self.timeout:g}s esgotado"
+        raise RankingError(f"Todos os modelos de IA falharam ({motivo})")
+
+
+class FixtureRankingProvider:
+    """
+    Rankings de arquivos JSON (ex: bench/fixtures): substituto offline do LLM.
+    Com tema, usa a fixture de mesmo título; sem tema, escolhe pela chave do
+    prompt entre as que não estão em avoid (temas já usados).
+    """
+
+    def __init__(self, fixtures_dir):
+        self.fixtures = []
+        for path in sorted(Path(fixtures_dir).glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.fixtures.append((path.name, validate_ranking(json.load(f))))
+            except (OSError, ValueError) as e:
+                print(f"[!] Fixture de ranking ignorada ({path.name}): {e}")
+        if not self.fixtures:
+            raise RankingError(f"Nenhuma fixture de ranking válida em {fixtures_dir}")
+
+    def generate(self, prompt, theme=None, avoid=()):
+        if theme:
+            for nome, dados in self.fixtures:
+                if dados["theme_title"].lower() == theme.strip().lower():
+                    return dict(dados), f"fixture:{nome}"
+        usados = {t.strip().lower() for t in avoid}
+        livres = [f for f in self.fixtures if f[1]["theme_title"].lower() not in usados] or self.fixtures
+        nome, dados = livres[int(prompt_key(prompt), 16) % len(livres)]
+        dados = dict(dados)
+        if theme:
+            dados["theme_title"] = theme.strip().upper()
+        return dados, f"fixture:{nome}"
+
+
+class CachedRankingProvider:
+    """
+    Cache de respostas na frente de outro provedor. record=False (modo replay)
+    só lê: o que não está no cache vem do provedor de reserva (as fixtures).
+    Respostas em cache com tema já usado (avoid) não são repetidas: sem
+    nenhuma livre, o pedido segue para o provedor e a nova resposta se junta
+    às outras da mesma chave. models entra na chave (padrão: os do provedor; o
+    replay passa os do modo groq para achar o que ele gravou); version: suba
+    quando o template do prompt mudar.
+    """
+
+    def __init__(self, cache, provider, record=True, models=None, version=1):
+        self.cache = cache
+        self.provider = provider
+        self.record = record
+        self.models = list(models or getattr(provider, "models", None) or [])
+        self.version = version
+
+    def generate(self, prompt, theme=None, avoid=()):
+        key = request_key(theme, self.models, self.version)
+        achado = self.cache.get(key, avoid=avoid)
+        if achado is not None:
+            dados, fonte = achado
+            print(f"[*] Ranking do cache ({fonte}).")
+            return dados, f"cache:{fonte}"
+        dados, fonte = self.provider.generate(prompt, theme=theme, avoid=avoid)
+        if self.record:
+            self.cache.put(key, dados, fonte, prompt=prompt)
+        return dados, fonte
@@ -0,0 +1,128 @@
+import os
+
+# Perfis de render nomeados: tudo que define custo/qualidade do vídeo
+# (resolução, fps, x264 e áudio) sai daqui em vez de literais espalhados.
+
+# Formatos de saída: proporção -> quadro na escala 1. Um perfil de outra
+# proporção mantém fps, x264, áudio e a escala do layout (lado menor / 1080).
+ASPECTS = {
+    "9:16": (1080, 1920), # Shorts / TikTok / Reels
+    "4:5": (1080, 1350),  # Feed do Instagram
+    "1:1": (1080, 1080),
+    "16:9": (1920, 1080), # Compilação horizontal
+}
+
+
+class RenderProfile:
+    """
+    Resolução, fps, parâmetros do x264 e bitrate de áudio de um render.
+    output_args() é a especificação de saída de todo segmento (intro e clipes):
+    com os mesmos parâmetros o x264 gera o mesmo SPS/PPS e o concat final só
+    copia os streams. Por isso não há CRF separado para a intro.
+    """
+
+    BASE_WIDTH = 1080
+    # Keyframe a cada GOP_SECONDS, sem keyframes extras em troca de cena
+    GOP_SECONDS = 2
+    X264_PROFILE = "high"
+    # Timebase da trilha de vídeo no MP4
+    TIMESCALE = 90000
+    AUDIO_RATE = 44100
+    AUDIO_CHANNELS = 2
+
+    def __init__(self, name, width, height, fps, preset, crf, threads=0, audio_bitrate="192k", aspect="9:16"):
+        self.name = name
+        self.aspect = aspect
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.preset = preset
+        self.crf = crf
+        self.threads = threads # 0 = o x264 decide
+        self.audio_bitrate = audio_bitrate
+
+    @property
+    def scale(self):
+        """Escala do layout em relação ao quadro 1080x1920 (o lado menor do quadro vale 1080)."""
+        return min(self.width, self.height) / self.BASE_WIDTH
+
+    @property
+    def size(self):
+        return f"{self.width}x{self.height}"
+
+    @property
+    def gop(self):
+        return self.GOP_SECONDS * self.fps
+
+    def scaled(self, v):
+        return int(round(v * self.scale))
+
+    def x264_args(self):
+        return [
+            "-c:v", "libx264", "-profile:v", self.X264_PROFILE, "-r", str(self.fps), "-pix_fmt", "yuv420p",
+            "-preset", self.preset, "-crf", str(self.crf),
+            "-g", str(self.gop), "-keyint_min", str(self.gop), "-sc_threshold", "0",
+            "-threads", str(self.threads),
+            "-video_track_timescale", str(self.TIMESCALE),
+        ]
+
+    def audio_args(self):
+        return ["-c:a", "aac", "-b:a", self.audio_bitrate, "-ar", str(self.AUDIO_RATE), "-ac", str(self.AUDIO_CHANNELS)]
+
+    def output_args(self):
+        """Vídeo + áudio de qualquer segmento que vai para o concat."""
+        return self.x264_args() + self.audio_args()
+
+    @property
+    def tag(self):
+        """Proporção para nomes de arquivo (ex: 16x9)."""
+        return self.aspect.replace(":", "x")
+
+    def for_aspect(self, aspect):
+        """O mesmo perfil com o quadro de outra proporção (dimensões pares, como o yuv420p exige)."""
+        if aspect not in ASPECTS:
+            raise ValueError(f"Proporção desconhecida: {aspect} (opções: {', '.join(ASPECTS)})")
+        if aspect == self.aspect:
+            return self
+        w, h = (int(round(v * self.scale / 2)) * 2 for v in ASPECTS[aspect])
+        return RenderProfile(f"{self.name}_{aspect.replace(':', 'x')}", w, h, self.fps, self.preset, self.crf,
+                             threads=self.threads, audio_bitrate=self.audio_bitrate, aspect=aspect)
+
+    def __repr__(self):
+        return f"RenderProfile({self.name!r}, {self.size}@{self.fps}, {self.preset}/crf{self.crf})"
+
+
+PROFILES = {
+    # Qualidade de publicação
+    "final": RenderProfile("final", 1080, 1920, fps=30, preset="fast", crf=20, audio_bitrate="192k"),
+    # Conferência rápida do ranking e dos clipes: mesmo layout, 1/4 dos pixels e metade dos frames
+    "draft": RenderProfile("draft", 540, 960, fps=15, preset="ultrafast", crf=28, audio_bitrate="96k"),
+}
+
+DEFAULT_PROFILE = os.getenv("RENDER_PROFILE", "final")
+
+
+def parse_aspects(aspects):
+    """Lista de proporções a partir de "9:16,1:1" (ou de uma lista); a primeira é a principal."""
+    if isinstance(aspects, str):
+        aspects = aspects.split(",")
+    lista = []
+    for a in aspects:
+        a = a.strip()
+        if a not in ASPECTS:
+            raise ValueError(f"Proporção desconhecida: {a} (opções: {', '.join(ASPECTS)})")
+        if a not in lista:
+            lista.append(a)
+    if not lista:
+        raise ValueError("Nenhuma proporção de saída informada")
+    return lista
+
+
+def get_profile(profile=None):
+    """Aceita um RenderProfile, o nome de um perfil ou None (RENDER_PROFILE / final)."""
+    if isinstance(profile, RenderProfile):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de render desconhecido: {name} (opções: {', '.join(PROFILES)})")
+    return PROFILES[name]
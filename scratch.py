@@ -0,0 +1,133 @@
+import os
+import time
+import shutil
+from pathlib import Path
+
+# Pasta de trabalho isolada por job: os intermediários (trechos baixados,
+# clipes prontos, frames do card, narração) nunca se misturam entre execuções
+# e são apagados no fim, com sucesso ou erro. Os frames podem ficar em tmpfs
+# (/dev/shm) quando há RAM sobrando.
+
+SHM_ROOT = Path("/dev/shm")
+SHM_DIR_NAME = "automacao_ranking"
+# Jobs com mais de tantas horas são restos de execuções que morreram
+STALE_HOURS = 12
+
+
+class ScratchSpaceError(OSError):
+    """Sem espaço livre suficiente para a pasta de trabalho do job."""
+
+
+def _mb(n):
+    return n / (1024 * 1024)
+
+
+def available_ram_bytes():
+    """Memória disponível (MemAvailable) no Linux; None onde não dá para saber."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def remove_tree(path, tentativas=3):
+    """rmtree que tenta de novo (no Windows o ffmpeg pode demorar a soltar os arquivos)."""
+    path = Path(path)
+    for i in range(tentativas):
+        if not path.exists():
+            return True
+        try:
+            shutil.rmtree(path)
+            return True
+        except OSError as e:
+            if i == tentativas - 1:
+                print(f"[!] Não foi possível apagar {path}: {e}")
+                return False
+            time.sleep(0.3)
+
+
+def sweep_stale(root, max_age_hours=STALE_HOURS):
+    """Apaga pastas job_* esquecidas por execuções que morreram no meio."""
+    root = Path(root)
+    if not root.is_dir():
+        return
+    limite = time.time() - max_age_hours * 3600
+    for d in root.glob("job_*"):
+        try:
+            if d.is_dir() and d.stat().st_mtime < limite:
+                remove_tree(d)
+        except OSError:
+            pass
+
+
+class ScratchSpace:
+    """
+    Pastas de trabalho de um job (use com `with`).
+    path: intermediários em disco (root/job_<id>).
+    frames_path: frames do card; em /dev/shm quando tmpfs="auto"/"1" e há RAM
+    para frames_bytes, senão path/frames.
+    Antes de criar confere o espaço livre (min_free_mb + frames em disco).
+    """
+
+    def __init__(self, job_id, root, frames_bytes=0, tmpfs="auto", min_free_mb=1024, ram_reserve_mb=1024):
+        self.job_id = job_id
+        self.root = Path(root)
+        self.path = self.root / f"job_{job_id}"
+        self.frames_bytes = frames_bytes
+        self.tmpfs = str(tmpfs)
+        self.min_free_mb = min_free_mb
+        self.ram_reserve_mb = ram_reserve_mb
+        self.frames_path = self.path / "frames"
+        self.on_tmpfs = False
+
+    def _tmpfs_ok(self):
+        if self.tmpfs == "0" or not SHM_ROOT.is_dir() or not os.access(SHM_ROOT, os.W_OK):
+            return False
+        if self.tmpfs == "1":
+            return True
+        livre_shm = shutil.disk_usage(SHM_ROOT).free
+        ram = available_ram_bytes()
+        reserva = self.ram_reserve_mb * 1024 * 1024
+        return ram is not None and livre_shm >= self.frames_bytes * 1.2 and ram >= self.frames_bytes + reserva
+
+    def create(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        sweep_stale(self.root)
+        self.on_tmpfs = self._tmpfs_ok()
+        precisa = self.min_free_mb * 1024 * 1024 + (0 if self.on_tmpfs else self.frames_bytes)
+        livre = shutil.disk_usage(self.root).free
+        if livre < precisa:
+            raise ScratchSpaceError(f"Pouco espaço em {self.root}: {_mb(livre):.0f} MB livres, "
+                                    f"o job precisa de ~{_mb(precisa):.0f} MB")
+        remove_tree(self.path)
+        self.path.mkdir(parents=True)
+        if self.on_tmpfs:
+            shm_root = SHM_ROOT / SHM_DIR_NAME
+            shm_root.mkdir(exist_ok=True)
+            sweep_stale(shm_root)
+            self.frames_path = shm_root / f"job_{self.job_id}"
+            remove_tree(self.frames_path)
+        self.frames_path.mkdir(parents=True)
+        onde = "tmpfs" if self.on_tmpfs else "disco"
+        print(f"[*] Pasta de trabalho: {self.path} (frames em {onde})")
+        return self
+
+    def cleanup(self):
+        if self.on_tmpfs:
+            remove_tree(self.frames_path)
+        remove_tree(self.path)
+
+    def __enter__(self):
+        try:
+            return self.create()
+        except BaseException:
+            self.cleanup()
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from card_generator import GlyphAtlas
+
+FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+
+def fonte(size):
+    try:
+        return ImageFont.truetype(FONT_BOLD, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@pytest.mark.parametrize("size", [50, 25])
+@pytest.mark.parametrize("texto", ["0", "7", "12.3M", "1,234.5 Billion Views", "-42 Streams", "999"])
+@pytest.mark.parametrize("fundo", [(0, 0, 0, 0), (30, 30, 40, 200)])
+def test_glyph_atlas_igual_ao_draw_text(size, texto, fundo):
+    font = fonte(size)
+    atlas = GlyphAtlas(font)
+    cor = (0, 255, 128, 255)
+    esperado = Image.new("RGBA", (800, 120), fundo)
+    ImageDraw.Draw(esperado).text((17, 23), texto, font=font, fill=cor)
+    # Duas vezes: a segunda vem da máscara em cache
+    for _ in range(2):
+        obtido = Image.new("RGBA", (800, 120), fundo)
+        atlas.draw(obtido, (17, 23), texto, cor)
+        assert obtido.tobytes() == esperado.tobytes()
+    assert atlas.bbox((17, 23), texto) == ImageDraw.Draw(esperado).textbbox((17, 23), texto, font=font)
+
+
+def test_glyph_atlas_reaproveita_os_glifos():
+    atlas = GlyphAtlas(fonte(50))
+    for n in range(100):
+        atlas.mask(f"{n:,} Views")
+    # Dígitos, vírgula e o sufixo rasterizados uma vez cada
+    assert set(atlas._sprites) == set("0123456789") | {" Views"}
+
+
+def thumb_frame(i, size=150):
+    """Frame sintético do thumbnail: muda a cada índice, como um vídeo."""
+    img = Image.new("RGB", (size, size), (i * 7 % 256, 90, 255 - i * 5 % 256))
+    ImageDraw.Draw(img).rectangle((i % size, 10, i % size + 30, 60), fill=(250, 250, 20))
+    return img
+
+
+@pytest.mark.parametrize("scale, fps, stat", [(0.5, 15, "2.5 Billion Views"), (1.0, 30, "845,000 Streams")])
+def test_numpy_renderer_igual_ao_pil(monkeypatch, scale, fps, stat):
+    np = pytest.importorskip("numpy")
+    import card_generator as cg
+    monkeypatch.setattr(cg, "FONT_PATH_BOLD", FONT_BOLD)
+    monkeypatch.setattr(cg, "FONT_PATH_REGULAR", FONT_BOLD.replace("-Bold", ""))
+    # Fontes e atlas em cache por thread: abre de novo com as fontes do teste
+    monkeypatch.setattr(cg, "_fonts_cache", cg.threading.local())
+    rank = {"rank": 3, "artist": "Artista de Teste", "song": "Uma Música Com Nome Bem Comprido", "stat": stat}
+    pil = cg.card_renderer_class("pil")(rank, "TOP 5 TESTE", fps=fps, scale=scale)
+    rapido = cg.card_renderer_class("numpy")(rank, "TOP 5 TESTE", fps=fps, scale=scale)
+    assert type(pil) is cg.CardRenderer and type(rapido) is cg.NumpyCardRenderer
+
+    # Início do slide, meio do slide, meio do contador, fim do contador e o card parado
+    contador = cg.SLIDE_DURATION - 0.2
+    conferidos = {0, int(fps * cg.SLIDE_DURATION / 2), int(fps * (contador + cg.COUNT_DURATION / 2)),
+                  int(fps * (contador + cg.COUNT_DURATION)), int(fps * 3) - 1}
+    # Os dois guardam estado entre frames (base em cache, retângulos sujos): renderiza a sequência inteira
+    for i in range(int(fps * 3)):
+        thumb = thumb_frame(i)
+        a = pil.render(i, pil.prepare_thumb(thumb))
+        b = rapido.render(i, rapido.prepare_thumb(thumb))
+        if i in conferidos:
+            esperado = np.asarray(a)
+            obtido = np.frombuffer(b.tobytes(), np.uint8).reshape(esperado.shape)
+            assert np.array_equal(obtido, esperado), f"frame {i}: {np.count_nonzero(obtido != esperado)} valores diferentes"
@@ -0,0 +1,186 @@
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ranking_provider import (extract_json, validate_ranking, request_key, RankingCache, CachedRankingProvider,
+                              HedgedGroqProvider, RankingError, RankingSchemaError)
+
+
+def ranking(tema="TOP HITS", n=3):
+    return {"theme_title": tema, "hook_text": "Guess #1!",
+            "ranking": [{"rank": i, "artist": f"Artista {i}", "song": f"Música {i}", "stat": f"{i}M"}
+                        for i in range(n, 0, -1)]}
+
+
+def test_extract_json_com_e_sem_cercas():
+    dados = ranking()
+    texto = json.dumps(dados)
+    assert extract_json(texto) == dados
+    assert extract_json(f"```json\n{texto}\n```") == dados
+    assert extract_json(f"Claro! Aqui está:\n```\n{texto}\n```\nEspero que ajude {{:") == dados
+
+
+def test_extract_json_ignora_chaves_soltas_antes_do_objeto():
+    assert extract_json('Formato {tema}: {"theme_title": "X"} e mais texto') == {"theme_title": "X"}
+
+
+def test_extract_json_sem_objeto():
+    for texto in ("", "sem json aqui", "[1, 2, 3]", "{quebrado"):
+        with pytest.raises(RankingSchemaError):
+            extract_json(texto)
+
+
+def test_validate_ranking_normaliza():
+    dados = ranking()
+    dados["theme_title"] = "  TOP HITS "
+    dados["ranking"][0]["rank"] = "#3"
+    dados["ranking"][1]["stat"] = 2000000
+    del dados["hook_text"]
+    ok = validate_ranking(dados)
+    assert ok["theme_title"] == "TOP HITS"
+    assert ok["ranking"][0]["rank"] == 3
+    assert ok["ranking"][1]["stat"] == "2000000"
+    assert ok["hook_text"]
+
+
+@pytest.mark.parametrize("estraga, trecho", [
+    (lambda d: d.pop("theme_title"), "'theme_title'"),
+    (lambda d: d.update(ranking=[]), "'ranking'"),
+    (lambda d: d.update(ranking="lista"), "'ranking'"),
+    (lambda d: d["ranking"][0].pop("artist"), "ranking[0]: 'artist'"),
+    (lambda d: d["ranking"][1].update(song=["x"]), "ranking[1]: 'song'"),
+    (lambda d: d["ranking"][2].update(rank="primeiro"), "ranking[2]: 'rank'"),
+    (lambda d: d["ranking"][2].update(rank=3), "repetido"),
+    (lambda d: d["ranking"].append("item"), "não é um objeto"),
+])
+def test_validate_ranking_rejeita_campos_ausentes_ou_de_tipo_errado(estraga, trecho):
+    dados = ranking()
+    estraga(dados)
+    with pytest.raises(RankingSchemaError, match=trecho.replace("[", r"\[").replace("]", r"\]")):
+        validate_ranking(dados)
+
+
+def test_validate_ranking_nao_objeto():
+    with pytest.raises(RankingSchemaError):
+        validate_ranking([ranking()])
+
+
+class FakeClient:
+    """Cliente no formato do Groq: cada modelo tem uma demora e uma resposta (texto ou exceção)."""
+
+    def __init__(self, respostas):
+        self.respostas = respostas
+        self.chamados = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model, timeout):
+        self.chamados.append(model)
+        demora, resposta = self.respostas[model]
+        time.sleep(demora)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=resposta))])
+
+
+def test_hedging_dispara_o_proximo_quando_o_primeiro_demora():
+    client = FakeClient({"lento": (2.0, json.dumps(ranking("LENTO"))),
+                         "rapido": (0.0, json.dumps(ranking("RAPIDO")))})
+    provider = HedgedGroqProvider(client, models=["lento", "rapido"], hedge_delay=0.1, timeout=5)
+    inicio = time.monotonic()
+    dados, modelo = provider.generate("prompt")
+    assert modelo == "rapido" and dados["theme_title"] == "RAPIDO"
+    assert time.monotonic() - inicio < 1.5
+
+
+def test_hedging_falha_passa_ao_proximo_sem_esperar():
+    client = FakeClient({"quebrado": (0.0, RuntimeError("503")),
+                         "sem_schema": (0.0, '{"theme_title": "X"}'),
+                         "bom": (0.0, "```json\n" + json.dumps(ranking("BOM")) + "\n```")})
+    provider = HedgedGroqProvider(client, models=["quebrado", "sem_schema", "bom"], hedge_delay=30, timeout=5)
+    inicio = time.monotonic()
+    dados, modelo = provider.generate("prompt")
+    assert modelo == "bom" and dados["theme_title"] == "BOM"
+    assert client.chamados == ["quebrado", "sem_schema", "bom"]
+    assert time.monotonic() - inicio < 5
+
+
+def test_hedging_todos_falham():
+    client = FakeClient({"a": (0.0, RuntimeError("fora do ar")), "b": (0.0, "sem json")})
+    provider = HedgedGroqProvider(client, models=["a", "b"], hedge_delay=0.1, timeout=5)
+    with pytest.raises(RankingError, match="a: fora do ar"):
+        provider.generate("prompt")
+
+
+def test_hedging_prazo_esgotado():
+    client = FakeClient({"a": (1.0, json.dumps(ranking()))})
+    provider = HedgedGroqProvider(client, models=["a"], hedge_delay=0.1, timeout=0.2)
+    with pytest.raises(RankingError, match="prazo"):
+        provider.generate("prompt")
+
+
+class ContaProvider:
+    """Provedor que devolve um tema novo a cada chamada."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, theme=None, avoid=()):
+        with self.lock:
+            self.chamadas += 1
+            return ranking(theme or f"TEMA {self.chamadas}"), "fake"
+
+
+def test_cache_guarda_varias_respostas_por_chave(tmp_path):
+    cache = RankingCache(tmp_path)
+    reserva = ContaProvider()
+    provider = CachedRankingProvider(cache, reserva, models=["m"], version=1)
+    usados = []
+    for _ in range(3):
+        dados, _ = provider.generate("prompt", avoid=usados)
+        usados.append(dados["theme_title"])
+    assert usados == ["TEMA 1", "TEMA 2", "TEMA 3"] and reserva.chamadas == 3
+
+    # Com os temas liberados de novo, o cache responde sem chamar o provedor
+    dados, fonte = provider.generate("prompt", avoid=["TEMA 3"])
+    assert fonte == "cache:fake" and dados["theme_title"] == "TEMA 2"
+    dados, _ = provider.generate("prompt", avoid=["tema 3", "Tema 2"])
+    assert dados["theme_title"] == "TEMA 1"
+    assert reserva.chamadas == 3
+
+
+def test_cache_replay_so_le(tmp_path):
+    cache = RankingCache(tmp_path)
+    cache.put(request_key(None, ["m"], 1), ranking("GRAVADO"), "groq")
+    reserva = ContaProvider()
+    provider = CachedRankingProvider(cache, reserva, record=False, models=["m"], version=1)
+    assert provider.generate("prompt")[0]["theme_title"] == "GRAVADO"
+    assert provider.generate("prompt", avoid=["GRAVADO"])[0]["theme_title"] == "TEMA 1"
+    assert cache.get(request_key(None, ["m"], 1), avoid=["GRAVADO"]) is None
+
+
+def test_cache_limite_por_chave_e_expiracao(tmp_path):
+    cache = RankingCache(tmp_path, max_per_key=2)
+    for tema in ("A", "B", "C", "B"):
+        cache.put("k", ranking(tema), "fake")
+    entradas = json.loads(cache.path("k").read_text(encoding="utf-8"))["entries"]
+    assert [e["data"]["theme_title"] for e in entradas] == ["B", "C"]
+
+    expirado = RankingCache(tmp_path, max_age_days=0)
+    time.sleep(0.01)
+    assert expirado.get("k") is None
+
+
+def test_cache_le_o_formato_antigo(tmp_path):
+    cache = RankingCache(tmp_path)
+    cache.path("k").write_text(json.dumps({"source": "groq", "created": time.time(), "data": ranking("ANTIGO")}),
+                               encoding="utf-8")
+    assert cache.get("k")[0]["theme_title"] == "ANTIGO"
+    assert cache.get("k", avoid=["antigo"]) is None
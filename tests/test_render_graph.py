@@ -0,0 +1,71 @@
+import sys
+import re
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+from render_profiles import get_profile
+
+NARRACAO_S = 3.2
+RANKS = [{"rank": 2, "artist": "Artista B", "song": "Música B", "stat": "2M"},
+         {"rank": 1, "artist": "Artista A", "song": "Música A", "stat": "1M"}]
+
+
+@pytest.fixture
+def grafo(monkeypatch, tmp_path):
+    """renderizar_programa sem ffmpeg: a duração da narração é fixa e o comando é só capturado."""
+    chamadas = []
+    monkeypatch.setattr(main, "media_duration", lambda exe, path: NARRACAO_S)
+    monkeypatch.setattr(main, "ffmpeg_exe", lambda: "ffmpeg")
+    monkeypatch.setattr(main, "AUDIO_MASTERING", "final")
+    monkeypatch.setattr(main, "pipe_frames_to_ffmpeg", lambda cmd, frames: chamadas.append(cmd))
+    monkeypatch.setattr(main.instrumentation, "run", lambda cmd, **kw: chamadas.append(cmd))
+
+    def render(transition, intro=True, duracao=7.0):
+        perfis = [get_profile("draft"), get_profile("draft").for_aspect("1:1")]
+        saidas = [(p, tmp_path / f"out_{p.tag}.mp4") for p in perfis]
+        clipes = [(tmp_path / f"bruto_{r['rank']}.mp4", r, 4.0 if k == 0 else 0) for k, r in enumerate(RANKS)]
+        main.renderizar_programa(clipes, saidas, "TEMA", intro=("TEMA", "Gancho", tmp_path / "narr.mp3", None) if intro else None,
+                                 frames_mode="stream", thumb_mode="filtergraph", card_workers=1, duration=duracao,
+                                 frames_dir=tmp_path, transition=transition)
+        assert len(chamadas) == 1
+        cmd = chamadas.pop()
+        return cmd, cmd[cmd.index("-filter_complex") + 1]
+    return render
+
+
+def test_cortes_secos_usam_concat(grafo):
+    cmd, filtro = grafo(transition=0)
+    assert "xfade" not in filtro
+    for i in range(2):
+        assert f"[s0v{i}][s0a{i}][s1v{i}][s1a{i}][s2v{i}][s2a{i}]concat=n=3:v=1:a=1[v{i}][a{i}]" in filtro
+        assert cmd[cmd.index(f"[v{i}]") - 1] == "-map"
+    # A intro é cortada na duração da narração; o stdin vira uma fatia por clipe
+    assert f"trim=duration={NARRACAO_S:.3f}" in filtro and f"atrim=duration={NARRACAO_S:.3f}" in filtro
+    assert "[0:v]split=2[c0raw][c1raw]" in filtro
+    assert cmd[cmd.index("pipe:0") - 1] == "-i"
+
+
+def test_xfade_offsets_somam_as_duracoes(grafo):
+    _, filtro = grafo(transition=0.5, duracao=7.0)
+    for i in range(2):
+        offsets = [float(o) for o in re.findall(rf"xfade=transition=fade:duration=0.5:offset=([\d.]+)\[(?:j\dv|v){i}\]", filtro)]
+        # Intro (narração) e depois cada clipe, descontando a sobreposição de cada junção
+        assert offsets == pytest.approx([NARRACAO_S - 0.5, NARRACAO_S - 0.5 + 7.0 - 0.5])
+        assert len(re.findall(rf"acrossfade=d=0.5\[(?:j\da|a){i}\]", filtro)) == 2
+        assert f"[s2v{i}]fps=15,settb=AVTB,format=yuv420p[x2v{i}]" in filtro
+
+
+def test_sem_intro(grafo):
+    _, filtro = grafo(transition=0.5, intro=False)
+    assert "drawtext" not in filtro
+    assert re.findall(r"offset=([\d.]+)\[v0\]", filtro) == ["6.500"]
+
+
+def test_narracao_sem_duracao_falha_antes_do_encode(grafo, monkeypatch):
+    monkeypatch.setattr(main, "media_duration", lambda exe, path: None)
+    with pytest.raises(ValueError, match="duração da narração"):
+        grafo(transition=0.5)
@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from video_resolver import (best_candidate, make_plan, plan_from_entries, score_candidate, segment_window,
+                            DEFAULT_DURATION, MAX_DURATION)
+
+ARTIST, SONG = "Queen", "Bohemian Rhapsody"
+
+
+def entry(title, uploader="", duration=360, video_id=None):
+    return {"id": video_id or title, "title": title, "uploader": uploader, "duration": duration,
+            "webpage_url": f"https://youtu.be/{video_id or title}"}
+
+
+OFICIAL = entry("Queen – Bohemian Rhapsody (Official Video Remastered)", "Queen Official")
+VEVO = entry("Bohemian Rhapsody", "QueenVEVO")
+LYRIC = entry("Queen - Bohemian Rhapsody (Lyrics)", "Lyrics Hub")
+LIVE = entry("Queen - Bohemian Rhapsody (Live Aid 1985)", "Queen Official")
+COVER = entry("Bohemian Rhapsody - Piano Cover", "Some Pianist")
+REACTION = entry("First time hearing Bohemian Rhapsody", "Reaction Central")
+
+
+def test_oficial_vence_lyric_live_e_cover():
+    oficial = score_candidate(OFICIAL, ARTIST, SONG)
+    for outro in (LYRIC, LIVE, COVER, REACTION):
+        assert oficial > score_candidate(outro, ARTIST, SONG), outro["title"]
+
+
+def test_canal_vevo_conta_mais_que_titulo():
+    assert score_candidate(VEVO, ARTIST, SONG) > score_candidate(entry("Bohemian Rhapsody official music video"), ARTIST, SONG)
+
+
+def test_penalidades_de_titulo_e_canal():
+    # O título penaliza mesmo no canal oficial; o canal penaliza mesmo com título limpo
+    assert score_candidate(LIVE, ARTIST, SONG) < 0
+    assert score_candidate(entry("Bohemian Rhapsody", "Lyrics Hub"), ARTIST, SONG) < 0
+
+
+def test_campos_ausentes_nao_quebram():
+    assert score_candidate({"title": None, "uploader": None}, ARTIST, SONG) == 0
+
+
+def test_best_candidate_escolhe_o_oficial_independente_da_ordem():
+    for ordem in ([LYRIC, OFICIAL, COVER], [COVER, LYRIC, OFICIAL], [OFICIAL, LIVE]):
+        score, melhor = best_candidate(ordem, ARTIST, SONG)
+        assert melhor is OFICIAL
+        assert score == score_candidate(OFICIAL, ARTIST, SONG)
+
+
+def test_best_candidate_sem_resultados():
+    assert best_candidate([], ARTIST, SONG) == (None, None)
+    assert best_candidate([None, None], ARTIST, SONG) == (None, None)
+
+
+def test_filtro_de_duracao():
+    curto = entry("Queen - Bohemian Rhapsody (Official Video)", "QueenVEVO", duration=5)
+    longo = entry("Queen - Bohemian Rhapsody (Official Video) 10 hours", "QueenVEVO", duration=MAX_DURATION + 1)
+    # Os dois pontuam mais, mas não comportam o trecho ou não são o clipe
+    _, melhor = best_candidate([curto, longo, LYRIC], ARTIST, SONG, duration_sec=7)
+    assert melhor is LYRIC
+    assert best_candidate([curto, longo], ARTIST, SONG, duration_sec=7) == (None, None)
+    # Duração desconhecida não elimina o resultado
+    sem_duracao = entry("Queen - Bohemian Rhapsody (Official Video)", "QueenVEVO", duration=None)
+    assert best_candidate([sem_duracao], ARTIST, SONG, duration_sec=7)[1] is sem_duracao
+    # No limite exato o vídeo ainda serve
+    assert best_candidate([entry("x", duration=7)], ARTIST, SONG, duration_sec=7)[1] is not None
+
+
+def test_segment_window_pula_a_introducao():
+    assert segment_window(200, 7) == (70, 77)
+    inicio, fim = segment_window(181.5, 7)
+    assert isinstance(inicio, int) and fim == inicio + 7
+
+
+def test_segment_window_sem_duracao_usa_o_padrao():
+    assert segment_window(None, 7) == segment_window(DEFAULT_DURATION, 7)
+    assert segment_window(0, 7) == segment_window(DEFAULT_DURATION, 7)
+
+
+def test_segment_window_recua_no_fim_do_video():
+    # 35% de 12s = 4s; 4 + 7 cabe em 12, mas 35% de 10s = 3s + 11s não cabe
+    assert segment_window(12, 7) == (4, 11)
+    assert segment_window(16, 11.0) == (5, 16.0)
+    assert segment_window(14, 11) == (3, 14)
+    for duracao in range(7, 40):
+        inicio, fim = segment_window(duracao, 7)
+        assert 0 <= inicio and fim <= duracao and fim - inicio == 7
+
+
+def test_segment_window_video_mais_curto_que_o_trecho():
+    assert segment_window(10, 11.0) == (0, 10)
+    assert segment_window(5.5, 7) == (0, 5)
+    # Nunca devolve uma janela vazia
+    assert segment_window(0.4, 7) == (0, 1)
+
+
+def test_make_plan_e_plan_from_entries():
+    plano = make_plan("abc", "https://youtu.be/abc", "t", 10, None, 7)
+    assert plano["duration"] == DEFAULT_DURATION
+    assert (plano["start"], plano["end"]) == segment_window(DEFAULT_DURATION, 7)
+
+    plano = plan_from_entries([LYRIC, OFICIAL], ARTIST, SONG, 7)
+    assert plano["video_id"] == OFICIAL["id"] and plano["url"] == OFICIAL["webpage_url"]
+    assert (plano["start"], plano["end"]) == segment_window(OFICIAL["duration"], 7)
+    assert plan_from_entries([], ARTIST, SONG, 7) is None
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import Future
+from pathlib import Path
+import instrumentation
+
+# Narração da intro: o texto (tema + gancho) já é conhecido quando o ranking
+# chega, então a síntese começa nessa hora, num loop asyncio próprio, em
+# paralelo com os downloads. Cada áudio fica em cache no disco pela chave
+# (texto, voz, rate, backend): temas e ganchos repetidos não custam nada.
+# "silent" e "tone" geram o áudio localmente com o ffmpeg (testes e benchmarks offline).
+
+DEFAULT_VOICE = "en-US-ChristopherNeural"
+DEFAULT_RATE = "+25%"
+BACKENDS = ("edge", "silent", "tone")
+# Velocidade da narração real com rate +25%: dá a duração do áudio dos backends locais
+CHARS_PER_SECOND = 14
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+class TTSService:
+    """Síntese de narração com cache em disco; start() devolve um Future com o caminho do mp3."""
+
+    def __init__(self, cache_dir, voice=DEFAULT_VOICE, rate=DEFAULT_RATE, backend="edge", ffmpeg_exe=None,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de TTS desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+        if backend != "edge" and not ffmpeg_exe:
+            raise ValueError(f"O backend {backend} precisa do ffmpeg")
+        self.cache_dir = Path(cache_dir)
+        self.voice = voice
+        self.rate = rate
+        self.backend = backend
+        self.ffmpeg_exe = ffmpeg_exe
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._loop = None
+        # Sínteses em andamento por chave: o mesmo texto pedido duas vezes sintetiza uma vez
+        self._pending = {}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._prune()
+
+    def key(self, text):
+        raw = json.dumps([text, self.voice, self.rate, self.backend], ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def path(self, text):
+        return self.cache_dir / f"{self.key(text)}.mp3"
+
+    def cached(self, text):
+        """Caminho do áudio em cache, ou None."""
+        path = self.path(text)
+        try:
+            if path.stat().st_size > 0:
+                os.utime(path) # Idade conta a partir do último uso
+                return path
+        except OSError:
+            pass
+        return None
+
+    def start(self, text):
+        """Começa a síntese em segundo plano (ou devolve o cache) sem bloquear."""
+        k = self.key(text)
+        with self._lock:
+            fut = self._pending.get(k)
+            if fut is not None:
+                return fut
+            path = self.cached(text)
+            if path is not None:
+                fut = Future()
+                fut.set_result(path)
+                return fut
+            fut = asyncio.run_coroutine_threadsafe(self._synthesize(text, self.path(text)), self._event_loop())
+            self._pending[k] = fut
+        fut.add_done_callback(lambda _: self._forget(k))
+        return fut
+
+    def synthesize(self, text):
+        """Síntese bloqueante: caminho do mp3 em cache."""
+        return self.start(text).result()
+
+    def _forget(self, k):
+        with self._lock:
+            self._pending.pop(k, None)
+
+    def _event_loop(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="tts", daemon=True).start()
+        return self._loop
+
+    async def _synthesize(self, text, path):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            if self.backend == "edge":
+                await self._edge(text, tmp)
+            else:
+                await asyncio.to_thread(self._local, text, tmp)
+            if not tmp.exists() or tmp.stat().st_size == 0:
+                raise RuntimeError(f"TTS ({self.backend}) não gerou áudio")
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return path
+
+    async def _edge(self, text, out_path):
+        try:
+            import edge_tts # Só o backend "edge" precisa dele (e ele é pesado: aiohttp)
+        except ImportError:
+            raise RuntimeError("edge-tts não está instalado (pip install edge-tts) - use TTS_BACKEND=silent")
+        communicate = edge_tts.Communicate(text, self.voice, rate=self.rate)
+        await communicate.save(str(out_path))
+
+    def _local(self, text, out_path):
+        # Mesmo formato da saída do Edge-TTS (mp3 mono 24 kHz) e duração parecida
+        dur = max(2.0, len(text) / CHARS_PER_SECOND)
+        fonte = "anullsrc=r=24000:cl=mono" if self.backend == "silent" else "sine=frequency=440:sample_rate=24000"
+        instrumentation.run([self.ffmpeg_exe, "-v", "error", "-y", "-f", "lavfi", "-i", fonte, "-t", f"{dur:.2f}",
+                             "-af", "volume=0.1", "-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3", str(out_path)],
+                            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def _prune(self):
+        agora = time.time()
+        for p in self.cache_dir.glob("*.mp3"):
+            try:
+                if agora - p.stat().st_mtime > self.max_age:
+                    p.unlink()
+            except OSError:
+                pass
+        for p in self.cache_dir.glob("*.tmp"):
+            try:
+                if agora - p.stat().st_mtime > 3600:
+                    p.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,105 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Resolução do ranking inteiro antes dos downloads: busca todas as músicas em
+# paralelo (com limite de requisições simultâneas), escolhe o melhor vídeo de
+# cada uma e calcula a janela do trecho. Músicas sem vídeo aparecem em segundos,
+# não no meio do render.
+
+# Títulos e canais que quase nunca são o clipe oficial
+TITLE_PENALTIES = ["review", "reaction", "cover", "lyrics", "live", "fan-made", "parody", "karaoke", "remix"]
+CHANNEL_PENALTIES = ["reaction", "lyrics"]
+# Início do trecho em fração da duração (pula a introdução do clipe)
+SEGMENT_START = 0.35
+DEFAULT_DURATION = 180
+# Acima disso (s) é compilação, álbum inteiro ou transmissão gravada, não o clipe
+MAX_DURATION = 20 * 60
+
+
+def score_candidate(entry, artist, song):
+    """Pontuação de um resultado da busca para (artista, música); quanto maior, mais oficial."""
+    title_lower = (entry.get('title') or '').lower()
+    channel_lower = (entry.get('uploader') or '').lower()
+
+    score = 0
+    # Bonus por canal oficial e VEVO
+    if "vevo" in channel_lower or channel_lower.endswith("- topic"): score += 50
+    if artist.lower() in channel_lower: score += 30
+
+    # Bonus por título exato
+    if "official" in title_lower: score += 20
+    if song.lower() in title_lower: score += 20
+    if "video" in title_lower or "music" in title_lower: score += 10
+
+    # Penalidades severas para evitar lixo
+    if any(x in title_lower for x in TITLE_PENALTIES):
+        score -= 200
+    if any(x in channel_lower for x in CHANNEL_PENALTIES):
+        score -= 150
+    return score
+
+
+def usable_duration(entry, duration_sec=0):
+    """O vídeo comporta o trecho e não é longo demais? Sem duração conhecida, passa."""
+    duration = entry.get('duration')
+    if not duration:
+        return True
+    return duration_sec <= duration <= MAX_DURATION
+
+
+def best_candidate(entries, artist, song, duration_sec=0):
+    """(score, entry) do melhor resultado com duração utilizável, ou (None, None) se não há nenhum."""
+    candidates = [(score_candidate(e, artist, song), e) for e in entries if e and usable_duration(e, duration_sec)]
+    if not candidates:
+        return None, None
+    return max(candidates, key=lambda x: x[0])
+
+
+def segment_window(duration, duration_sec):
+    """
+    (início, fim) em segundos do trecho usado no vídeo. O início é inteiro e
+    recua se o trecho passaria do fim; vídeos mais curtos que o trecho vão até o fim.
+    """
+    duration = duration or DEFAULT_DURATION
+    start = max(0, min(int(duration * SEGMENT_START), int(duration - duration_sec)))
+    return start, min(start + duration_sec, max(int(duration), 1))
+
+
+def make_plan(video_id, url, title, score, duration, duration_sec):
+    """Plano de download de uma música: vídeo escolhido e janela do trecho."""
+    duration = duration or DEFAULT_DURATION
+    start, end = segment_window(duration, duration_sec)
+    return {"video_id": video_id, "url": url, "title": title, "score": score,
+            "duration": duration, "start": start, "end": end}
+
+
+def plan_from_entries(entries, artist, song, duration_sec):
+    score, entry = best_candidate(entries, artist, song, duration_sec)
+    if entry is None:
+        return None
+    url = entry.get('webpage_url') or entry.get('url')
+    return make_plan(entry.get('id') or url, url, entry.get('title', ''), score,
+                     entry.get('duration'), duration_sec)
+
+
+def resolve_all(items, resolve_fn, max_in_flight=4):
+    """
+    Resolve vários itens em paralelo com no máximo max_in_flight buscas ao mesmo tempo.
+    items: {chave: argumentos de resolve_fn}; devolve {chave: plano ou None}.
+    Uma busca que falha vira None sem derrubar as outras. Cada busca roda numa
+    cópia do contexto atual (as etapas entram no relatório da execução).
+    """
+    if not items:
+        return {}
+
+    def resolver(args):
+        try:
+            return resolve_fn(*args)
+        except Exception as e:
+            print(f"[!] Erro ao resolver {args[0]} - {args[1]}: {e}")
+            return None
+
+    workers = max(1, min(max_in_flight, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolve") as pool:
+        futures = {k: pool.submit(contextvars.copy_context().run, resolver, args) for k, args in items.items()}
+        return {k: f.result() for k, f in futures.items()}
@@ -0,0 +1,107 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+import yt_dlp
+from yt_dlp.utils import download_range_func
+from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+
+# Sessão yt-dlp dentro do processo: busca e download do trecho usam o mesmo
+# YoutubeDL (um por thread, já que ele não é thread-safe), que mantém o pool
+# de conexões HTTP aberto entre clipes. O info dict da busca é guardado e
+# reaproveitado no download, sem resolver o vídeo de novo.
+
+
+class YouTubeSession:
+    """Busca e download de trechos do YouTube sem subprocesso."""
+
+    def __init__(self, ffmpeg_location, download_format, info_ttl=3600, max_infos=200):
+        self.ffmpeg_location = ffmpeg_location
+        self.download_format = download_format
+        # As URLs dos formatos expiram em algumas horas no YouTube
+        self.info_ttl = info_ttl
+        self.max_infos = max_infos
+        self._local = threading.local()
+        self._infos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ydl(self):
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL({
+                'quiet': True,
+                'no_warnings': True,
+                'noplaylist': True,
+                'match_filter': yt_dlp.utils.match_filter_func("!is_live"),
+                'ignoreerrors': True,
+                'default_search': 'ytsearch3',
+                'format': self.download_format,
+                'ffmpeg_location': self.ffmpeg_location,
+                'force_keyframes_at_cuts': True,
+                'progress_hooks': [self._progress_hook],
+            })
+            self._local.ydl = ydl
+        return ydl
+
+    def _guardar_info(self, info):
+        if not info or not info.get('id'):
+            return
+        with self._lock:
+            self._infos[info['id']] = (time.time(), info)
+            self._infos.move_to_end(info['id'])
+            while len(self._infos) > self.max_infos:
+                self._infos.popitem(last=False)
+
+    def _info(self, video_id):
+        with self._lock:
+            item = self._infos.get(video_id)
+            if not item or time.time() - item[0] > self.info_ttl:
+                return None
+            # process_ie_result altera o dict: cada download usa a sua cópia
+            return copy.deepcopy(item[1])
+
+    def search(self, query):
+        """Entradas (info dicts completos) da busca; ficam guardadas para o download."""
+        info = self._ydl().extract_info(query, download=False)
+        if not info:
+            return []
+        entries = [e for e in info.get('entries', [info]) if e]
+        for entry in entries:
+            self._guardar_info(entry)
+        return entries
+
+    def download_section(self, video_id, url, start, end, out_path, label=None):
+        """
+        Baixa só o trecho [start, end] em out_path (cortes em keyframes forçados).
+        Reaproveita o info dict da busca; sem ele, resolve a URL uma vez.
+        """
+        ydl = self._ydl()
+        # O downloader de trechos só procura o ffmpeg por esta ContextVar (a CLI do yt-dlp
+        # faz o mesmo); é por contexto, então vale para esta chamada
+        FFmpegPostProcessor._ffmpeg_location.set(self.ffmpeg_location)
+        ydl.params['outtmpl'] = {'default': str(out_path)}
+        ydl.params['download_ranges'] = download_range_func(None, [(start, end)])
+        self._local.progress = {"label": label or video_id, "last": -1}
+        try:
+            info = self._info(video_id)
+            if info is not None:
+                ydl.process_ie_result(info, download=True)
+            else:
+                self._guardar_info(ydl.extract_info(url, download=True))
+        finally:
+            ydl.params.pop('download_ranges', None)
+
+    def _progress_hook(self, d):
+        estado = getattr(self._local, "progress", None)
+        if estado is None:
+            return
+        if d.get('status') == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if not total:
+                return
+            pct = int(d.get('downloaded_bytes', 0) * 100 / total) // 25 * 25
+            if pct > estado["last"]:
+                estado["last"] = pct
+                print(f"    -> {estado['label']}: {pct}%")
+        elif d.get('status') == 'error':
+            print(f"[!] Erro no download de {estado['label']}")